@@ -0,0 +1,131 @@
+
+import io, csv, gzip, lzma, queue, threading
+
+
+# * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+# * * * * * * * * * * Background Writing * * * * * * * * * * * *
+# * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+
+# A suite makes a csv row every trial. Rather than writing each one as it's made, the rows go into a queue, and a
+# thread of the writer's own takes them off in batches, formats a batch at a time and writes it in one go. The queue
+# is bounded: if the disk can't keep up, the suite waits for it (rather than piling rows up in memory).
+#
+# The file can be compressed (COMPRESSIONS). Everything written up to a flush is closed off as one gzip member (or xz
+# stream), so a file cut back to where it was at a flush (see SuiteCheckpoint) is still a whole compressed file, and
+# so is one file's worth appended to another (see DataFiles.merge_part).
+
+COMPRESSIONS = {None: '', 'gzip': '.gz', 'lzma': '.xz'} # compression -> the file name's extension
+
+class BackgroundWriter(object):
+    """
+    writes csv rows and text to a file in a thread of its own. it has what a csv.writer has (writerow) and what the
+    code that syncs files needs of a file (flush, fileno and name)
+    """
+    def __init__(self, file_name, mode='a', compression=None, max_queue=10000, batch_size=1000, encoding='UTF8'):
+        """
+        :param file_name: the file (with COMPRESSIONS[compression] on the end, if it's compressed)
+        :param mode: 'a' to append to the file or 'w' to start it over
+        :param compression: a key of COMPRESSIONS
+        :param max_queue: how many rows (or texts) can be waiting to be written before writerow waits
+        :param batch_size: the most rows (or texts) to write at a time
+        """
+        self.name        = file_name
+        self.compression = compression
+        self.batch_size  = batch_size
+        self.encoding    = encoding
+        self.raw_file    = open(file_name, mode + 'b')
+        self.stream      = None # the compressed stream being written (until the next flush)
+        self.error       = None # what went wrong in the writing thread, if anything (raised by flush and close)
+        self.queue       = queue.Queue(max_queue)
+        self.thread      = threading.Thread(target=self.run, name='writer ' + file_name)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def writerow(self, row):
+        # queues a csv row (waits, if the queue is full)
+        self.queue.put(('row', row))
+
+    def write(self, text):
+        # queues some text
+        self.queue.put(('text', text))
+
+    def flush(self):
+        """
+        waits until everything queued so far is written (and, if it's compressed, closed off) and the file is flushed
+        :return:
+        """
+        done = threading.Event()
+        self.queue.put(('flush', done))
+        done.wait()
+        if self.error:
+            raise self.error
+
+    def fileno(self):
+        return self.raw_file.fileno()
+
+    def close(self):
+        """
+        writes everything queued, closes the file and ends the thread
+        :return:
+        """
+        self.queue.put(('close', None))
+        self.thread.join()
+        if self.error:
+            raise self.error
+
+    # * * * * * (in the writing thread) * * * * *
+
+    def run(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size and batch[-1][0] in ('row', 'text'):
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            # format the batch, and write it in one go
+            text   = io.StringIO()
+            writer = csv.writer(text, delimiter=',')
+            for (kind, value) in batch:
+                if kind == 'row':
+                    writer.writerow(value)
+                elif kind == 'text':
+                    text.write(value)
+            try:
+                if not self.error:
+                    self.write_data(text.getvalue().encode(self.encoding))
+                    if batch[-1][0] in ('flush', 'close'):
+                        self.end_stream()
+                        self.raw_file.flush()
+                    if batch[-1][0] == 'close':
+                        self.raw_file.close()
+            except Exception as error:
+                self.error = error # (the rest is thrown away: the error is raised at the next flush or close)
+
+            for (kind, value) in batch:
+                self.queue.task_done()
+            if batch[-1][0] == 'flush':
+                batch[-1][1].set()
+            elif batch[-1][0] == 'close':
+                return
+
+    def write_data(self, data):
+        if not data:
+            return
+        if self.compression is None:
+            self.raw_file.write(data)
+            return
+        if self.stream is None:
+            # (no file name or time in the gzip header: the same rows make the same bytes)
+            if self.compression == 'gzip':
+                self.stream = gzip.GzipFile(filename='', mode='wb', fileobj=self.raw_file, mtime=0)
+            else:
+                self.stream = lzma.LZMAFile(self.raw_file, 'wb')
+        self.stream.write(data)
+
+    def end_stream(self):
+        # closes off the compressed stream (the file itself stays open)
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
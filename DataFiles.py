@@ -0,0 +1,146 @@
+
+import os, time, socket, shutil
+
+try:
+    import fcntl
+    FCNTL_FAILED = False
+except:
+    FCNTL_FAILED = True # (e.g., on Windows: locks are then lock files, made with an exclusive create)
+
+
+# * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+# * * * * * * * * * Sharing the Data Directory * * * * * * * * * *
+# * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+
+# Many simulation processes (e.g., on the nodes of a cluster) can share one data directory:
+#   1) data file indices are handed out under a lock on data_index.txt, a range at a time (see reserve_indices),
+#      so no two runs get the same index, and so the same file names
+#   2) a file several runs append to (e.g., data/feature.csv) is written to one file per writer first (see
+#      part_file_name), and that is appended to it, under a lock, when the writer is done (see merge_part). the
+#      file's length before the append is journaled first, so an append a crash cut short is cut back off
+#   3) every file is replaced whole (written to a file of the writer's own, then moved into place), so no one ever
+#      sees half of one
+
+INDEX_FILE = 'data/data_index.txt'
+
+class FileLock(object):
+    """
+    an exclusive lock on a file, for a with statement: with FileLock(file_name): ...
+    (the lock is on a .lock file in file_name's directory, which all the files there share: what's done under it is
+    quick. so file_name itself can be replaced while it's held, and there's only ever the one lock file)
+    """
+    def __init__(self, file_name, poll=0.05):
+        """
+        :param file_name: the file to lock
+        :param poll: without fcntl, how long to wait (seconds) between tries for the lock
+        """
+        self.lock_name = os.path.join(os.path.dirname(file_name), '.lock')
+        self.poll      = poll
+        self.lock_file = None
+
+    def __enter__(self):
+        if not FCNTL_FAILED:
+            self.lock_file = open(self.lock_name, 'a')
+            fcntl.flock(self.lock_file.fileno(), fcntl.LOCK_EX)
+        else:
+            while True:
+                try:
+                    self.lock_file = os.open(self.lock_name, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                    break
+                except FileExistsError:
+                    time.sleep(self.poll)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if not FCNTL_FAILED:
+            fcntl.flock(self.lock_file.fileno(), fcntl.LOCK_UN)
+            self.lock_file.close()
+        else:
+            os.close(self.lock_file)
+            os.remove(self.lock_name)
+        self.lock_file = None
+        return False
+
+def writer_id():
+    # this process, among all the ones that might share the data directory
+    return socket.gethostname() + '-' + str(os.getpid())
+
+def part_file_name(file_name):
+    """
+    :return: the name of this writer's own file for what it's writing to file_name
+    """
+    return file_name + '.part-' + writer_id()
+
+def write_atomically(file_name, text):
+    """
+    writes text to file_name: to a file of this writer's own, then moved into place
+    """
+    part_name = part_file_name(file_name)
+    with open(part_name, 'w') as part_file:
+        part_file.write(text)
+        part_file.flush()
+        os.fsync(part_file.fileno())
+    os.replace(part_name, file_name)
+
+MERGE_CHUNK = 1 << 20 # bytes copied at a time by merge_part
+
+def merge_part(part_name, file_name):
+    """
+    appends a writer's own file to file_name and removes it. the append is done under file_name's lock, so merges
+    never interleave, and only after file_name's length is journaled (in file_name.merging), so if a crash cuts it
+    short, the next merge cuts file_name back to what it was (see undo_merge)
+    :param part_name: the writer's file (see part_file_name)
+    :param file_name: the file to append it to (made, if it doesn't exist)
+    """
+    journal_name = file_name + '.merging'
+    with FileLock(file_name):
+        undo_merge(file_name)
+        with open(file_name, 'ab') as merged_file:
+            write_atomically(journal_name, str(merged_file.tell()))
+            with open(part_name, 'rb') as part_file:
+                shutil.copyfileobj(part_file, merged_file, MERGE_CHUNK)
+            merged_file.flush()
+            os.fsync(merged_file.fileno())
+        os.remove(journal_name)
+    os.remove(part_name)
+
+def undo_merge(file_name):
+    """
+    if a merge into file_name was cut short (its journal is still there), cuts file_name back to its length before
+    it (under file_name's lock)
+    """
+    journal_name = file_name + '.merging'
+    if not os.path.exists(journal_name):
+        return
+    with open(journal_name, 'r') as journal:
+        length = int(journal.read())
+    if os.path.exists(file_name):
+        os.truncate(file_name, min(length, os.path.getsize(file_name)))
+    os.remove(journal_name)
+
+def read_index(index_file=INDEX_FILE):
+    """
+    :return: the data file index in index_file (the one and only line in it), 0 if there's none yet
+    """
+    if not os.path.exists(index_file):
+        return 0
+    with open(index_file, 'r') as index:
+        return int(next(index))
+
+def reserve_indices(count, index_file=INDEX_FILE):
+    """
+    hands out count data file indices, in a row, that no other run will be handed
+    :return: the first of them
+    """
+    with FileLock(index_file):
+        first_index = read_index(index_file) + 1
+        write_atomically(index_file, str(first_index + count))
+    return first_index
+
+def advance_index(index, index_file=INDEX_FILE):
+    """
+    makes sure the index in index_file is at least index (it never goes back: another run may have moved it on)
+    """
+    with FileLock(index_file):
+        if read_index(index_file) < index:
+            write_atomically(index_file, str(index))
@@ -0,0 +1,426 @@
+
+import sys, os, io, time, math, random, argparse, importlib, contextlib, statistics
+import SearchModel1, PremadeSimulations
+
+
+# * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+# * * * * * * * * Engine Equivalence Validation * * * * * * * * * *
+# * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+
+# Checks that an alternative engine (a faster way of running a trial) behaves like the reference engine,
+# SearchModel.run_whole_search. Both run the same ready-made simulation conditions; at each set size their
+# RT distributions are compared (two-sample Kolmogorov-Smirnov and Anderson-Darling), and so are their error
+# rates, mean attentional selections and mean eye movements, each against a tolerance. Run it from the
+# directory with data/ in it:
+#
+#   python EngineValidation.py --engine reference            # the reference against itself: a calibration run
+#   python EngineValidation.py --engine compiled --paired    # the compiled matching: should come out identical
+#   python EngineValidation.py --engine mymodule:run_trial   # any function(model) that runs one whole trial
+#
+# An engine is a function that takes a SearchModel that's had create_simulation called on it, runs one whole
+# trial, and leaves the outcome where run_whole_search leaves it: correct, stalled, timed_out, iteration,
+# num_attended and num_eye_movements.
+
+def reference_engine(model):
+    # the pure-Python engine everything else is checked against: items matched feature by feature, a step at a time,
+    # distances worked out item by item
+    model.COMPILED_SEARCH = False
+    model.FUSED_STEPPING  = False
+    model.LOCATION_TABLES = False
+    SearchModel1.SearchModel.run_whole_search(model)
+
+def compiled_engine(model):
+    # items matched by type, from match plans compiled from the feature vocabulary, the iterations while attention
+    # shifts run in one go, and distances looked up in location tables (should be identical, --paired)
+    model.COMPILED_SEARCH = True
+    model.FUSED_STEPPING  = True
+    model.LOCATION_TABLES = True
+    SearchModel1.SearchModel.run_whole_search(model)
+
+ENGINES = {'reference': reference_engine, 'compiled': compiled_engine} # engines by name; add to it with register_engine
+
+def register_engine(name, engine):
+    """
+    makes an engine available by name (e.g., to --engine)
+    :param engine: a function(model) that runs one whole trial (see the top of this file)
+    :return:
+    """
+    ENGINES[name] = engine
+
+def get_engine(name):
+    """
+    :param name: a registered engine's name, or 'module:function' for a function in an importable module
+    :return: the engine function
+    """
+    if name in ENGINES:
+        return ENGINES[name]
+    if ':' in name:
+        (module_name, function_name) = name.split(':', 1)
+        return getattr(importlib.import_module(module_name), function_name)
+    raise ValueError('EngineValidation: no engine called ' + str(name))
+
+# The means and error rates fail only if they differ by more than the tolerance even after allowing for sampling
+# error: if the (1 - alpha) confidence interval of the difference lies entirely outside the tolerance
+DEFAULT_TOLERANCE = {'alpha'        : 0.01, # RT tests' family-wise error rate over all the conditions (see holm_rejections)
+                     'mean_rt'      : 0.10, # mean RTs may differ by this proportion of the reference's
+                     'error_rate'   : 0.05, # error rates (proportions of finished trials) may differ by this much
+                     'selections'   : 0.10, # mean attentional selections may differ by this proportion
+                     'eye_movements': 0.10} # mean eye movements may differ by this proportion
+
+
+# * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+# * * * * * * * * * * Two-sample Statistics * * * * * * * * * *
+# * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+
+def ks_two_sample(sample1, sample2):
+    """
+    two-sample Kolmogorov-Smirnov test
+    :return: [D, p]: the largest gap between the samples' empirical CDFs, and its asymptotic p value
+             (conservative when there are ties, as there are with RTs in iterations)
+    """
+    n1 = len(sample1)
+    n2 = len(sample2)
+    if n1 == 0 or n2 == 0:
+        return [None, None]
+    sorted1 = sorted(sample1)
+    sorted2 = sorted(sample2)
+    i1 = 0
+    i2 = 0
+    d  = 0.0
+    for value in sorted(set(sorted1) | set(sorted2)):
+        while i1 < n1 and sorted1[i1] <= value: i1 += 1
+        while i2 < n2 and sorted2[i2] <= value: i2 += 1
+        d = max(d, abs(float(i1)/n1 - float(i2)/n2))
+    en = math.sqrt(float(n1*n2)/(n1 + n2))
+    return [d, kolmogorov_q((en + 0.12 + 0.11/en) * d)]
+
+def kolmogorov_q(x):
+    # the Kolmogorov distribution's complementary CDF: P(K > x)
+    if x < 0.2:
+        return 1.0
+    total = 0.0
+    sign  = 1.0
+    for j in range(1, 101):
+        term = sign * math.exp(-2.0 * j * j * x * x)
+        total += term
+        if abs(term) < 1e-10:
+            break
+        sign = -sign
+    return max(0.0, min(1.0, 2.0 * total))
+
+# Scholz & Stephens (1987) critical values of the standardized k-sample Anderson-Darling statistic:
+# critical value = b0 + b1/sqrt(k-1) + b2/(k-1) at each significance level
+AD_SIGNIFICANCE = [0.25, 0.1, 0.05, 0.025, 0.01, 0.005, 0.001]
+AD_B0 = [0.675, 1.281, 1.645, 1.96, 2.326, 2.573, 3.085]
+AD_B1 = [-0.245, 0.25, 0.678, 1.149, 1.822, 2.364, 3.615]
+AD_B2 = [-0.105, -0.305, -0.362, -0.391, -0.396, -0.345, -0.154]
+
+def anderson_darling_k_sample(samples):
+    """
+    k-sample Anderson-Darling test (Scholz & Stephens, 1987), in the version for samples with ties
+    :param samples: a list of k >= 2 lists of numbers
+    :return: [A, p]: the standardized statistic, and its p value, interpolated from the table of critical values
+             (capped at 0.25 above the table, and extrapolated below 0.001, so it's only approximate down there)
+    """
+    k = len(samples)
+    n = [len(sample) for sample in samples]
+    N = sum(n)
+    if k < 2 or min(n) == 0 or N < 4:
+        return [None, None]
+    pooled   = sorted([value for sample in samples for value in sample])
+    distinct = sorted(set(pooled))
+    if len(distinct) == 1:
+        return [0.0, AD_SIGNIFICANCE[0]] # nothing to tell them apart
+
+    # the number of ties at each distinct value, and each sample's count below and at each value
+    ties = {}
+    for value in pooled:
+        ties[value] = ties.get(value, 0) + 1
+    counts = []
+    for sample in samples:
+        count = {}
+        for value in sample:
+            count[value] = count.get(value, 0) + 1
+        counts.append(count)
+
+    a2 = 0.0
+    for i in range(k):
+        inner = 0.0
+        below = 0    # sample i's values below this one
+        pooled_below = 0
+        for value in distinct:
+            l = ties[value]
+            f = counts[i].get(value, 0)
+            m = below + f/2.0
+            b = pooled_below + l/2.0
+            denominator = b*(N - b) - N*l/4.0
+            if denominator > 0:
+                inner += (float(l)/N) * (N*m - n[i]*b)**2 / denominator
+            below += f
+            pooled_below += l
+        a2 += inner / n[i]
+    a2 *= float(N - 1) / N
+
+    # its variance under the null hypothesis
+    H = sum([1.0/size for size in n])
+    h = sum([1.0/i for i in range(1, N)])
+    g = 0.0
+    tail = 0.0 # sum over i < j of 1/(N - i)
+    for j in range(2, N):
+        tail += 1.0/(N - (j - 1))
+        g += tail / j
+    a = (4*g - 6)*(k - 1) + (10 - 6*g)*H
+    b = (2*g - 4)*k*k + 8*h*k + (2*g - 14*h - 4)*H - 8*h + 4*g - 6
+    c = (6*h + 2*g - 2)*k*k + (4*h - 4*g + 6)*k + (2*h - 6)*H + 4*h
+    d = (2*h + 6)*k*k - 4*h*k
+    variance = (a*N**3 + b*N**2 + c*N + d) / ((N - 1.0)*(N - 2.0)*(N - 3.0))
+    statistic = (a2 - (k - 1)) / math.sqrt(variance)
+
+    # p value: interpolate log(significance) linearly between the critical values
+    m = k - 1
+    critical = [AD_B0[index] + AD_B1[index]/math.sqrt(m) + AD_B2[index]/m for index in range(len(AD_SIGNIFICANCE))]
+    if statistic <= critical[0]:
+        return [statistic, AD_SIGNIFICANCE[0]]
+    for index in range(1, len(critical)):
+        if statistic < critical[index] or index == len(critical) - 1:
+            fraction = (statistic - critical[index-1]) / (critical[index] - critical[index-1])
+            log_p = math.log(AD_SIGNIFICANCE[index-1]) + fraction*(math.log(AD_SIGNIFICANCE[index]) - math.log(AD_SIGNIFICANCE[index-1]))
+            return [statistic, max(math.exp(log_p), 1e-12)]
+
+def holm_rejections(p_values, alpha):
+    """
+    Holm's step-down correction, for testing many conditions with a family-wise error rate of alpha
+    :param p_values: a list of p values (None for no test)
+    :return: a list of booleans: whether each test is rejected
+    """
+    order = sorted([index for index in range(len(p_values)) if p_values[index] is not None], key=lambda index: p_values[index])
+    rejected = [False] * len(p_values)
+    for rank in range(len(order)):
+        if p_values[order[rank]] > alpha / (len(order) - rank):
+            break
+        rejected[order[rank]] = True
+    return rejected
+
+def mean(values):
+    if not values:
+        return None
+    return float(sum(values)) / len(values)
+
+def excess_difference(values, reference_values, alpha):
+    """
+    :return: how far apart the means of two samples are beyond what sampling error explains: the distance
+             from zero to the nearer end of the (1 - alpha) confidence interval of their difference (0 if it spans
+             zero), as a proportion of the reference's mean (of 1, if that's smaller). None if either is empty
+    """
+    if not values or not reference_values:
+        return None
+    difference = abs(mean(values) - mean(reference_values))
+    standard_error = 0.0
+    for sample in (values, reference_values):
+        if len(sample) > 1:
+            standard_error += statistics.variance(sample) / len(sample)
+    z = statistics.NormalDist().inv_cdf(1.0 - alpha/2.0)
+    return max(0.0, difference - z*math.sqrt(standard_error)) / max(abs(mean(reference_values)), 1.0)
+
+def excess_rate_difference(count, total, reference_count, reference_total, alpha):
+    """
+    like excess_difference, but for two proportions (count/total), and not relative to the reference
+    """
+    if not total or not reference_total:
+        return None
+    rate = float(count) / total
+    reference_rate = float(reference_count) / reference_total
+    standard_error = math.sqrt(rate*(1 - rate)/total + reference_rate*(1 - reference_rate)/reference_total)
+    z = statistics.NormalDist().inv_cdf(1.0 - alpha/2.0)
+    return max(0.0, abs(rate - reference_rate) - z*standard_error)
+
+
+# * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+# * * * * * * * * * * Running the Engines * * * * * * * * * * *
+# * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+
+class EngineValidation(object):
+    """
+    Runs a reference and an alternative engine on the ready-made simulations' conditions and compares them
+    """
+    def __init__(self, engine, reference=reference_engine, sim_ids=None, num_trials=200, seed=1, paired=False, tolerance=None):
+        """
+        :param engine: the engine to validate: a function(model) that runs one whole trial
+        :param reference: the engine to validate it against
+        :param sim_ids: which ready-made simulations (keys of PremadeSimulations.PREMADE_SIMULATIONS); None means all
+        :param num_trials: trials per engine at each set size of each condition
+        :param seed: the random seed
+        :param paired: give both engines the same seed (an engine that uses the random numbers in the same order
+                       should then match exactly); otherwise the alternative gets a different seed, and the
+                       comparison is purely statistical
+        :param tolerance: overrides for DEFAULT_TOLERANCE
+        """
+        if sim_ids is None: sim_ids = sorted(PremadeSimulations.PREMADE_SIMULATIONS)
+        self.engine     = engine
+        self.reference  = reference
+        self.sim_ids    = sim_ids
+        self.num_trials = num_trials
+        self.seed       = seed
+        self.paired     = paired
+        self.tolerance  = dict(DEFAULT_TOLERANCE)
+        if tolerance:
+            self.tolerance.update(tolerance)
+        self.VERBOSE    = True
+
+    def run_engine(self, engine, sim_id, target, distractor_list, seed):
+        """
+        runs num_trials trials of one condition with one engine, on a freshly configured model
+        :return: the outcomes: a dictionary of lists (rts, selections and eye movements of correct trials) and counts
+        """
+        model = SearchModel1.SearchModel()
+        PremadeSimulations.configure_model(model, sim_id)
+        # create_simulation prints the relevant dimensions every time: keep that out of the report
+        with contextlib.redirect_stdout(io.StringIO()):
+            model.create_simulation(target, distractor_list)
+        random.seed(seed)
+        outcomes = {'rts': [], 'selections': [], 'eye_movements': [], 'errors': 0, 'stalled': 0, 'cut_off': 0}
+        for trial in range(self.num_trials):
+            engine(model)
+            if model.timed_out:
+                outcomes['cut_off'] += 1
+            elif model.stalled:
+                outcomes['stalled'] += 1
+            elif model.correct: # like run_suite, only correct trials count toward the means
+                outcomes['rts'].append(model.iteration)
+                outcomes['selections'].append(model.num_attended)
+                outcomes['eye_movements'].append(model.num_eye_movements)
+            else:
+                outcomes['errors'] += 1
+        return outcomes
+
+    def compare(self, reference, alternative):
+        """
+        compares two engines' outcomes on one condition against self.tolerance
+        :return: a dictionary of the statistics, plus 'failures': a list of what was out of tolerance
+        """
+        comparison = {'failures': []}
+        [comparison['ks_d'], comparison['ks_p']] = ks_two_sample(reference['rts'], alternative['rts'])
+        [comparison['ad'], comparison['ad_p']]   = anderson_darling_k_sample([reference['rts'], alternative['rts']])
+        comparison['identical'] = reference == alternative
+        # the RT tests are judged over all the conditions together, in run
+        if (len(reference['rts']) == 0) != (len(alternative['rts']) == 0):
+            comparison['failures'].append('only one engine had correct trials')
+
+        for (key, tolerance_key) in (('rts', 'mean_rt'), ('selections', 'selections'), ('eye_movements', 'eye_movements')):
+            comparison['mean_' + key] = [mean(reference[key]), mean(alternative[key])]
+            excess = excess_difference(alternative[key], reference[key], self.tolerance['alpha'])
+            if excess is not None and excess > self.tolerance[tolerance_key]:
+                comparison['failures'].append('mean %s differs by more than %.1f%% (at least %.1f%%)' % (key, 100*self.tolerance[tolerance_key], 100*excess))
+
+        error_rates = []
+        finished    = []
+        for outcomes in (reference, alternative):
+            finished.append(len(outcomes['rts']) + outcomes['errors'])
+            if finished[-1]: error_rates.append(float(outcomes['errors']) / finished[-1])
+            else: error_rates.append(None)
+        comparison['error_rates'] = error_rates
+        excess = excess_rate_difference(alternative['errors'], finished[1], reference['errors'], finished[0], self.tolerance['alpha'])
+        if excess is not None and excess > self.tolerance['error_rate']:
+            comparison['failures'].append('error rates differ: %.3f vs. %.3f' % (error_rates[0], error_rates[1]))
+        comparison['stalled'] = [reference['stalled'], alternative['stalled']]
+        return comparison
+
+    def run(self):
+        """
+        runs both engines on every set size of every condition of the chosen simulations
+        :return: a list of (sim_id, condition, num_distractors, comparison), comparison from compare
+        """
+        results = []
+        if self.paired: alternative_seed = self.seed
+        else: alternative_seed = self.seed + 1
+        for sim_id in self.sim_ids:
+            for (target, distractors, condition, num_distractors_list, num_runs) in PremadeSimulations.PREMADE_SIMULATIONS[sim_id]['suites']:
+                for num_distractors in num_distractors_list:
+                    distractor_list = PremadeSimulations.make_distractor_list(distractors, num_distractors)
+                    reference   = self.run_engine(self.reference, sim_id, [target[0], 1], distractor_list, self.seed)
+                    alternative = self.run_engine(self.engine, sim_id, [target[0], 1], distractor_list, alternative_seed)
+                    comparison  = self.compare(reference, alternative)
+                    results.append((sim_id, condition, num_distractors, comparison))
+                    if self.VERBOSE:
+                        print( 'Ran SIM%i condition %i, %i distractors' % (sim_id, condition, num_distractors))
+
+        # with this many conditions, some p values are bound to be small by chance: control the error rate over all of them
+        for (key, test_name) in (('ks_p', 'KS'), ('ad_p', 'AD')):
+            rejections = holm_rejections([comparison[key] for (sim_id, condition, num_distractors, comparison) in results], self.tolerance['alpha'])
+            for index in range(len(results)):
+                if rejections[index]:
+                    results[index][3]['failures'].insert(0, 'RT distributions differ (%s p = %.2g)' % (test_name, results[index][3][key]))
+        return results
+
+def format_report(results, engine_name, validation):
+    """
+    :param results: from EngineValidation.run
+    :return: the report, as a list of lines of text; the last says whether the engine passed
+    """
+    lines = ['Validation of engine ' + engine_name + ' against the reference engine',
+             time.strftime('%Y-%m-%d %H:%M:%S'),
+             '%i trials per engine per condition; seed %i (%s)' % (validation.num_trials, validation.seed, ('paired' if validation.paired else 'independent')),
+             'RT tests: family-wise alpha over all conditions (Holm). Means and error rates: per-condition confidence intervals',
+             'Tolerance: ' + ', '.join(['%s = %s' % (key, validation.tolerance[key]) for key in sorted(validation.tolerance)]),
+             '',
+             'sim\tcond\tn\tks_p\tad_p\trt (ref/alt)\t\tsel (ref/alt)\t\teye (ref/alt)\t\terr (ref/alt)\tresult']
+    num_failed = 0
+    for (sim_id, condition, num_distractors, comparison) in results:
+        fields = [str(sim_id), str(condition), str(num_distractors)]
+        for key in ('ks_p', 'ad_p'):
+            if comparison[key] is None: fields.append('-')
+            else: fields.append('%.2g' % comparison[key])
+        for key in ('mean_rts', 'mean_selections', 'mean_eye_movements', 'error_rates'):
+            fields.append('/'.join([('-' if value is None else '%.2f' % value) for value in comparison[key]]) + '\t')
+        if comparison['failures']:
+            num_failed += 1
+            fields.append('FAIL: ' + '; '.join(comparison['failures']))
+        elif comparison['identical']:
+            fields.append('pass (identical)')
+        else:
+            fields.append('pass')
+        lines.append('\t'.join(fields))
+    lines.append('')
+    if num_failed:
+        lines.append('FAILED: %i of %i conditions out of tolerance' % (num_failed, len(results)))
+    else:
+        lines.append('PASSED: all %i conditions within tolerance' % len(results))
+    return lines
+
+
+# * * * * * * * * * * * * * * * * * * * * * * * * * * *
+# * * * * * * * * * * * Main Body * * * * * * * * * * *
+# * * * * * * * * * * * * * * * * * * * * * * * * * * *
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description='Check that an alternative search engine behaves like the reference engine')
+    parser.add_argument('--engine', default='reference', help="engine to validate: a registered name or 'module:function'")
+    parser.add_argument('--sims', type=int, nargs='+', help='ready-made simulations to run (default: all)')
+    parser.add_argument('--trials', type=int, default=200, help='trials per engine at each set size of each condition')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--paired', action='store_true', help='give both engines the same random seed')
+    for key in sorted(DEFAULT_TOLERANCE):
+        parser.add_argument('--' + key.replace('_', '-'), type=float, default=DEFAULT_TOLERANCE[key], help='tolerance (see DEFAULT_TOLERANCE)')
+    parser.add_argument('--output', help='report file (default: data/validation/<engine>_<date>_<time>.txt)')
+    args = parser.parse_args(arguments)
+
+    tolerance  = dict((key, getattr(args, key)) for key in DEFAULT_TOLERANCE)
+    validation = EngineValidation(get_engine(args.engine), reference_engine, args.sims, args.trials, args.seed, args.paired, tolerance)
+    lines = format_report(validation.run(), args.engine, validation)
+    for line in lines:
+        print( line)
+
+    output = args.output
+    if not output:
+        output = 'data/validation/' + args.engine.replace(':', '_') + '_' + time.strftime('%Y%m%d_%H%M%S') + '.txt'
+    directory = os.path.dirname(output)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory)
+    report_file = open(output, 'w')
+    report_file.write('\n'.join(lines) + '\n')
+    report_file.close()
+    print( 'Report saved to ' + output)
+    return lines[-1].startswith('FAILED')
+
+if __name__ == '__main__':
+    sys.exit(main() and 1)
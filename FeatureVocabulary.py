@@ -0,0 +1,174 @@
+
+import bisect
+
+try:
+    import numpy
+    NUMPY_FAILED = False
+except:
+    NUMPY_FAILED = True
+
+
+# * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+# * * * * * * * * * Run-length Feature Vectors * * * * * * * * * *
+# * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+
+# Feature vectors are mostly 0s, and the long ones (e.g., the Pomerantz shapes' 2 * POMERANTZ_UNITS emergent
+# features) are long runs of the same value. So parts are stored as runs: a list of (start, stop, value), in order,
+# for every stretch vector[start:stop] of one non-zero value. Everything not in a run is 0
+
+def run_length_encode(vector):
+    """
+    :param vector: a feature vector (list of numbers)
+    :return: its runs of non-zero values: [(start, stop, value)...]
+    """
+    runs  = []
+    start = 0
+    for i in range(1, len(vector) + 1):
+        if i == len(vector) or vector[i] != vector[start]:
+            if vector[start] != 0:
+                runs.append((start, i, vector[start]))
+            start = i
+    return runs
+
+def run_length_decode(runs, width):
+    """
+    :param runs: a vector's runs (see run_length_encode)
+    :param width: the vector's length
+    :return: the vector, as a list
+    """
+    vector = [0] * width
+    for (start, stop, value) in runs:
+        vector[start:stop] = [value] * (stop - start)
+    return vector
+
+def value_at(runs, starts, i):
+    """
+    :param runs: a vector's runs (see run_length_encode)
+    :param starts: the starts of the runs (to bisect)
+    :return: the vector's value at i
+    """
+    run = bisect.bisect_right(starts, i) - 1
+    if run >= 0 and i < runs[run][1]:
+        return runs[run][2]
+    return 0
+
+class FeatureLists(object):
+    """
+    an item type's feature lists (one dense vector per part), as the feature-by-feature code reads them. reading them
+    expands the parts' runs, once, so the dense lists only exist for types that code actually looks at
+    """
+    def __init__(self, vocabulary, part_ids):
+        self.vocabulary = vocabulary
+        self.part_ids   = part_ids
+        self.lists      = None
+
+    def expand(self):
+        if self.lists is None:
+            self.lists = [self.vocabulary.part_row(part_id) for part_id in self.part_ids]
+        return self.lists
+
+    def __len__(self):
+        return len(self.part_ids) # (no need to expand for this)
+
+    def __getitem__(self, index):
+        return self.expand()[index]
+
+    def __iter__(self):
+        return iter(self.expand())
+
+    def __repr__(self):
+        return repr(self.expand())
+
+
+# * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+# * * * * * * * * * * Interned Item Features * * * * * * * * * * *
+# * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+
+class FeatureVocabulary(object):
+    """
+    Interns the parts search items are made of ([color, shape, relational role]) and the item types made of them
+    (lists of parts) as small integer ids. Every item of a type shares its type's feature vectors, and items can be
+    compared by type (see SearchModel.compile_match_plan) rather than feature by feature. Parts are stored as runs
+    (see run_length_encode); for array work, every part's feature vector is also a row of one dense int8 matrix
+    (see part_matrix)
+    """
+    def __init__(self, color_vectors, shape_vectors, relation_vectors):
+        """
+        :param color_vectors, shape_vectors, relation_vectors: the model's dictionaries of feature vectors by name.
+               a part's vector is read when the part is first interned, so changes to them after that don't show
+        """
+        self.color_vectors    = color_vectors
+        self.shape_vectors    = shape_vectors
+        self.relation_vectors = relation_vectors
+
+        self.part_ids   = {}   # (color, shape, role) -> part id
+        self.parts      = []   # part id -> (color, shape, role)
+        self.part_runs  = []   # part id -> the runs of its feature vector, color + shape + relation
+        self.part_starts = []  # part id -> the starts of its runs (for value_at)
+        self.part_widths = []  # part id -> the length of its feature vector
+        self.part_rows  = {}   # part id -> its feature vector, for the parts that have been expanded (see part_row)
+        self.type_ids   = {}   # tuple of part ids -> type id
+        self.type_parts = []   # type id -> tuple of part ids
+        self.type_rows  = []   # type id -> its parts' feature vectors, a FeatureLists (an item's feature_lists)
+        self.matrix     = None # the part matrix, made when it's asked for (see part_matrix)
+
+    def part_id(self, part):
+        """
+        :param part: [color, shape, relational role]
+        :return: the part's id, interning it if it's new
+        """
+        key = (part[0], part[1], part[2])
+        if not key in self.part_ids:
+            row = []
+            row.extend(self.color_vectors[key[0]])
+            row.extend(self.shape_vectors[key[1]])
+            row.extend(self.relation_vectors[key[2]])
+            runs = run_length_encode(row)
+            self.part_ids[key] = len(self.parts)
+            self.parts.append(key)
+            self.part_runs.append(runs)
+            self.part_starts.append([run[0] for run in runs])
+            self.part_widths.append(len(row))
+            self.matrix = None # it's missing the new row
+        return self.part_ids[key]
+
+    def type_id(self, parts):
+        """
+        :param parts: a list of parts (item_properties[0] in SearchModel)
+        :return: the id of the item type with those parts, in that order, interning it if it's new
+        """
+        part_ids = tuple([self.part_id(part) for part in parts])
+        if not part_ids in self.type_ids:
+            self.type_ids[part_ids] = len(self.type_parts)
+            self.type_parts.append(part_ids)
+            self.type_rows.append(FeatureLists(self, part_ids))
+        return self.type_ids[part_ids]
+
+    def part_row(self, part_id):
+        """
+        :return: the part's feature vector, as a list (expanded from its runs the first time it's asked for)
+        """
+        if not part_id in self.part_rows:
+            self.part_rows[part_id] = run_length_decode(self.part_runs[part_id], self.part_widths[part_id])
+        return self.part_rows[part_id]
+
+    def part_value(self, part_id, i):
+        """
+        :return: the part's feature i (0 past the end of its vector)
+        """
+        return value_at(self.part_runs[part_id], self.part_starts[part_id], i)
+
+    def part_matrix(self):
+        """
+        :return: every part's feature vector as a row (by part id) of an int8 array, as wide as the longest vector
+                 (shorter ones are padded with 0: no feature). None if numpy failed to load
+        """
+        if NUMPY_FAILED:
+            return None
+        if self.matrix is None:
+            width = max(self.part_widths + [0])
+            self.matrix = numpy.zeros((len(self.parts), width), dtype=numpy.int8)
+            for part_id in range(len(self.parts)):
+                for (start, stop, value) in self.part_runs[part_id]:
+                    self.matrix[part_id, start:stop] = value
+        return self.matrix
@@ -14,8 +14,101 @@ except:
     # self.parent.graphics_failed = True
     # write a file telling program that pygame has failed
 
+import SearchModel1, TraceRecorder, threading, queue, multiprocessing, math, os
 
 
+def snapshot_state(model):
+    """
+    :param model: a SearchModel
+    :return: the moving parts of its state that show on the screen, as a dictionary like
+             TraceRecorder.RecordedTrial.state_at's (see GraphicalRun.apply_state)
+    """
+    if model.selected_item:
+        selected = model.selected_item.index
+    else:
+        selected = -1
+    if model.found_target:
+        found = model.found_target.index
+    else:
+        found = -1
+    return {'iteration': model.iteration,
+            'selected' : selected,
+            'found'    : found,
+            'fixation' : list(model.fixation),
+            'rejected' : [item.rejected for item in model.search_items]}
+
+def describe_model_display(model):
+    """
+    :param model: a SearchModel, after init_search (which assigns the locations)
+    :return: the fixed parts of its display, as the arguments of GraphicalRun.new_view_model
+    """
+    items = model.search_items
+    return {'cartesian_grid' : model.CARTESIAN_GRID,
+            'display_center' : model.DISPLAY_CENTER,
+            'display_radius' : model.DISPLAY_RADIUS,
+            'item_radius'    : model.ITEM_RADIUS,
+            'item_properties': [item.item_properties for item in items],
+            'item_names'     : [item.name for item in items],
+            'is_target'      : [item.is_target for item in items],
+            'locations'      : [list(item.location) for item in items]}
+
+
+# * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+# * * * * * * * * Running the model on its own thread * * * * * * * *
+# * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+
+class SimulationWorker(threading.Thread):
+    """
+    Steps a model through a search on its own thread, putting a snapshot of its state after every step into a
+    bounded queue (self.frames) for GraphicalRun.run to draw. The model can run ahead of the display by up to
+    queue_size frames; after that, it waits for the display to catch up.
+    Each snapshot is a dictionary like TraceRecorder.RecordedTrial.state_at's, plus 'done', which is True for
+    the last one.
+    """
+    def __init__(self, model, queue_size=256):
+        """
+        :param model: the SearchModel, after init_search. Only this thread touches it until the thread ends
+        :param queue_size: how many frames the model can run ahead of the display
+        """
+        threading.Thread.__init__(self)
+        self.daemon   = True # don't keep the program alive if the window is closed mid-search
+        self.model    = model
+        self.frames   = queue.Queue(queue_size)
+        self.stopping = threading.Event()
+
+    def run(self):
+        all_done = False
+        self.put(self.snapshot(all_done)) # the state after init_search
+        while not all_done and not self.stopping.is_set():
+            all_done = self.model.run_search_step()
+            self.put(self.snapshot(all_done))
+        if all_done:
+            self.model.analyze_result()
+
+    def stop(self):
+        """
+        asks the thread to stop after the current step (e.g., the user quit before the search was done)
+        """
+        self.stopping.set()
+
+    def put(self, frame):
+        # wait for room in the queue, but keep checking whether it's time to stop
+        while not self.stopping.is_set():
+            try:
+                self.frames.put(frame, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def snapshot(self, done):
+        """
+        :param done: whether the search is done
+        :return: the state of the model, for drawing
+        """
+        state = snapshot_state(self.model)
+        state['done'] = done
+        return state
+
 
 # * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
 # * * * * * * * * * * Not a complete interface, just a single run * * * * * * * * * * * *
@@ -26,14 +119,25 @@ class GraphicalRun(object):
     The graphical interface for the Attention Model
     """
 
-    def __init__(self, main_interface, height=1000, width=1000):
-
-        self.model   = main_interface.model
-        self.parent  = main_interface # the main (non-graphical) interface is the parent of this one
-        self.VERBOSE = False
+    def __init__(self, main_interface, height=1000, width=1000, headless=False):
+        """
+        :param main_interface: the SearchModelInterface; None for a headless renderer with no model of its own
+        :param headless: draw off screen, with no window (e.g., to export images from a batch job)
+        """
+        if main_interface:
+            self.model = main_interface.model
+        else:
+            self.model = None
+        self.parent   = main_interface # the main (non-graphical) interface is the parent of this one
+        self.headless = headless
+        self.VERBOSE  = False
 
         self.wait = True  # wait for user to keypress between iterations
 
+        # live runs (see run)
+        self.FRAME_RATE = 30  # frames drawn per second
+        self.QUEUE_SIZE = 256 # how many iterations the model can run ahead of the display
+
         # try:
         #     import pygame, sys  # , AttentionModel1, MainInterface
         #     from pygame.locals import *
@@ -83,9 +187,52 @@ class GraphicalRun(object):
         self.YELLOW = (255, 255, 50)
         self.ORANGE = (255, 96, 0)
         self.BROWN = (155, 30, 0)
+        self.SPRITE_KEY = (255, 0, 255) # the transparent color of item sprites (see make_sprite)
+
+        # the screen color of each color name in the model's color_vectors; names not here are drawn in BROWN
+        self.COLOR_RGB = {'white' : self.WHITE,
+                          'black' : self.BLACK,
+                          'red'   : self.RED,
+                          'green' : self.GREEN,
+                          'ltblue': self.LIGHTBLUE,
+                          'blue'  : self.BLUE,
+                          'yellow': self.YELLOW,
+                          'yel2ow': (230, 200, 0),
+                          'orange': self.ORANGE,
+                          'pink'  : (255, 150, 200),
+                          'dkgrn' : self.MIDDLEGREEN,
+                          'brown' : self.BROWN}
+
+        # how to draw each shape name in the model's shape_vectors, in a unit square: ('line', x1, y1, x2, y2) or
+        # ('circle', x, y, radius). shapes not here are drawn as filled circles. cheat/nocheat versions of a shape
+        # are drawn like the shape itself (see base_shape)
+        self.SHAPE_GLYPHS = {'vertical'  : [('line', 0.5, 0.0, 0.5, 1.0)],
+                             'horizontal': [('line', 0.0, 0.5, 1.0, 0.5)],
+                             'T1'        : [('line', 0.0, 0.0, 1.0, 0.0), ('line', 0.5, 0.0, 0.5, 1.0)],
+                             'T2'        : [('line', 1.0, 0.0, 1.0, 1.0), ('line', 0.0, 0.5, 1.0, 0.5)],
+                             'T3'        : [('line', 0.0, 1.0, 1.0, 1.0), ('line', 0.5, 0.0, 0.5, 1.0)],
+                             'T4'        : [('line', 0.0, 0.0, 0.0, 1.0), ('line', 0.0, 0.5, 1.0, 0.5)],
+                             'L1'        : [('line', 0.0, 0.0, 0.0, 1.0), ('line', 0.0, 1.0, 1.0, 1.0)],
+                             'L2'        : [('line', 0.0, 0.0, 0.0, 1.0), ('line', 0.0, 0.0, 1.0, 0.0)],
+                             'L3'        : [('line', 1.0, 0.0, 1.0, 1.0), ('line', 0.0, 0.0, 1.0, 0.0)],
+                             'L4'        : [('line', 1.0, 0.0, 1.0, 1.0), ('line', 0.0, 1.0, 1.0, 1.0)],
+                             'X'         : [('line', 0.0, 0.0, 1.0, 1.0), ('line', 0.0, 1.0, 1.0, 0.0)],
+                             'O'         : [('circle', 0.5, 0.5, 0.5)],
+                             'Q'         : [('circle', 0.5, 0.5, 0.5), ('line', 0.6, 0.6, 1.0, 1.0)],
+                             'arrow'     : [('line', 0.5, 0.0, 0.5, 1.0), ('line', 0.5, 0.0, 0.0, 0.5), ('line', 0.5, 0.0, 1.0, 0.5)],
+                             'triangle'  : [('line', 0.5, 0.0, 0.0, 1.0), ('line', 0.0, 1.0, 1.0, 1.0), ('line', 1.0, 1.0, 0.5, 0.0)]}
+
+        # for the incremental renderer (see show_state)
+        self.sprite_cache  = {}   # item sprites by (parts, rejected, ring, radius): made once, reused forever
+        self.drawn_model   = None # the model whose state is on the screen
+        self.drawn_sprites = {}   # item index: the sprite key of what's on the screen at that item's location
+        self.text_rect     = None # where the iteration number is on the screen
 
         try:
-            pygame.init()
+            if headless:
+                pygame.font.init() # the only part of pygame that drawing off screen needs
+            else:
+                pygame.init()
             #
             # screen set-up
             # infoObject = pygame.display.Info()
@@ -99,126 +246,231 @@ class GraphicalRun(object):
             self.horiz_midline = int(round(self.screen_height / 2))
             #
             # pygame.display.set_mode((infoObject.current_w, infoObject.current_h))
-            self.screen = pygame.display.set_mode((self.screen_width, self.screen_height))
+            if headless:
+                self.screen = pygame.Surface((self.screen_width, self.screen_height))
+            else:
+                self.screen = pygame.display.set_mode((self.screen_width, self.screen_height))
             self.largefont = pygame.font.SysFont('futura', self.large_text_height)
             self.smallfont = pygame.font.SysFont('futura', self.small_text_height)
             self.medfont = pygame.font.SysFont('futura', self.med_text_height)
-            pygame.mouse.set_visible(True)
             pygame.font.init()
-            #
-            self.parent.GRAPHIC = True
-            print
-            print( '* * * * * * * * * * *')
-            print( 'Graphics initialized')
-            print( '* * * * * * * * * * *')
-            print
+            if not headless:
+                pygame.mouse.set_visible(True)
+                #
+                self.parent.GRAPHIC = True
+                print
+                print( '* * * * * * * * * * *')
+                print( 'Graphics initialized')
+                print( '* * * * * * * * * * *')
+                print
         except:
             print
             print( '* * * * * * * * * * * * * * * * * *')
             print( 'Graphics failed to init: No pygame.')
             print( '* * * * * * * * * * * * * * * * * *')
             print
-            self.parent.graphics_failed = True
+            if self.parent:
+                self.parent.graphics_failed = True
             return None
 
     def init_display(self):
         # if you haven't initialized the graphics yet, the do so
         # self.set_up_graphics()
         self.screen.fill(self.LIGHTGRAY)
-        pygame.display.update()
+        self.update_display()
+        # the screen is blank: the next show_state draws everything
+        self.drawn_model = None
 
     def close_display(self):
         # kill the graphics
         pygame.display.quit()
         pygame.quit()
 
-    def draw_item(self, item, rejected_list):
+    def update_display(self, rects=None):
+        # push what's been drawn to the window: all of it, or just rects. headless, there's no window to push to
+        if self.headless:
+            return
+        if rects is None:
+            pygame.display.update()
+        else:
+            pygame.display.update(rects)
+
+    def base_shape(self, shape_name):
         """
-        dtaws a visual item
-        :param item: 
-        rejectedLlist is a boolean that is true if this function is called on units in the relected list
-        :return: 
+        :param shape_name: a shape name from the model's shape_vectors
+        :return: the name of the glyph to draw it with: e.g., 'X' for 'cheatXabove' and 'nocheatX'
         """
-
-        # draw rejected items in gray, others in their own color
-        if item.rejected or rejected_list:
-            color = self.GRAY
-        else:
-            if item.color == 'red':
-                color = self.RED
-            elif item.color == 'green':
-                color = self.GREEN
+        for prefix in ('nocheat', 'cheat'):
+            if shape_name.startswith(prefix):
+                shape_name = shape_name[len(prefix):]
+        for suffix in ('above', 'below'):
+            if shape_name.endswith(suffix):
+                shape_name = shape_name[:-len(suffix)]
+        return shape_name
+
+    def draw_glyph(self, surface, shape_name, color, box):
+        """
+        draws one part of an item
+        :param surface: what to draw on
+        :param shape_name: the part's shape
+        :param color: the rgb color to draw in
+        :param box: [x, y, width, height] of the part on the surface
+        :return:
+        """
+        [x, y, width, height] = box
+        glyph = self.SHAPE_GLYPHS.get(self.base_shape(shape_name))
+        if glyph is None:
+            # draw a filled circle if nothing else
+            pygame.draw.circle(surface, color, (x + width // 2, y + height // 2), min(width, height) // 2, 0)
+            return
+        for stroke in glyph:
+            if stroke[0] == 'line':
+                start = (int(x + stroke[1] * width), int(y + stroke[2] * height))
+                end   = (int(x + stroke[3] * width), int(y + stroke[4] * height))
+                pygame.draw.line(surface, color, start, end, 3)
             else:
-                color = self.BROWN
-
-        # draw everything within the rectangle self.location[0],self.location[1],ITEM_RADIUS*2,ITEM_RADIUS*2
-        # WHAT you draw depends on the item's shape
-        if item.shape == 'vertical':
-            # a vertical line through the middle of the rectangle
-            x1 = item.location[0] + self.model.ITEM_RADIUS
-            x2 = x1
-            y1 = item.location[1]
-            y2 = item.location[1] + 2 * self.model.ITEM_RADIUS
-            pygame.draw.line(self.screen, color, (x1, y1), (x2, y2), 3)
-        elif item.shape == 'horizontal':
-            # a horizontal line through the middle of the rectangle
-            x1 = item.location[0]
-            x2 = item.location[0] + 2 * self.model.ITEM_RADIUS
-            y1 = item.location[1] + self.model.ITEM_RADIUS
-            y2 = y1
-            pygame.draw.line(self.screen, color, (x1, y1), (x2, y2), 3)
-        else:
-            # DIAG
-            print( 'No Shape!')
+                center = (int(x + stroke[1] * width), int(y + stroke[2] * height))
+                pygame.draw.circle(surface, color, center, int(stroke[3] * min(width, height)), 2)
 
-            location = (item.location[0] + self.model.ITEM_RADIUS, item.location[1] + self.model.ITEM_RADIUS)
-            # draw a filled circle if nothing else
-            pygame.draw.circle(self.screen, color, location, self.model.ITEM_RADIUS, 0)
+    def make_sprite(self, parts, rejected, ring, radius):
+        """
+        pre-renders an item: its parts, in their colors (or gray if rejected), inside its selection ring
+        the sprite covers the item's square plus 1 pixel all around (for the ring); its corners are transparent,
+        and inside the ring it's opaque, so blitting it erases whatever was drawn for the item before
+        :param parts: a tuple of (color, shape, relational role) tuples
+        :param rejected: draw the parts in gray
+        :param ring: 'found', 'selected' or 'none'
+        :param radius: the model's ITEM_RADIUS
+        :return: the sprite (a pygame Surface)
+        """
+        size   = 2 * radius + 3
+        center = (radius + 1, radius + 1)
+        sprite = pygame.Surface((size, size))
+        sprite.fill(self.SPRITE_KEY)
+        sprite.set_colorkey(self.SPRITE_KEY)
+        # the opaque part: everything the found-target circle covers, which is more than the filled circle alone
+        pygame.draw.circle(sprite, self.LIGHTGRAY, center, radius + 1, 0)
+        pygame.draw.circle(sprite, self.LIGHTGRAY, center, radius + 1, 4)
+
+        for [color_name, shape_name, role] in parts:
+            # draw rejected items in gray, others in their own color
+            if rejected:
+                color = self.GRAY
+            else:
+                color = self.COLOR_RGB.get(color_name, self.BROWN)
+            # the parts of a relational item go one above the other
+            if role == 'above':
+                box = [1, 1, 2 * radius, radius]
+            elif role == 'below':
+                box = [1, radius + 1, 2 * radius, radius]
+            else:
+                box = [1, 1, 2 * radius, 2 * radius]
+            self.draw_glyph(sprite, shape_name, color, box)
 
-        # draw black circle around currently selected, light gray (background color) around everything else
-        location = (item.location[0] + self.model.ITEM_RADIUS, item.location[1] + self.model.ITEM_RADIUS)
+        # purple circle around the target once it's identified, black around the currently selected item
+        if ring == 'found':
+            pygame.draw.circle(sprite, self.PURPLE, center, radius + 1, 4)
+        elif ring == 'selected':
+            pygame.draw.circle(sprite, self.BLACK, center, radius + 1, 1)
+        return sprite
 
-        if item == self.model.found_target: # when the item is identified as the target, turn the selection circle yellow
-            color = self.PURPLE
-            thickness = 4
-        elif item == self.model.selected_item: # item.currently_selected:
-            color = self.BLACK
-            thickness = 1
+    def draw_item(self, item, rejected_list, model=None):
+        """
+        draws a visual item, if it looks different from what is already on the screen at its location
+        :param item: 
+        rejectedLlist is a boolean that is true if this function is called on units in the relected list
+        :param model: the model whose state to show; if None, self.model
+        :return: the rectangle of the screen that changed, or None if nothing did
+        """
+        if model is None:
+            model = self.model
+
+        # item_properties is [[[color, shape, relational role], ...], n]
+        parts    = tuple(tuple(part) for part in item.item_properties[0])
+        rejected = bool(item.rejected or rejected_list)
+        if item == model.found_target:
+            ring = 'found'
+        elif item == model.selected_item:
+            ring = 'selected'
         else:
-            color = self.LIGHTGRAY
-            thickness = 1
-        pygame.draw.circle(self.screen, color, location, self.model.ITEM_RADIUS + 1, thickness)
+            ring = 'none'
+        key = (parts, rejected, ring, model.ITEM_RADIUS)
+        if self.drawn_sprites.get(item.index) == key:
+            return None
 
-    def show_state(self):
+        sprite = self.sprite_cache.get(key)
+        if sprite is None:
+            sprite = self.make_sprite(parts, rejected, ring, model.ITEM_RADIUS)
+            self.sprite_cache[key] = sprite
+        self.drawn_sprites[item.index] = key
+        return self.screen.blit(sprite, (item.location[0] - 1, item.location[1] - 1))
+
+    def draw_display_outline(self, model):
         """
-        graphically show the state of the model with rejected items in gray
-        wait means ask the user for a keypress before moving on
-        :return: 
+        draws the outline of the search display
+        :param model: the model whose display to outline
+        :return:
         """
-        # show the search window
-        if self.model.CARTESIAN_GRID:
+        if model.CARTESIAN_GRID:
             # draw a square
-            x1 = self.model.DISPLAY_CENTER[0] - self.model.DISPLAY_RADIUS
-            y1 = self.model.DISPLAY_CENTER[1] - self.model.DISPLAY_RADIUS
-            width = height = 2 * self.model.DISPLAY_RADIUS
+            x1 = model.DISPLAY_CENTER[0] - model.DISPLAY_RADIUS
+            y1 = model.DISPLAY_CENTER[1] - model.DISPLAY_RADIUS
+            width = height = 2 * model.DISPLAY_RADIUS
             rect = (x1, y1, width, height)
             pygame.draw.rect(self.screen, self.BLACK, rect, 1)
         else:
             # craw a circle
-            pygame.draw.circle(self.screen, self.BLACK, self.model.DISPLAY_CENTER, self.model.DISPLAY_RADIUS, 1)
-
-        # show the iteration
-        self.blit_text(str(self.model.iteration))
+            pygame.draw.circle(self.screen, self.BLACK, model.DISPLAY_CENTER, model.DISPLAY_RADIUS, 1)
 
-        # show the items
-        for item in self.model.search_items:
-            self.draw_item(item, False) # False means Not from the rejected list
-        for item in self.model.rejected_items:
-            self.draw_item(item, True) # True means From the rejected list
-
-        pygame.display.update()
+    def show_state(self, model=None, wait=None):
+        """
+        graphically show the state of the model with rejected items in gray
+        only the items whose state has changed since the last call are redrawn, and only the parts of the screen
+        that changed are pushed to the display
+        wait means ask the user for a keypress before moving on
+        :param model: the model whose state to show; if None, self.model
+        :param wait: whether to wait for a keypress; if None, self.wait
+        :return: 
+        """
+        if model is None:
+            model = self.model
+        if wait is None:
+            wait = self.wait
+
+        redraw_all = model is not self.drawn_model
+        if redraw_all:
+            # a new model (or a cleared screen): start from scratch
+            self.screen.fill(self.LIGHTGRAY)
+            self.drawn_model   = model
+            self.drawn_sprites = {}
+            self.text_rect     = None
+
+        dirty_rects = []
+
+        # show the iteration, erasing the last one (which may have been longer)
+        if self.text_rect:
+            self.screen.fill(self.LIGHTGRAY, self.text_rect)
+            dirty_rects.append(self.text_rect)
+        self.text_rect = self.blit_text(str(model.iteration))
+        dirty_rects.append(self.text_rect)
+
+        # show the items (rejected ones are in search_items too, with item.rejected set)
+        num_text_rects = len(dirty_rects)
+        for item in model.search_items:
+            rect = self.draw_item(item, False, model) # False means Not from the rejected list
+            if rect:
+                dirty_rects.append(rect)
+
+        # show the search window. items at its edge overlap it, so redraw it if any item was redrawn
+        if redraw_all or len(dirty_rects) > num_text_rects:
+            self.draw_display_outline(model)
+
+        if redraw_all:
+            self.update_display()
+        else:
+            self.update_display(dirty_rects)
 
-        if self.wait:
+        if wait:
             self.get_keypress()
 
     def show_messages(self):
@@ -244,16 +496,16 @@ class GraphicalRun(object):
             the_text = self.smallfont.render(message, True, color, self.LIGHTGRAY)
         # 2) set it's location
         text_rect = [column * size / 2, line * size + 5, self.screen_width, size]
-        # 3) blit it to the screen
-        self.screen.blit(the_text, text_rect)
-        pygame.display.update()
+        # 3) blit it to the screen, and say where it went so the caller can update just that
+        return self.screen.blit(the_text, text_rect)
 
     def get_keypress(self, trigger=None):
         # it waits for the user to enter a key in order to move on
         # NOTE: pygame.key.name() always returns the lower case version of the key; integers 0...9 are seen as chars, not ints
         all_done = False
         while not all_done:
-            event_list = pygame.event.get()
+            # sleep until there's an event, rather than spinning on pygame.event.get()
+            event_list = [pygame.event.wait()]
             for event in event_list:
                 # process the_event according to what type of event it is
                 if event.type == pygame.QUIT:
@@ -277,214 +529,121 @@ class GraphicalRun(object):
                         return pygame.key.name(event.key)
 
 
-    def show_graphs(self, summary_rts = []):
-        pres_abs_toggle = True
-        maxRT = 0.0
-        minRT = 0.0
-        maxDists = None
-        minDists = 0.0
-        for suite in summary_rts:
-            for condition in suite:
-                for datapoint in condition[1]:
-                # format is [self.model.num_lures, rt_mean, rt_sem, num_errors])
-                #if not regression[-1]:              # no errors -- not sure this is necessary
-
-                    #if not minRT:
-                    #    minRT = datapoint[1]
-                    if datapoint[1] > maxRT: maxRT = datapoint[1]
-                    #elif datapoint[1] < minRT: minRT= datapoint[1]
-                    if not maxDists:
-                        maxDists = datapoint[0]
-                    elif datapoint[0] > maxDists: maxDists = datapoint[0]
-                    if not minDists:
-                        minDists = datapoint[0]
-                    elif datapoint[0] < minDists: minDists = datapoint[0]
-        upperBound = int(math.ceil(maxRT/10))*10
-        if upperBound > 50: ydivisions = 10
-        else: ydivisions = 5
+    def draw_suite_graph(self, suite, scale):
+        """
+        draws the graph of mean RT by number of distractors for one suite (one run_suite)
+        :param suite: a list of conditions: [title, [[num lures, rt mean, rt sem, num errors], ...]]
+        :param scale: from compute_graph_scale, so all the graphs of a run share their axes
+        :return: the title of the last condition
+        """
+        pres_abs_toggle = True # the first condition of a suite is target present
+        upperBound = scale['upper_bound']
+        ydivisions = scale['ydivisions']
+        maxDists   = scale['max_dists']
 
         buffer = 50
         width = 800
         height = 600
         rect = (0, 0, width, height)
 
-        for suite in summary_rts:
-            self.screen.fill(self.LIGHTGRAY)
-            pygame.draw.rect(self.screen, self.BLACK, rect, 1)
-            pygame.draw.line(self.screen, self.MIDDLEGRAY, (buffer, buffer), (buffer, height - buffer), 3)
-            pygame.draw.line(self.screen, self.MIDDLEGRAY, (buffer, height - buffer), (width - buffer, height - buffer), 3)
-            yscalingfactor = (height - 2 * buffer) / upperBound
-            xscalingfactor = (width - 2 * buffer) / maxDists
-
-            ymarker = height - buffer - ydivisions * yscalingfactor
-            ylabel = ydivisions
-            while ymarker > buffer:
-                pygame.draw.line(self.screen, self.GRAY, (buffer + 10, ymarker), (width - buffer, ymarker), 1)
+        self.screen.fill(self.LIGHTGRAY)
+        pygame.draw.rect(self.screen, self.BLACK, rect, 1)
+        pygame.draw.line(self.screen, self.MIDDLEGRAY, (buffer, buffer), (buffer, height - buffer), 3)
+        pygame.draw.line(self.screen, self.MIDDLEGRAY, (buffer, height - buffer), (width - buffer, height - buffer), 3)
+        yscalingfactor = (height - 2 * buffer) / upperBound
+        xscalingfactor = (width - 2 * buffer) / maxDists
+
+        ymarker = height - buffer - ydivisions * yscalingfactor
+        ylabel = ydivisions
+        while ymarker > buffer:
+            pygame.draw.line(self.screen, self.GRAY, (buffer + 10, ymarker), (width - buffer, ymarker), 1)
+            yaxis_text = self.smallfont.render(str(ylabel), True, self.MIDDLEGRAY, self.LIGHTGRAY)
+            # 2) set it's location
+            yaxistext_rect = [buffer - 40, ymarker - 10, 30, self.large_text_height]
+            ymarker -= ydivisions * yscalingfactor
+            ylabel += ydivisions
+
+            # 3) blit it to the screen
+            self.screen.blit(yaxis_text, yaxistext_rect)
+
+        title = ''
+        for condition in suite:
+            title = str(condition[0])
+            if  pres_abs_toggle == False:        # Target is absent
+
+
+                # For John
                 yaxis_text = self.smallfont.render(str(ylabel), True, self.MIDDLEGRAY, self.LIGHTGRAY)
                 # 2) set it's location
                 yaxistext_rect = [buffer - 40, ymarker - 10, 30, self.large_text_height]
-                ymarker -= ydivisions * yscalingfactor
-                ylabel += ydivisions
-
-                # 3) blit it to the screen
                 self.screen.blit(yaxis_text, yaxistext_rect)
 
-            for condition in suite:
-                if  pres_abs_toggle == False:        # Target is absent
-
-
-                    # For John
-                    yaxis_text = self.smallfont.render(str(ylabel), True, self.MIDDLEGRAY, self.LIGHTGRAY)
-                    # 2) set it's location
-                    yaxistext_rect = [buffer - 40, ymarker - 10, 30, self.large_text_height]
-                    self.screen.blit(yaxis_text, yaxistext_rect)
+                color = self.DARKBLUE
+                legend_text = self.smallfont.render("Absent", True, self.BLACK, self.LIGHTGRAY)
+                legend_rect = (width-2*buffer, buffer/2, width, buffer)
+                self.screen.blit(legend_text, legend_rect)
+                pygame.draw.circle(self.screen, color, (int(width - 2*buffer - 10), int(buffer / 2) + 5), 6)
 
-                    color = self.DARKBLUE
-                    legend_text = self.smallfont.render("Absent", True, self.BLACK, self.LIGHTGRAY)
-                    legend_rect = (width-2*buffer, buffer/2, width, buffer)
-                    self.screen.blit(legend_text, legend_rect)
-                    pygame.draw.circle(self.screen, color, (int(width - 2*buffer - 10), int(buffer / 2) + 5), 6)
-
-                else:
-                    color = self.ORANGE
-                    pygame.draw.circle(self.screen, color, (int(width - 2*buffer - 10), int(buffer / 2) + 20), 6)
-                    legend_text = self.smallfont.render("Present", True, self.BLACK, self.LIGHTGRAY)
-                    legend_rect = (width - 2*buffer, int(buffer / 2)+15, width, buffer+20)
-                    self.screen.blit(legend_text, legend_rect)
-                    title_text = self.medfont.render(str(condition[0]), True, self.BLACK, self.LIGHTGRAY)
-                    title_rect = [buffer, buffer / 2, width - 5*buffer, 3*buffer]
+            else:
+                color = self.ORANGE
+                pygame.draw.circle(self.screen, color, (int(width - 2*buffer - 10), int(buffer / 2) + 20), 6)
+                legend_text = self.smallfont.render("Present", True, self.BLACK, self.LIGHTGRAY)
+                legend_rect = (width - 2*buffer, int(buffer / 2)+15, width, buffer+20)
+                self.screen.blit(legend_text, legend_rect)
+                title_text = self.medfont.render(str(condition[0]), True, self.BLACK, self.LIGHTGRAY)
+                title_rect = [buffer, buffer / 2, width - 5*buffer, 3*buffer]
 
 
-                    self.screen.blit(title_text, title_rect)
-                #Draw points on graph and put on x-axis marks
-                for pointindex in range(len(condition[1])):
-                    pygame.draw.circle(self.screen, color, (int(buffer + int(round(condition[1][pointindex][0])*xscalingfactor)), int(height-buffer-int(round(condition[1][pointindex][1]))*yscalingfactor)), 6)
-                    xaxis_text = self.smallfont.render(str(condition[1][pointindex][0]), True, self.MIDDLEGRAY,
-                                                       self.LIGHTGRAY)
-                    xaxistext_rect = [int(buffer + round(condition[1][pointindex][0] * xscalingfactor)),
-                                      height - buffer + 20, 30, self.large_text_height]
-                    self.screen.blit(xaxis_text, xaxistext_rect)
+                self.screen.blit(title_text, title_rect)
+            #Draw points on graph and put on x-axis marks
+            for pointindex in range(len(condition[1])):
+                pygame.draw.circle(self.screen, color, (int(buffer + int(round(condition[1][pointindex][0])*xscalingfactor)), int(height-buffer-int(round(condition[1][pointindex][1]))*yscalingfactor)), 6)
+                xaxis_text = self.smallfont.render(str(condition[1][pointindex][0]), True, self.MIDDLEGRAY,
+                                                   self.LIGHTGRAY)
+                xaxistext_rect = [int(buffer + round(condition[1][pointindex][0] * xscalingfactor)),
+                                  height - buffer + 20, 30, self.large_text_height]
+                self.screen.blit(xaxis_text, xaxistext_rect)
 
-                #Draw lines in between points
-                for pointindex in range(len(condition[1])-1):
-                    pygame.draw.line(self.screen, color, (int(buffer + int(round(condition[1][pointindex][0])*xscalingfactor)), int(height-buffer-int(round(condition[1][pointindex][1]))*yscalingfactor)), (int(buffer + int(round(condition[1][pointindex+1][0])*xscalingfactor)), int(height-buffer-int(round(condition[1][pointindex+1][1]))*yscalingfactor)),3)
+            #Draw lines in between points
+            for pointindex in range(len(condition[1])-1):
+                pygame.draw.line(self.screen, color, (int(buffer + int(round(condition[1][pointindex][0])*xscalingfactor)), int(height-buffer-int(round(condition[1][pointindex][1]))*yscalingfactor)), (int(buffer + int(round(condition[1][pointindex+1][0])*xscalingfactor)), int(height-buffer-int(round(condition[1][pointindex+1][1]))*yscalingfactor)),3)
 
 
-                pres_abs_toggle = not pres_abs_toggle
+            pres_abs_toggle = not pres_abs_toggle
+        return title
 
-                pygame.display.update()
+    def show_graphs(self, summary_rts = []):
+        """
+        shows the graph of each suite in turn, waiting for a keypress before saving it and moving on
+        (to save them all without waiting, use export_images)
+        :param summary_rts: a list of suites (see draw_suite_graph)
+        :return:
+        """
+        scale = compute_graph_scale(summary_rts)
+        for suite in summary_rts:
+            title = self.draw_suite_graph(suite, scale)
+            self.update_display()
             self.get_keypress()
             #TODO: The below is wrong wrong wrong. This is what we need to make the legend, not the filename
-            pygame.image.save(self.screen, str(condition[0]) + ".png")
+            pygame.image.save(self.screen, title + ".png")
 
     def show_present_graphs(self, summary_rts=[]):
-        pres_abs_toggle = True
-        maxRT = 0.0
-        minRT = 0.0
-        maxDists = None
-        minDists = 0.0
-        for suite in summary_rts:
-            for condition in suite:
-                for datapoint in condition[1]: #present vs absent
-                    # format is [self.model.num_lures, rt_mean, rt_sem, num_errors])
-                    # if not regression[-1]:              # no errors -- not sure this is necessary
-
-                    # if not minRT:
-                    #    minRT = datapoint[1]
-                    if datapoint[1] > maxRT: maxRT = datapoint[1]
-                    # elif datapoint[1] < minRT: minRT= datapoint[1]
-                    if not maxDists:
-                        maxDists = datapoint[0]
-                    elif datapoint[0] > maxDists:
-                        maxDists = datapoint[0]
-                    if not minDists:
-                        minDists = datapoint[0]
-                    elif datapoint[0] < minDists:
-                        minDists = datapoint[0]
-        upperBound = int(math.ceil(maxRT / 10)) * 10
-        if upperBound > 50:
-            ydivisions = 10
-        else:
-            ydivisions = 5
-
-        buffer = 50
-        width = 800
-        height = 600
-        rect = (0, 0, width, height)
-
-        for suite in summary_rts:
-            self.screen.fill(self.LIGHTGRAY)
-            pygame.draw.rect(self.screen, self.BLACK, rect, 1)
-            pygame.draw.line(self.screen, self.MIDDLEGRAY, (buffer, buffer), (buffer, height - buffer), 3)
-            pygame.draw.line(self.screen, self.MIDDLEGRAY, (buffer, height - buffer), (width - buffer, height - buffer),
-                             3)
-            yscalingfactor = (height - 2 * buffer) / upperBound
-            xscalingfactor = (width - 2 * buffer) / maxDists
-
-            ymarker = height - buffer - ydivisions * yscalingfactor
-            ylabel = ydivisions
-            while ymarker > buffer:
-                pygame.draw.line(self.screen, self.GRAY, (buffer + 10, ymarker), (width - buffer, ymarker), 1)
-                yaxis_text = self.smallfont.render(str(ylabel), True, self.MIDDLEGRAY, self.LIGHTGRAY)
-                # 2) set it's location
-                yaxistext_rect = [buffer - 40, ymarker - 10, 30, self.large_text_height]
-                ymarker -= ydivisions * yscalingfactor
-                ylabel += ydivisions
-
-                # 3) blit it to the screen
-                self.screen.blit(yaxis_text, yaxistext_rect)
-
-            for condition in suite:
-                if pres_abs_toggle == False:  # Target is absent
-
-                    # For John
-                    yaxis_text = self.smallfont.render(str(ylabel), True, self.MIDDLEGRAY, self.LIGHTGRAY)
-                    # 2) set it's location
-                    yaxistext_rect = [buffer - 40, ymarker - 10, 30, self.large_text_height]
-                    self.screen.blit(yaxis_text, yaxistext_rect)
+        # draws just like show_graphs (the present and absent conditions alternate in each suite)
+        self.show_graphs(summary_rts)
 
-                    color = self.DARKBLUE
-                    legend_text = self.smallfont.render("Absent", True, self.BLACK, self.LIGHTGRAY)
-                    legend_rect = (width - 2 * buffer, buffer / 2, width, buffer)
-                    self.screen.blit(legend_text, legend_rect)
-                    pygame.draw.circle(self.screen, color, (int(width - 2 * buffer - 10), int(buffer / 2) + 5), 6)
-
-                else:
-                    color = self.ORANGE
-                    pygame.draw.circle(self.screen, color, (int(width - 2 * buffer - 10), int(buffer / 2) + 20), 6)
-                    legend_text = self.smallfont.render("Present", True, self.BLACK, self.LIGHTGRAY)
-                    legend_rect = (width - 2 * buffer, int(buffer / 2) + 15, width, buffer + 20)
-                    self.screen.blit(legend_text, legend_rect)
-                    title_text = self.medfont.render(str(condition[0]), True, self.BLACK, self.LIGHTGRAY)
-                    title_rect = [buffer, buffer / 2, width - 5 * buffer, 3 * buffer]
-
-                    self.screen.blit(title_text, title_rect)
-                # Draw points on graph and put on x-axis marks
-                for pointindex in range(len(condition[1])):
-                    pygame.draw.circle(self.screen, color, (
-                    int(buffer + int(round(condition[1][pointindex][0]) * xscalingfactor)),
-                    int(height - buffer - int(round(condition[1][pointindex][1])) * yscalingfactor)), 6)
-                    xaxis_text = self.smallfont.render(str(condition[1][pointindex][0]), True, self.MIDDLEGRAY,
-                                                       self.LIGHTGRAY)
-                    xaxistext_rect = [int(buffer + round(condition[1][pointindex][0] * xscalingfactor)),
-                                      height - buffer + 20, 30, self.large_text_height]
-                    self.screen.blit(xaxis_text, xaxistext_rect)
-
-                # Draw lines in between points
-                for pointindex in range(len(condition[1]) - 1):
-                    pygame.draw.line(self.screen, color, (
-                    int(buffer + int(round(condition[1][pointindex][0]) * xscalingfactor)),
-                    int(height - buffer - int(round(condition[1][pointindex][1])) * yscalingfactor)), (
-                                     int(buffer + int(round(condition[1][pointindex + 1][0]) * xscalingfactor)), int(
-                                         height - buffer - int(
-                                             round(condition[1][pointindex + 1][1])) * yscalingfactor)), 3)
-
-                pres_abs_toggle = not pres_abs_toggle
-
-                pygame.display.update()
-            self.get_keypress()
-            # TODO: The below is wrong wrong wrong. This is what we need to make the legend, not the filename
-            pygame.image.save(self.screen, str(condition[0]) + ".png")
+    def save_display(self, display, state, file_name):
+        """
+        draws the state of a search display and saves it as an image
+        :param display: from describe_model_display
+        :param state: from snapshot_state
+        :param file_name: the image file (.png)
+        :return:
+        """
+        view = self.new_view_model(**display)
+        self.apply_state(view, state)
+        self.init_display()
+        self.show_state(view, False)
+        pygame.image.save(self.screen, file_name)
 
     # * * * * * * * * * * * * * * *  * * *
     # * * * Simulation Running Stuff * * *
@@ -492,20 +651,83 @@ class GraphicalRun(object):
 
     def run(self, verbose_title=''):
         """
-        runs the model with graphics
+        runs the model with graphics. The model runs on a SimulationWorker thread; this thread draws the frames
+        it makes at FRAME_RATE, so a slow model doesn't freeze the window and a fast one can run ahead
+        Keys: space pauses/resumes; while paused, any other key steps one iteration; f toggles fast forward (draw
+              only the newest frame); + and - double and halve the number of iterations per frame (skip N);
+              q or escape end the run
+        If self.wait, the run starts paused, so each keypress is an iteration (as it always was)
         :return: 
         """
         # clear the display and, if necessary, set up the graphics
         self.init_display()
 
-        # init the state of the search
+        # init the state of the search, and start it running
         self.model.init_search(verbose_title)
+        view   = self.make_live_view_model(self.model)
+        worker = SimulationWorker(self.model, self.QUEUE_SIZE)
+        worker.start()
+
+        paused          = self.wait
+        steps_wanted    = 0     # iterations asked for, one key at a time, while paused
+        fast_forward    = False
+        frames_per_tick = 1     # skip N: how many iterations to advance per frame drawn
+        clock = pygame.time.Clock()
 
-        # run the iterations until the model is done
+        # draw frames until the model is done
         all_done = False
         while not all_done:
-            all_done = self.model.run_search_step()
-            self.show_state()
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    all_done = True
+                elif event.type == pygame.KEYDOWN:
+                    if event.key in (pygame.K_ESCAPE, pygame.K_q):
+                        all_done = True
+                    elif event.key == pygame.K_SPACE:
+                        paused = not paused
+                        steps_wanted = 0
+                    elif event.key == pygame.K_f:
+                        fast_forward = not fast_forward
+                    elif event.key in (pygame.K_PLUS, pygame.K_EQUALS, pygame.K_KP_PLUS):
+                        frames_per_tick *= 2
+                    elif event.key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+                        frames_per_tick = max(frames_per_tick // 2, 1)
+                    elif paused:
+                        steps_wanted += 1
+
+            # how many of the worker's frames to use up this tick: only the last one gets drawn
+            if paused:
+                num_frames = steps_wanted
+            elif fast_forward:
+                num_frames = max(worker.frames.qsize(), 1)
+            else:
+                num_frames = frames_per_tick
+
+            state = None
+            for i in range(num_frames):
+                try:
+                    state = worker.frames.get_nowait()
+                except queue.Empty:
+                    break # the model hasn't caught up: draw what there is and carry on
+                if paused:
+                    steps_wanted -= 1
+                if state['done']:
+                    break
+
+            if state:
+                self.apply_state(view, state)
+                self.show_state(view, False)
+                if state['done']:
+                    # wait for a look at the final state before going back
+                    if self.wait:
+                        self.get_keypress()
+                    all_done = True
+
+            clock.tick(self.FRAME_RATE)
+
+        # the user may have quit mid-search: stop the model
+        worker.stop()
+        worker.join()
 
          # at the end, report the RT, whether correct, etc.
          #ToDo: rewrite this to work with graphics
@@ -513,3 +735,211 @@ class GraphicalRun(object):
          #     for line in self.model.messages:
          #         print( line)
 
+    # * * * * * * * * * * * * * * * *
+    # * * * Record and Replay * * *
+    # * * * * * * * * * * * * * * * *
+
+    def new_view_model(self, cartesian_grid, display_center, display_radius, item_radius, item_properties, item_names, is_target, locations):
+        """
+        makes a model to hold a state of a search for drawing. it is never run: apply_state fills it in
+        :return: the model
+        """
+        view = SearchModel1.SearchModel()
+        view.CARTESIAN_GRID = cartesian_grid
+        view.DISPLAY_CENTER = display_center
+        view.DISPLAY_RADIUS = display_radius
+        view.ITEM_RADIUS    = item_radius
+        view.search_items   = []
+        for index in range(len(item_properties)):
+            item = SearchModel1.VisualItem(view.search_items, [], item_properties[index], item_names[index], is_target[index])
+            item.location = list(locations[index])
+            view.search_items.append(item)
+        return view
+
+    def make_view_model(self, trial):
+        """
+        makes a view model (see new_view_model) for a recorded trial
+        :param trial: a TraceRecorder.RecordedTrial
+        :return: the model
+        """
+        return self.new_view_model(trial.cartesian_grid, trial.display_center, trial.display_radius, trial.item_radius,
+                                   trial.item_properties, trial.item_names, trial.is_target, trial.locations)
+
+    def make_live_view_model(self, model):
+        """
+        makes a view model (see new_view_model) with the display of a model that is about to run
+        :param model: the SearchModel, after init_search (which assigns the locations)
+        :return: the model
+        """
+        return self.new_view_model(**describe_model_display(model))
+
+    def apply_state(self, view, state):
+        """
+        sets the view model to a state: from RecordedTrial.state_at or SimulationWorker.snapshot
+        :return:
+        """
+        view.iteration      = state['iteration']
+        view.fixation       = state['fixation']
+        view.rejected_items = []
+        for item in view.search_items:
+            item.rejected   = state['rejected'][item.index]
+            if 'integrators' in state:
+                item.integrator = float(state['integrators'][item.index])
+            if item.rejected:
+                view.rejected_items.append(item)
+        view.viable_items = [item for item in view.search_items if not item.rejected]
+        if state['selected'] >= 0:
+            view.selected_item = view.search_items[state['selected']]
+        else:
+            view.selected_item = None
+        if state['found'] >= 0:
+            view.found_target = view.search_items[state['found']]
+        else:
+            view.found_target = None
+
+    def apply_frame(self, view, trial, frame):
+        """
+        sets the view model to the state of the recorded trial at frame
+        :return:
+        """
+        self.apply_state(view, trial.state_at(frame))
+
+    def replay(self, file_name, speed=10.0, start_iteration=0):
+        """
+        replays a trial from a file made by a TraceRecorder.TrialRecording (or a TrialTraceRecorder in a suite). nothing is recomputed
+        Keys: space pauses/resumes; right/left step one frame (and pause); up/down jump a keyframe interval;
+              + and - double and halve the speed; home/end go to the start/end; q or escape end the replay
+        :param file_name: the .npz file
+        :param speed: frames (iterations) per second
+        :param start_iteration: the iteration to start at
+        :return:
+        """
+        trial = TraceRecorder.RecordedTrial(file_name)
+        view  = self.make_view_model(trial)
+        frame = trial.frame_for_iteration(start_iteration)
+        last_frame = trial.num_frames - 1
+        jump  = max(trial.keyframe_interval, 10)
+        paused = False
+        clock  = pygame.time.Clock()
+
+        self.init_display()
+        shown_frame = -1 # the frame on the screen: only redraw when it changes
+        all_done = False
+        while not all_done:
+            if frame != shown_frame:
+                self.apply_frame(view, trial, frame)
+                self.show_state(view, False) # redraws only the items that changed and the iteration number
+                shown_frame = frame
+
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    all_done = True
+                elif event.type == pygame.KEYDOWN:
+                    if event.key in (pygame.K_ESCAPE, pygame.K_q):
+                        all_done = True
+                    elif event.key == pygame.K_SPACE:
+                        paused = not paused
+                    elif event.key == pygame.K_RIGHT:
+                        paused = True
+                        frame = min(frame + 1, last_frame)
+                    elif event.key == pygame.K_LEFT:
+                        paused = True
+                        frame = max(frame - 1, 0)
+                    elif event.key == pygame.K_UP:
+                        frame = min(frame + jump, last_frame)
+                    elif event.key == pygame.K_DOWN:
+                        frame = max(frame - jump, 0)
+                    elif event.key == pygame.K_HOME:
+                        frame = 0
+                    elif event.key == pygame.K_END:
+                        frame = last_frame
+                    elif event.key in (pygame.K_PLUS, pygame.K_EQUALS, pygame.K_KP_PLUS):
+                        speed *= 2.0
+                    elif event.key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+                        speed = max(speed / 2.0, 0.5)
+
+            if not paused:
+                if frame < last_frame:
+                    frame += 1
+                else:
+                    paused = True # stay on the last frame until the user quits
+                clock.tick(speed)
+            else:
+                clock.tick(30) # stay responsive to keys while paused
+
+
+
+# * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+# * * * * * * * * Headless export of graphs and displays * * * * * * * *
+# * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+
+def compute_graph_scale(summary_rts):
+    """
+    works out the axes once for all the suites' graphs, so they can be compared (and drawn separately)
+    :param summary_rts: a list of suites (see GraphicalRun.draw_suite_graph)
+    :return: a dictionary: upper_bound (of the RT axis), ydivisions (RT axis tick spacing), max_dists (of the x axis)
+    """
+    maxRT = 0.0
+    maxDists = 0
+    for suite in summary_rts:
+        for condition in suite:
+            for datapoint in condition[1]:
+                # format is [self.model.num_lures, rt_mean, rt_sem, num_errors])
+                if datapoint[1] > maxRT: maxRT = datapoint[1]
+                if datapoint[0] > maxDists: maxDists = datapoint[0]
+    upperBound = int(math.ceil(maxRT/10))*10
+    if upperBound > 50: ydivisions = 10
+    else: ydivisions = 5
+    # with no data (or only set size 0) there's still an axis to draw
+    return {'upper_bound': max(upperBound, 10), 'ydivisions': ydivisions, 'max_dists': max(maxDists, 1)}
+
+export_renderer = None # each export process's own headless GraphicalRun, made the first time it's needed
+
+def export_image(job):
+    """
+    draws one image off screen and saves it. runs in an export_images worker process
+    :param job: ('graph', suite, scale, file_name) or ('display', display, state, file_name)
+    :return: the file name
+    """
+    global export_renderer
+    if export_renderer is None:
+        export_renderer = GraphicalRun(None, 600, 800, headless=True)
+    if job[0] == 'graph':
+        [kind, suite, scale, file_name] = job
+        export_renderer.draw_suite_graph(suite, scale)
+        pygame.image.save(export_renderer.screen, file_name)
+    else:
+        [kind, display, state, file_name] = job
+        export_renderer.save_display(display, state, file_name)
+    return file_name
+
+def export_images(summary_rts, directory='data/graphs', prefix='suite', displays=[], processes=None):
+    """
+    saves the graph of every suite, and any display snapshots, as .png files, with no window and no keypresses.
+    the axes are scaled once for all the graphs, and the images are drawn in parallel worker processes
+    :param summary_rts: a list of suites (see GraphicalRun.draw_suite_graph); graph i goes to <prefix>_suite<i>.png
+    :param displays: a list of (name, display, state), from describe_model_display and snapshot_state;
+                     each goes to <prefix>_<name>.png
+    :param processes: how many worker processes; None means one per CPU, 1 means draw them all in this process
+    :return: the list of file names saved
+    """
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    scale = compute_graph_scale(summary_rts)
+    jobs  = []
+    for index in range(len(summary_rts)):
+        jobs.append(('graph', summary_rts[index], scale, os.path.join(directory, prefix + '_suite%03i.png' % index)))
+    for (name, display, state) in displays:
+        jobs.append(('display', display, state, os.path.join(directory, prefix + '_' + name + '.png')))
+
+    if processes is None:
+        processes = min(multiprocessing.cpu_count(), len(jobs))
+    if processes <= 1:
+        return [export_image(job) for job in jobs]
+    pool = multiprocessing.Pool(processes)
+    try:
+        file_names = pool.map(export_image, jobs)
+    finally:
+        pool.close()
+        pool.join()
+    return file_names
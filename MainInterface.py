@@ -1,5 +1,5 @@
 
-import sys, SearchModel1, GraphicalRun1, copy, csv
+import sys, io, SearchModel1, GraphicalRun1, TraceRecorder, PremadeSimulations, ParallelSuite, SuiteCheckpoint, DataFiles, BackgroundWriter, SuitePipeline, SuiteProgress, SuiteMetrics, SearchRegression, RTDistributions, copy, time
 
 
 # * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
@@ -26,6 +26,31 @@ class SearchModelInterface(object):
 
         self.wait = True  # wait for user to keypress between iterations
 
+        # batch run control: None means no budget (see run_suite)
+        self.CONDITION_TIME_BUDGET = None # wall-clock seconds allowed for each condition (set size) in a suite
+        self.PROCESSES = 1   # worker processes to run a suite's trials in (see ParallelSuite); 1 runs them here, None means one per CPU
+        self.SEED      = None # with worker processes, the seed every trial's random numbers come from; None means a new one each suite
+        self.worker_pool = None # the worker processes suites run in, kept up from one suite to the next (see ParallelSuite.WorkerPool)
+        self.checkpoint = None # the journal of the premade suite being run, if any (see SuiteCheckpoint)
+        self.csv_writer = None # while a premade suite runs, the writer of the current subject's csv file (see run_premade_subjects)
+        self.COMPRESSION = None # compress suites' csv files: None, 'gzip' or 'lzma' (see BackgroundWriter)
+        self.suite_filters = [] # generator functions a suite's events go through, in order, before the sinks (see SuitePipeline)
+        self.suite_sinks   = [] # more sinks for a suite's events, after the usual ones (see SuitePipeline)
+        self.PROGRESS = None # report suites' progress: None, 'terminal' or 'file' (see SuiteProgress)
+        self.progress_reporter = None # while a premade suite runs, the reporter of its progress (see run_premade_subjects)
+
+        self.suite_rt_quantiles = None # the last suite's rt quantiles by condition (see run_suite and write_vincentized)
+
+        self.METRICS = False # keep counts of what suites simulate, in data/metrics/casper.prom (see SuiteMetrics)
+        self.metrics = None  # made the first time it's needed (the counts go on from suite to suite)
+
+        self.TRACE = False # save a per-iteration trace of every run in a suite to data/traces (needs numpy)
+        self.trace_recorder = None # made the first time it's needed
+
+        self.EXPORT_GRAPHS   = False # save the regression graphs to data/graphs with no window and no keypresses
+        self.EXPORT_DISPLAYS = False # also save the display at the end of the first run of each condition
+        self.display_snapshots = []  # (name, display, state) for each condition, while EXPORT_DISPLAYS (see GraphicalRun1.export_images)
+
         self.message_list = [] # a list of strings to temm the interface what (if anything) has happened
 
         self.data_file_index = 0
@@ -38,6 +63,7 @@ class SearchModelInterface(object):
         self.selection_summary_data   = [] # num. attentional selections per run in a condition
         self.eye_move_summary_data    = [] # num eye movements per run per uondition
         self.auto_reject_summary_data = [] # num auto-rejected items per run by condition
+        self.outcome_summary_data     = [] # num runs, errors, stalled and cut off runs per condition
 
     def read_file_index(self):
         """
@@ -45,19 +71,15 @@ class SearchModelInterface(object):
         self.data_file_index is used to asign a unique index to each data file name so that they don't overwrite one another
         :return: 
         """
-        index_file = open('data/data_index.txt','r')
-        self.data_file_index = int(next(index_file)) # read the one and only line in the file, and cast it as an int (don't increment it yet; do that at time of file writing)
-        index_file.close()
+        self.data_file_index = DataFiles.read_index() # (don't increment it yet; runs reserve their indices with DataFiles.reserve_indices)
 
     def write_file_index(self):
         """
-        just reads the datafile index from the text file data_index.txt and sets self.data_file_index to it
+        writes self.data_file_index to the text file data_index.txt, unless another run has moved it past that already
         self.data_file_index is used to asign a unique index to each data file name so that they don't overwrite one another
         :return: 
         """
-        index_file = open('data/data_index.txt','w')
-        index_file.write(str(self.data_file_index)) # write the index to the file
-        index_file.close()
+        DataFiles.advance_index(self.data_file_index) # (under a lock: other runs may share the data directory)
 
     def show_messages(self):
         # get any mesages form the attention model and show them immediately
@@ -95,15 +117,28 @@ class SearchModelInterface(object):
         :return: 
         """
         # ask whether user wants graphic run
-        legal_responses = ('y', 'n')
+        legal_responses = ('y', 'n', 'r')
         response = ''
         while not response in legal_responses:
-            response = input('Graphic: (y)es or (n)o?')
+            response = input('Graphic: (y)es, (n)o or (r)ecord for replay?')
 
         # if user wants blind run, then run blind
         if response == 'n':
             self.run_blind(verbose_title)
 
+        # record the run (blind) so it can be replayed later, from the main menu
+        elif response == 'r':
+            if TraceRecorder.NUMPY_FAILED:
+                print( 'Recording needs numpy, which failed to load. Running blind.')
+                self.run_blind(verbose_title)
+            else:
+                file_name = 'data/recordings/(%3i)_'%self.data_file_index + time.strftime('%Y%m%d_%H%M%S') + '.npz'
+                recorder = TraceRecorder.TrialRecording(file_name)
+                self.model.trace_recorder = recorder
+                self.run_blind(verbose_title)
+                self.model.trace_recorder = None
+                print( 'Run recorded to '+file_name+'. Replay it with (p) from the main menu.')
+
         # otherwise TRY to run graphic, and note whether you failed
         else:
             # if you don't already have the graphics handler, then try to create it
@@ -123,7 +158,7 @@ class SearchModelInterface(object):
                 self.run_blind(verbose_title)
 
 
-    def run_suite(self, target, distractors, search_type, condition, num_distractors_list, num_runs, sim_id=None):
+    def run_suite(self, target, distractors, search_type, condition, num_distractors_list, num_runs, sim_id=None, time_budget=None):
         """
         runs a suite of num_runs  simulations, blind and not verbose
         varies target present & absent, and num distractors
@@ -132,11 +167,45 @@ class SearchModelInterface(object):
         :param target is a list ['color','shape']
         :param distractors is a list of lists: [['color','shape'],['color','shape']]
         :param search_type is text: 'feature' or 'conjunction'
+        :param num_runs: the number of runs per condition; if None (budgeted mode), run as many as fit in time_budget
+        :param time_budget: wall-clock seconds allowed per condition (set size); if None, use self.CONDITION_TIME_BUDGET
         :return: 
         """
-        csv_file_name = str(search_type)  + '.csv'
-        csv_data_file = open('data/' + csv_file_name, 'a', encoding='UTF8')
-        writer=csv.writer(csv_data_file, delimiter =',')
+        if time_budget is None:
+            time_budget = self.CONDITION_TIME_BUDGET
+        if num_runs is None and not time_budget:
+            print( 'run_suite: budgeted mode (num_runs = None) needs a time budget')
+            return None
+        if self.TRACE:
+            if not self.trace_recorder:
+                self.trace_recorder = TraceRecorder.TrialTraceRecorder()
+            self.model.trace_recorder = self.trace_recorder
+        if self.METRICS:
+            if not self.metrics:
+                self.metrics = SuiteMetrics.SuiteMetrics()
+            self.model.metrics = self.metrics
+        # progress reports: a premade suite's, or this suite's own
+        progress     = self.progress_reporter
+        own_progress = False
+        if self.PROGRESS and not progress:
+            total = None
+            if num_runs is not None:
+                total = num_runs * len(num_distractors_list)
+            progress     = SuiteProgress.ProgressReporter(str(search_type) + ' search', total, self.PROGRESS)
+            own_progress = True
+        if progress:
+            progress.begin_suite(str(search_type) + ' c' + str(condition))
+        # the rows are written by a thread of their own, in batches (see BackgroundWriter)
+        csv_file_name = str(search_type)  + '.csv' + BackgroundWriter.COMPRESSIONS[self.COMPRESSION]
+        if self.csv_writer:
+            # a premade suite's subject's csv file: its own (it's named by the subject's data file index), kept open
+            # for all the subject's suites
+            csv_part_name = None
+            writer = self.csv_writer
+        else:
+            # other runs may be appending to the same file: write to one of this run's own, and merge it in at the end
+            csv_part_name = DataFiles.part_file_name('data/' + csv_file_name)
+            writer = BackgroundWriter.BackgroundWriter(csv_part_name, 'w', self.COMPRESSION)
         #writer.writerow(['resp.corr','total_setsize','trial_type','resp.rt','dcolor','participant'])
         self.suite_summary_rts = []
         #NUM_RUNS =  200 #Changed to argument to method 09/24/2019 RFH
@@ -147,6 +216,8 @@ class SearchModelInterface(object):
             self.selection_summary_data   = [] # num. attentional selections per run in a condition
             self.eye_move_summary_data    = [] # num eye movements per run per condition
             self.auto_reject_summary_data = [] # num auto-rejected items per run by condition
+            self.outcome_summary_data     = [] # num runs, errors, stalled and cut off runs by condition
+            rt_stats                      = [] # the rts of the correct runs by condition (for the bootstrap)
             if num_targets == 1:
                 target_type = 'present'
                 file_name = search_type + '_pres.txt'
@@ -154,75 +225,103 @@ class SearchModelInterface(object):
                 target_type = 'absent'
                 file_name = search_type + '_abs.txt'
 
-            for num_distractors in num_distractors_list:
-                # assemble the distractor list from the list (distractors) passed in
-                if len(distractors) == 2:
-                    num_dist_per = int(num_distractors / 2)  # half of the number of distractors for each distractor type
-                else:
-                    num_dist_per = num_distractors
-                distractor_list = []
-
-                for distractor in distractors:
-                    # # print("DEBUG distractor: " + str(distractor))
-                    this_dis_type = [distractor[0], num_dist_per]  # list is: [color,shape,number]
-                    distractor_list.append(this_dis_type)
-
-
-                # # print("DEBUG distractor_list in run_suite(): " + str(distractor_list))
-                # create the simulation with the requisite targets and distractors:
-                self.model.create_simulation([target[0],num_targets], distractor_list)
-                # now run the simulations
-                rt_data        = [] # rt on each run
-                num_errors     = 0  # num errors over all runs
-                selection_data = [] # num attentional selections per run
-                eye_move_data  = [] # eye movements per run
-                auto_rej_data  = [] # number of automatic rejections per run
-                for i in range(num_runs):
-                    self.model.run_whole_search()
-                    if num_distractors == 0: recorded_condition = 0
-                    else: recorded_condition = condition
-                    participant = search_type.split('_')[0]
-                    writer.writerow([str(int(self.model.correct)),str(num_distractors+1), 'expt', str(self.model.iteration),str(recorded_condition), participant])
-                    if self.model.correct:  # count correct responses only
-                        rt_data.append(self.model.iteration)
-                        selection_data.append(self.model.num_attended)
-                        eye_move_data.append(self.model.num_eye_movements)
-                        auto_rej_data.append(self.model.num_auto_rejections)
+            # the suite runs as a pipeline (see SuitePipeline): the conditions' specs, then their trials' events
+            target_spec = [target[0],num_targets]
+            specs = list(SuitePipeline.condition_specs(target_spec, distractors, num_distractors_list))
+
+            # with worker processes, the conditions' trials are run in them, and each condition's records come back
+            # in turn as the pipeline asks for them (see ParallelSuite.run)
+            # (when resuming, the set sizes done before the suite was interrupted are left out: see SuiteCheckpoint)
+            parallel_conditions = None
+            if self.PROCESSES != 1:
+                if num_runs is None or time_budget or self.TRACE or self.EXPORT_DISPLAYS:
+                    print( 'run_suite: budgeted runs, traces and display exports are run here, not in worker processes')
+                elif not (self.checkpoint and self.checkpoint.suite_completed(len(specs))):
+                    if self.checkpoint:
+                        self.checkpoint.restore_random(suite=True)
+                    if self.worker_pool is None:
+                        self.worker_pool = ParallelSuite.WorkerPool(self.model, self.PROCESSES)
+                    parallel_suite = ParallelSuite.ParallelSuite(self.model, self.PROCESSES, self.SEED, pool=self.worker_pool, timed=self.METRICS)
+                    for spec in specs:
+                        num_trials = num_runs
+                        if self.checkpoint and self.checkpoint.completed(spec['index']):
+                            num_trials = 0 # (but still added, so the conditions keep their ids, and so their seeds)
+                        parallel_suite.add_condition(spec['target'], spec['distractor_list'], num_trials)
+                    parallel_conditions = parallel_suite.run(progress and progress.add_trials)
+
+            trace_prefix = search_type + '_c' + str(condition)
+            events = SuitePipeline.trial_events(specs, lambda spec: self.get_condition_trials(spec, parallel_conditions, num_runs, time_budget, trace_prefix))
+            for stage in self.suite_filters:
+                events = stage(events)
+
+            # the sinks: the tally (which the summaries come from), the csv rows, the stall file, the displays
+            tally  = SuitePipeline.ConditionTally()
+            stalls = SuitePipeline.StallSink('data/(%3i)_'%self.data_file_index + str(condition) + '_' + search_type + '_stalled.txt',
+                                             self.write_stall_snapshot, self.checkpoint)
+            sinks  = [tally, SuitePipeline.CsvSink(writer, search_type, condition), stalls]
+            if self.EXPORT_DISPLAYS:
+                sinks.append(SuitePipeline.DisplaySink(self.model, search_type + '_c' + str(condition), self.display_snapshots))
+            if progress:
+                progress.count_trials = parallel_conditions is None # (else they were counted as they came back)
+                sinks.append(progress)
+            if self.METRICS:
+                sinks.append(self.metrics)
+            sinks.extend(self.suite_sinks)
+
+            for (kind, spec, run, value) in SuitePipeline.tee(events, sinks):
+                if kind != 'end':
+                    continue
+                num_distractors = spec['num_distractors']
+                num_lures       = spec['num_lures']
+
+                if self.checkpoint and not tally.restored:
+                    # the set size is done: make its rows durable and record it, so a resumed suite can skip it
+                    self.checkpoint.commit(spec['index'], tally.get_state(), [writer, stalls.file])
+
+                # runs and their outcomes: runs cut off by the time budget don't count as runs
+                self.outcome_summary_data.append([num_lures, tally.runs - tally.cut_off, tally.errors, tally.stalled, tally.cut_off])
+
+                if tally.stats['rt'].n == 0:
+                    # no correct runs means no means: leave the condition out of the summaries (and so the graphs)
+                    if tally.errors:
+                        print( 'WOAH! All errors. Num errors = '+str(tally.errors)+', num stalled = '+str(tally.stalled))
+                    elif tally.stalled:
+                        print( 'WOAH! Every run stalled. Num stalled = '+str(tally.stalled))
                     else:
-                        num_errors += 1
-                        print("Errors " + str(num_errors))
-                #print("RT DATA " + str(rt_data))
-                if len(rt_data) > 0:
-                    [rt_mean, rt_sem]  = self.mean_and_sem(rt_data)
-                    [sel_mean,sel_sem] = self.mean_and_sem(selection_data)
-                    [eye_mean,eye_sem] = self.mean_and_sem(eye_move_data)
-                    [rej_mean,rej_sem] = self.mean_and_sem(auto_rej_data)
-                else:
-                    print( 'WOAH! All errors. Num errors = '+str(num_errors))
-                    print( 'Condition: '+file_name)
+                        print( 'No runs finished within the time budget. Num cut off = '+str(tally.cut_off))
+                    print( 'Condition: '+file_name+', '+str(num_distractors)+' distractors')
+                    self.model.make_message(str(num_distractors) + ' lures, ' + search_type + ' search, target' + target_type + ', no correct runs: Errors = %2i, Stalled = %2i' %(tally.errors,tally.stalled))
+                    continue
+
+                [rt_mean, rt_sem]  = tally.stats['rt'].mean_and_sem()
+                [sel_mean,sel_sem] = tally.stats['selections'].mean_and_sem()
+                [eye_mean,eye_sem] = tally.stats['eye_movements'].mean_and_sem()
+                [rej_mean,rej_sem] = tally.stats['auto_rejections'].mean_and_sem()
 
                 # RT data
-                self.model.make_message(str(num_distractors) + ' lures, ' + search_type + ' search, target' + target_type + ', Mean RT (sem) = %.3f (%.3f), Errors = %2i' %(rt_mean,rt_sem,num_errors))
-                self.rt_summary_data.append([self.model.num_lures, rt_mean, rt_sem, num_errors])
+                self.model.make_message(str(num_distractors) + ' lures, ' + search_type + ' search, target' + target_type + ', Mean RT (sem) = %.3f (%.3f), Errors = %2i' %(rt_mean,rt_sem,tally.errors))
+                self.rt_summary_data.append([num_lures, rt_mean, rt_sem, tally.errors])
+                rt_stats.append(tally.stats['rt'])
 
                 # TODO Thsi is where the graph needs to be made and saved to disk
 
 
                 # attentional selection summary data
                 self.model.make_message('Mean Num. Attn. Sel. (sem) = %.3f (%.3f)' %(sel_mean, sel_sem))
-                self.selection_summary_data.append([self.model.num_lures, sel_mean, sel_sem])
+                self.selection_summary_data.append([num_lures, sel_mean, sel_sem])
 
                 # eye movement summary data
                 self.model.make_message('Mean Num. Eye Movements (sem) = %.3f (%.3f)' % (eye_mean, eye_sem))
-                self.eye_move_summary_data.append([self.model.num_lures, eye_mean, eye_sem])
+                self.eye_move_summary_data.append([num_lures, eye_mean, eye_sem])
 
                 # auto-rejection summary data
                 self.model.make_message('Mean Num. Auto Rejections (sem) = %.3f (%.3f)' % (rej_mean, rej_sem))
-                self.auto_reject_summary_data.append([self.model.num_lures, rej_mean, rej_sem])
+                self.auto_reject_summary_data.append([num_lures, rej_mean, rej_sem])
+            stalls.close()
 
             #graph_rt_summary_data = copy.deepcopy(self.rt_summary_data)
 
-                type= 'Target ' + str(target) + ', Distractors' + str(distractors)
+            type= 'Target ' + str(target) + ', Distractors' + str(distractors)
             graph_rt_summary_data = [type, copy.deepcopy(self.rt_summary_data)]
 
 
@@ -235,10 +334,13 @@ class SearchModelInterface(object):
             index_string = '(%3i)'%self.data_file_index
             #   3) append the index to the beginning of the file
             file_name = index_string+'_'+str(condition)+'_'+file_name
-            data_file = open('data/'+file_name, 'w')
+            data_file = io.StringIO() # written to the file in one go, below
 
             # RT and error data
-            data_file.write(str(num_runs)+' runs of SearchModel1 (last modified '+str(self.model.LAST_MODIFIED)+')\n\n')
+            if num_runs is None:
+                data_file.write('Budgeted runs ('+str(time_budget)+'s per condition) of SearchModel1 (last modified '+str(self.model.LAST_MODIFIED)+')\n\n')
+            else:
+                data_file.write(str(num_runs)+' runs of SearchModel1 (last modified '+str(self.model.LAST_MODIFIED)+')\n\n')
             data_file.write(search_type+' search\n')
             data_file.write('Target '+target_type+'\n\n') # target_type = 'present' or 'absent'
             data_file.write('Target: '+str(target)+'\n')
@@ -255,12 +357,27 @@ class SearchModelInterface(object):
                 data_file.write(text_line)
 
             # compute and report the slope & intercept of the regression line, and
-            #   the variance accounted for  y the linear trend
-            #(slope, intercept, variance_accounted) = self.slope_and_intercept(self.rt_summary_data)
-            #data_file.write('\n')
-            #data_file.write('Slope      = %.3f iterations/item\n'%slope)
-            #data_file.write('Intercept  = %.3f iterations\n'%intercept)
-            #data_file.write('Percent Variance Accounted for = %.3f\n'%(100*variance_accounted))
+            #   the variance accounted for  y the linear trend, with bootstrap confidence intervals (see SearchRegression)
+            if len(self.rt_summary_data) > 1:
+                (slope, intercept, variance_accounted) = self.slope_and_intercept(self.rt_summary_data)
+                intervals = SearchRegression.bootstrap_lines([line[0] for line in self.rt_summary_data], rt_stats)
+                data_file.write('\n')
+                data_file.write('Slope      = %.3f iterations/item'%slope + SearchRegression.format_interval(intervals, 'slope') + '\n')
+                data_file.write('Intercept  = %.3f iterations'%intercept + SearchRegression.format_interval(intervals, 'intercept') + '\n')
+                if variance_accounted is not None:
+                    data_file.write('Percent Variance Accounted for = %.3f'%(100*variance_accounted) + SearchRegression.format_interval(intervals, 'variance_accounted', 100) + '\n')
+                if intervals:
+                    data_file.write('(confidence intervals from %i bootstrap resamples of the trials within each set size)\n' % intervals['resamples'])
+
+            # runs and their outcomes, including conditions left out above because they had no correct runs
+            # (stalled runs are in neither the rts nor the errors; runs cut off by the time budget were discarded)
+            data_file.write('\n\nRun Outcomes (n = num. distractors; runs = num. runs; err = num errors; stl = num. stalled runs; cut = num. runs cut off by the time budget):\n')
+            data_file.write('n\truns\terr\tstl\tcut\n')
+            for line in self.outcome_summary_data:
+                text_data = [str(value) for value in line] # all integers: [num lures, runs, errors, stalled, cut off]
+                text_data.append('\n')
+                text_line = '\t'.join(text_data)
+                data_file.write(text_line)
 
             # attentional selection data
             data_file.write('\n\nAttentional Selection Data (n = num. distractors; s = mean selections; sem = std. error of mean):\n')
@@ -297,17 +414,111 @@ class SearchModelInterface(object):
                 text_line = '\t'.join(text_data)
                 data_file.write(text_line)
 
+            # rt distributions of the correct runs: quantiles, and ex-Gaussian and shifted Wald fits (see RTDistributions)
+            distributions = RTDistributions.describe(rt_stats)
+            self.suite_rt_quantiles = None
+            if distributions:
+                self.suite_rt_quantiles = ([line[0] for line in self.rt_summary_data], distributions['quantiles'])
+                data_file.write('\n\nRT Distributions (n = num. distractors; q10...q90 = rt quantiles; mu, sigma, tau = ex-Gaussian; shift, drift, thr = shifted Wald; fit by the method of moments):\n')
+                data_file.write('n\t' + '\t'.join(['q%i' % round(100 * p) for p in RTDistributions.QUANTILES]) + '\tmu\tsigma\ttau\tshift\tdrift\tthr\n')
+                for row in range(len(self.rt_summary_data)):
+                    text_data = [str(self.rt_summary_data[row][0])] # the number of lures
+                    text_data.extend([RTDistributions.format_number(value) for value in distributions['quantiles'][row]])
+                    text_data.extend([RTDistributions.format_number(values[row]) for values in distributions['ex_gaussian']])
+                    text_data.extend([RTDistributions.format_number(values[row]) for values in distributions['shifted_wald']])
+                    text_data.append('\n')
+                    text_line = '\t'.join(text_data)
+                    data_file.write(text_line)
+
             # write the parameter values to the file
             self.write_parameters(data_file)
 
-            # finally, close the data file
-            data_file.close()
+            # finally, write the data file (whole: a crash can't leave half a summary)
+            DataFiles.write_atomically('data/'+file_name, data_file.getvalue())
 
             print( file_name+' saved to Data/')
         print(self.suite_summary_rts)
-        csv_data_file.close()
+        if csv_part_name:
+            writer.close()
+            DataFiles.merge_part(csv_part_name, 'data/' + csv_file_name)
+        self.model.trace_recorder = None
+        if self.METRICS:
+            self.metrics.write()
+            self.model.metrics = None
+        if own_progress:
+            progress.finish()
         self.regression_summary_rts.append(self.suite_summary_rts)
 
+    def get_condition_trials(self, spec, parallel_conditions, num_runs, time_budget, trace_prefix):
+        """
+        the trials of a condition of a suite (see SuitePipeline.trial_events)
+        :param spec: the condition's spec (see SuitePipeline.condition_specs)
+        :param parallel_conditions: if the suite's trials are run in worker processes, the conditions' records, in
+                                    turn (see ParallelSuite.run); else None
+        :param num_runs, time_budget: as for run_condition_trials
+        :param trace_prefix: the start of the trace files' names, when tracing
+        :return: the condition's trials' records; or, if it was done before the suite was interrupted, the state of its
+                 tally, from the checkpoint
+        """
+        if parallel_conditions is not None:
+            records = next(parallel_conditions) # (every condition has its turn: one done already just has no trials)
+        if self.checkpoint and self.checkpoint.completed(spec['index']):
+            # its rows are in the csv file already: just read back its data
+            return self.checkpoint.unit_data(spec['index'])
+        if parallel_conditions is not None:
+            return records
+        if self.checkpoint:
+            self.checkpoint.restore_random()
+        # create the simulation with the requisite targets and distractors:
+        self.model.create_simulation(spec['target'], spec['distractor_list'])
+        if self.TRACE:
+            # one trace file per run: <search_type>_c<condition>_n<num distractors>_<run>.npz
+            self.trace_recorder.prefix    = trace_prefix + '_n' + str(spec['num_distractors'])
+            self.trace_recorder.trial_num = 0
+        return self.run_condition_trials(num_runs, time_budget)
+
+    def run_condition_trials(self, num_runs, time_budget=None):
+        """
+        runs the trials of the condition the model is set up for (by create_simulation), one after another, here
+        :param num_runs: how many; if None, as many as fit in time_budget
+        :param time_budget: wall-clock seconds for the condition; None means no budget
+        :return: (a generator of) a record for each trial (see SearchModel.get_trial_record). the model is left as the
+                 trial left it until the next record is asked for
+        """
+        if time_budget:
+            deadline = time.time() + time_budget
+        else:
+            deadline = None
+        i = 0
+        while num_runs is None or i < num_runs:
+            if deadline and time.time() > deadline:
+                print( 'Time budget of '+str(time_budget)+'s used up after '+str(i)+' runs')
+                break
+            i += 1
+            self.model.run_whole_search(deadline=deadline)
+            yield self.model.get_trial_record()
+
+    def write_stall_snapshot(self, stall_file, num_distractors, run, snapshot, reason=None):
+        """
+        writes the snapshot of a stalled run (from SearchModel.get_state_snapshot) to the stall file
+        :param stall_file: an open text file
+        :param num_distractors: the condition (number of distractors) of the stalled run
+        :param run: which run (1...) in the condition it was
+        :param snapshot: the snapshot dictionary
+        :param reason: why the run stalled; if None, the model's stall_reason
+        :return:
+        """
+        if reason is None:
+            reason = self.model.stall_reason
+        stall_file.write('* * * Stalled run ' + str(run) + ', ' + str(num_distractors) + ' distractors: ' + reason + ' * * *\n')
+        for key in ('iteration', 'fixation', 'selected_item', 'attn_shift_timer', 'idle_iterations', 'num_viable', 'num_attended', 'num_eye_movements'):
+            stall_file.write(key + ' = ' + str(snapshot[key]) + '\n')
+        stall_file.write('index\tname\tlocation\tintegrator\tpriority\tdist_wt\trejected\n')
+        for item in snapshot['items']:
+            stall_file.write('%i\t%s\t%s\t%.6f\t%.6f\t%.6f\t%s\n' % (item['index'], item['name'], str(item['location']), item['integrator'], item['priority'], item['dist_wt'], str(item['rejected'])))
+        stall_file.write('\n')
+        stall_file.flush() # so the snapshot survives even if the job is killed
+
     # * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
     # * * * * * * * * * * Data handling * * * * * * * * * * *
     # * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
@@ -333,55 +544,11 @@ class SearchModelInterface(object):
 
     def slope_and_intercept(self,data):
         """
-        computes the slope and intercept of the search function
+        computes the slope and intercept of the search function (see SearchRegression)
         :param data: [num,rt,sem,num_errors]
-        :return:
+        :return: (slope, intercept, variance accounted for)
         """
-        N  = 0 # the index into data of the N's
-        RT = 1 # the index of the data into the RT's
-
-        # 1) first get the correlation between data[0] (n) and data[1] (rt)
-        means      = [0.0,0.0]# mean of n and rt
-        variances  = [0.0,0.0]
-        # 1.1) get the of the n and rt data
-        num_scores = 0 # number of rts and ns
-        for entry in data: # for each entry
-            means[N]   += entry[N]
-            means[RT]  += entry[RT]
-            num_scores += 1
-        means[N]  /= num_scores
-        means[RT] /= num_scores
-        # 1.2) get the variances
-        for entry in data:
-            variances[N]  += (means[N]  - entry[N])  ** 2
-            variances[RT] += (means[RT] - entry[RT]) ** 2
-        variances[N]  = pow(variances[N],  0.5)
-        variances[RT] = pow(variances[RT], 0.5)
-        # 1.3) numerator of correlation
-        numerator = 0.0
-        for i in range(len(data)):
-            numerator += (data[i][N] - means[N]) * (data[i][RT] - means[RT])
-        # 1.4) denominator for correlation
-        Ns_length  = 0.0
-        RTs_length = 0.0
-        for i in range(len(data)):
-            Ns_length  += (data[i][N]  - means[N])** 2
-            RTs_length += (data[i][RT] - means[RT])** 2
-        Ns_length  = pow(Ns_length,0.5)
-        RTs_length = pow(RTs_length,0.5)
-        # 1.5) the correlation & variance accounted for
-        correlation = numerator/(Ns_length * RTs_length)
-        variance_accounted = correlation**2
-
-        # 2) slope = correlation * rise/run = correlation * (RT_variance/N_varniance)
-        slope = correlation * variances[RT]/variances[N]
-
-        # 3) intercept
-        # y = mx + b, where y = mean RT and x = mean N and m = slope
-        # b = y - mx
-        intercept = means[RT] - slope * means[N]
-
-        return (slope, intercept, variance_accounted)
+        return SearchRegression.slope_and_intercept(data)
 
     # * * * * * * * * * * * * * * * * * * * * * * * *
     # * * * * * * * * * * Menus * * * * * * * * * * *
@@ -667,6 +834,7 @@ class SearchModelInterface(object):
         self.regression_summary_rts = []
         #TODO: add ability to run more than one suite
         self.VERBOSE = True
+        self.data_file_index = DataFiles.reserve_indices(1) # the suite's data files' index (see DataFiles)
 
         print
         print( '* * * Design a Simulation (Suite) * * *')
@@ -787,425 +955,24 @@ class SearchModelInterface(object):
         self.model.VERBOSE = False
 
         print("Which premade simulation would you like to run?")
-        print(" 1 - Simulation 1: Treisman & Gelade (1980)\n")
-        print(" 2 - Simulation 2: Wolfe et al. (1989)\n")
-        print(" 3 - Simulation 3: Buetti et al. (2016)\n")
-        print(" 4 - Simulation 4: Treisman & Souther (1985)\n")
-        print(" 5 - Simulation 5: Pomerantz et al. (1977)\n")
-        print(" 6 - Simulation 6: Similar to Logan (1994) using multicolor items\n")
-        print(" 7 - Simulation 7: Similar to Logan (1994) using single color items\n")
-        print(" 8 - Simulation 8: Multicolor relations with emergent feature, default salience\n")
-        print(" 9 - Simulation 8: Multicolor relations with emergent feature, reduced salience\n")
-        print("10 - Simulation 9: Monocolor relations with emergent feature, default salience\n")
-        print("11 - Simulation 9: Monocolor relations with emergent feature in relation-only condition only\n")
-        print("12 - Simulation 10: Multicolor relations with emergent feature with increased spacing\n")
+        for sim_id in sorted(PremadeSimulations.PREMADE_SIMULATIONS):
+            print("%2i - %s\n" % (sim_id, PremadeSimulations.PREMADE_SIMULATIONS[sim_id]['title']))
 
         SIM_ID = 99
-        while not (SIM_ID in {1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12}):
+        while not (SIM_ID in PremadeSimulations.PREMADE_SIMULATIONS):
             SIM_ID = int(input('Simulation number >'))
 
 
-        # increment the datafile index here: should be a unique index for each SUITE of simulations run
-        self.data_file_index += 1
-        self.regression_summary_rts = []
-
-
-        if SIM_ID == 1:
-        # # # 1) Triesman & Gelade (1980)
-
-            dim_index = 0
-            for i in range(len(self.model.color_vectors['red'])):
-                self.model.COLOR_DIMENSIONS.append(dim_index)
-                dim_index += 1
-
-            for i in range(len(self.model.shape_vectors['X'])):
-                self.model.SHAPE_DIMENSIONS.append(dim_index)
-                dim_index += 1
-
-            for i in range(len(self.model.relation_vectors['above'])):
-                self.model.RELATION_DIMENSIONS.append(dim_index)
-                dim_index += 1
-
-            self.model.non_relation_dimensions = self.model.COLOR_DIMENSIONS + self.model.SHAPE_DIMENSIONS
-            self.model.salience = [1] * 18 + [1] * 27
-
-
-            num_subjects = 100
-            for subject in range(num_subjects):
-                csv_file_name = str(self.data_file_index) + '.csv'
-                csv_data_file = open('data/' + csv_file_name, 'a', encoding='UTF8')
-                writer = csv.writer(csv_data_file, delimiter=',')
-                writer.writerow(['resp.corr', 'total_setsize', 'trial_type', 'resp.rt', 'dcolor', 'participant'])
-                csv_data_file.close()
-                self.run_suite([[['blue', 'X', 'none']], 1], [[[['dkgrn', 'X','none']],1], [[['brown', 'T1','none']],1]], str(self.data_file_index), 1, [0, 4, 14, 29],52)
-                self.run_suite([[['dkgrn', 'T1', 'none']], 1], [[[['dkgrn', 'X', 'none']], 1], [[['brown', 'T1', 'none']], 1]], str(self.data_file_index), 2, [0, 4, 14, 29], 52)
-
-                self.data_file_index += 1
-
-        elif SIM_ID == 2:
-        # # # 2) Wolfe, Cave & Franzel (1989)
-
-            dim_index = 0
-            for i in range(len(self.model.color_vectors['red'])):
-                self.model.COLOR_DIMENSIONS.append(dim_index)
-                dim_index += 1
-
-            for i in range(len(self.model.shape_vectors['X'])):
-                self.model.SHAPE_DIMENSIONS.append(dim_index)
-                dim_index += 1
-
-            for i in range(len(self.model.relation_vectors['above'])):
-                self.model.RELATION_DIMENSIONS.append(dim_index)
-                dim_index += 1
-
-            self.model.non_relation_dimensions = self.model.COLOR_DIMENSIONS + self.model.SHAPE_DIMENSIONS
-            self.model.salience = [1] * 18 + [1] * 27
-
-            num_subjects = 100
-            for subject in range(num_subjects):
-                csv_file_name = str(self.data_file_index) + '.csv'
-                csv_data_file = open('data/' + csv_file_name, 'a', encoding='UTF8')
-                writer = csv.writer(csv_data_file, delimiter=',')
-                writer.writerow(['resp.corr', 'total_setsize', 'trial_type', 'resp.rt', 'dcolor', 'participant'])
-                csv_data_file.close()
-                self.run_suite([[['green', 'horizontal', 'none']], 1], [[[['red', 'vertical', 'none']], 1]], str(self.data_file_index), 1, [0, 2, 4, 8, 16, 24, 36], 52)
-                self.run_suite([[['green', 'horizontal','none']],1], [[[['green', 'vertical','none']],1], [[['red', 'horizontal','none']],1]], str(self.data_file_index), 2, [0, 2, 4, 8, 16, 24, 36],52)
-                self.data_file_index += 1
-
-        elif SIM_ID == 3:
-        # # # 3) Target-distractor similarity (Buetti et al., 2016)
-
-            dim_index = 0
-            for i in range(len(self.model.color_vectors['red'])):
-                self.model.COLOR_DIMENSIONS.append(dim_index)
-                dim_index += 1
-
-            for i in range(len(self.model.shape_vectors['X'])):
-                self.model.SHAPE_DIMENSIONS.append(dim_index)
-                dim_index += 1
-
-            for i in range(len(self.model.relation_vectors['above'])):
-                self.model.RELATION_DIMENSIONS.append(dim_index)
-                dim_index += 1
-
-            self.model.non_relation_dimensions = self.model.COLOR_DIMENSIONS + self.model.SHAPE_DIMENSIONS
-            self.model.salience = [1] * 18 + [1.5] * 27
-
-            num_subjects = 100
-            for subject in range(num_subjects):
-                csv_file_name = str(self.data_file_index) + '.csv'
-                csv_data_file = open('data/' + csv_file_name, 'a', encoding='UTF8')
-                writer = csv.writer(csv_data_file, delimiter=',')
-                writer.writerow(['resp.corr', 'total_setsize', 'trial_type', 'resp.rt', 'dcolor', 'participant'])
-                csv_data_file.close()
-                self.run_suite([[['red', 'vertical', 'none']], 1], [[[['ltblue', 'horizontal', 'none']], 1]], str(self.data_file_index), 1, [0, 1, 4, 9, 19, 31], 52)
-                self.run_suite([[['red', 'vertical', 'none']], 1], [[[['yel2ow', 'vertical', 'none']], 1]], str(self.data_file_index), 2, [0, 1, 4, 9, 19, 31], 52)
-                self.run_suite([[['red', 'vertical', 'none']], 1], [[[['orange', 'vertical', 'none']], 1]], str(self.data_file_index), 3, [0, 1, 4, 9, 19, 31], 52)
-                self.data_file_index += 1
-
-
-        elif SIM_ID == 4:
-        # # # 4) Search asymmetries (Treisman & Souther, 1985)
-
-            dim_index = 0
-            for i in range(len(self.model.color_vectors['red'])):
-                self.model.COLOR_DIMENSIONS.append(dim_index)
-                dim_index += 1
-
-            for i in range(len(self.model.shape_vectors['X'])):
-                self.model.SHAPE_DIMENSIONS.append(dim_index)
-                dim_index += 1
-
-            for i in range(len(self.model.relation_vectors['above'])):
-                self.model.RELATION_DIMENSIONS.append(dim_index)
-                dim_index += 1
-
-            self.model.non_relation_dimensions = self.model.COLOR_DIMENSIONS + self.model.SHAPE_DIMENSIONS
-            self.model.salience = [1] * 18 + [1] * 27
-
-            num_subjects = 100
-            for subject in range(num_subjects):
-                csv_file_name = str(self.data_file_index) + '.csv'
-                csv_data_file = open('data/' + csv_file_name, 'a', encoding='UTF8')
-                writer = csv.writer(csv_data_file, delimiter=',')
-                writer.writerow(['resp.corr', 'total_setsize', 'trial_type', 'resp.rt', 'dcolor', 'participant'])
-                csv_data_file.close()
-                self.run_suite([[['white', 'Q', 'none']],1], [[[['white', 'O','none']],1]],  str(self.data_file_index), 1, [0,5,11], 100)
-                self.run_suite([[['white', 'O','none']],1], [[[['white', 'Q','none']],1]], str(self.data_file_index), 2, [0,5,11], 100)
-                self.data_file_index += 1
-
-        elif SIM_ID == 5:
-        # # # 5) Search for oppositely oriented diagonals and Pomerantz stimuli Pomerantz, Saeger, and Stover (1977)
-
-            dim_index = 0
-            for i in range(len(self.model.color_vectors['red'])):
-                self.model.COLOR_DIMENSIONS.append(dim_index)
-                dim_index += 1
-
-            for i in range(len(self.model.shape_vectors['P1'])):
-                self.model.SHAPE_DIMENSIONS.append(dim_index)
-                dim_index += 1
-
-            for i in range(len(self.model.relation_vectors['above'])):
-                self.model.RELATION_DIMENSIONS.append(dim_index)
-                dim_index += 1
-
-            self.model.non_relation_dimensions = self.model.COLOR_DIMENSIONS + self.model.SHAPE_DIMENSIONS
-            self.model.salience = [1] * 18 + [1] * 27 + [1] * self.model.POMERANTZ_UNITS + [1] * self.model.POMERANTZ_UNITS
-
-            num_subjects = 64
-            participant = self.data_file_index
-            for subject in range(num_subjects):
-                csv_file_name = str(self.data_file_index) + '.csv'
-                search_type = str(self.data_file_index)
-                csv_data_file = open('data/' + csv_file_name, 'a', encoding='UTF8')
-                writer = csv.writer(csv_data_file, delimiter=',')
-                writer.writerow(['resp.corr', 'total_setsize', 'trial_type', 'resp.rt', 'dcolor', 'participant'])
-                csv_data_file.close()
-                self.run_suite([[['red', 'DORN2','none']],1], [[[['red', 'DORN6','none']],1]], search_type, 1, [1, 3, 5], 100)
-                self.run_suite([[['red', 'P1','none']],1], [[[['red', 'P2','none']],1]], search_type, 2, [1, 3, 5], 100)
-                self.run_suite([[['red', 'arrow','none']],1], [[[['red', 'triangle','none']],1]], search_type, 3, [1, 3, 5], 100)
-                self.data_file_index += 1
-        # '''
-        # self.data_file_index -= num_subjects
-        # for subject in range(num_subjects):
-        #     csv_file_name = str(self.data_file_index) +  '_2.csv'
-        #     search_type = str(self.data_file_index) + '_2'
-        #     csv_data_file = open('data/' + csv_file_name, 'a', encoding='UTF8')
-        #     writer = csv.writer(csv_data_file, delimiter=',')
-        #     writer.writerow(['resp.corr', 'total_setsize', 'trial_type', 'resp.rt', 'dcolor', 'participant'])
-        #     csv_data_file.close()
-        #     #self.run_suite([[['red', 'DORN2','none']],1], [[[['red', 'DORN6','none']],1]], str(self.data_file_index), 1, [0, 1, 3, 5], 100)
-        #     self.run_suite([[['red', 'P1','none']],1], [[[['red', 'P2','none']],1]], search_type, 2, [0, 1, 3, 5], 100)
-        #     self.data_file_index += 1
-
-
-        #
-        # # # # 5) Relational Searches
-        #No cheat feature multicolor
-        elif SIM_ID == 6:
-
-            dim_index = 0
-            for i in range(len(self.model.color_vectors['red'])):
-                self.model.COLOR_DIMENSIONS.append(dim_index)
-                dim_index += 1
-
-            for i in range(len(self.model.shape_vectors['cheatXabove'])):
-                self.model.SHAPE_DIMENSIONS.append(dim_index)
-                dim_index += 1
-
-            for i in range(len(self.model.relation_vectors['above'])):
-                self.model.RELATION_DIMENSIONS.append(dim_index)
-                dim_index += 1
-
-            self.model.non_relation_dimensions = self.model.COLOR_DIMENSIONS + self.model.SHAPE_DIMENSIONS
-            self.model.salience = [1] * 18 + [1] * 27 + [1]*2
-
-            num_subjects = 32
-            for subject in range(num_subjects):
-                csv_file_name = str(self.data_file_index) + '.csv'
-                csv_data_file = open('data/' + csv_file_name, 'a', encoding='UTF8')
-                writer = csv.writer(csv_data_file, delimiter=',')
-                writer.writerow(['resp.corr', 'total_setsize', 'trial_type', 'resp.rt', 'dcolor', 'participant'])
-                csv_data_file.close()
-                self.run_suite([[['red', 'nocheatX', 'above'], ['green', 'nocheatO', 'below']], 1], [[[['green','nocheatO', 'above'],['red', 'nocheatX', 'below']], 1]], str(self.data_file_index), 1, [0, 1, 3, 7, 15], 52)#[0, 1, 3, 7, 15], 52)
-                self.run_suite([[['red', 'nocheatX', 'above'], ['green', 'nocheatO', 'below']], 1], [[[['green', 'nocheatO', 'above'], ['orange', 'nocheatX', 'below']], 1]], str(self.data_file_index), 2, [0, 1, 3, 7,15], 52)#[0, 1, 3, 7, 15], 52)
-                self.run_suite([[['red', 'nocheatX', 'above'], ['green', 'nocheatO', 'below']], 1], [[[['orange', 'nocheatX', 'above'], ['green', 'nocheatO', 'below']], 1]], str(self.data_file_index), 3, [0, 1, 3, 7,15], 52)#[0, 1, 3, 7, 15], 52)
-
-                self.data_file_index += 1
-
-        elif SIM_ID == 7:
-        # No cheat feature monocolor
-
-            dim_index = 0
-            for i in range(len(self.model.color_vectors['red'])):
-                self.model.COLOR_DIMENSIONS.append(dim_index)
-                dim_index += 1
-
-            for i in range(len(self.model.shape_vectors['cheatXabove'])):
-                self.model.SHAPE_DIMENSIONS.append(dim_index)
-                dim_index += 1
-
-            for i in range(len(self.model.relation_vectors['above'])):
-                self.model.RELATION_DIMENSIONS.append(dim_index)
-                dim_index += 1
-
-            self.model.non_relation_dimensions = self.model.COLOR_DIMENSIONS + self.model.SHAPE_DIMENSIONS
-            self.model.salience = [1] * 18 + [1] * 27 + [1]*2
-
-            num_subjects = 32
-            for subject in range(num_subjects):
-                csv_file_name = str(self.data_file_index) + '.csv'
-                csv_data_file = open('data/' + csv_file_name, 'a', encoding='UTF8')
-                writer = csv.writer(csv_data_file, delimiter=',')
-                writer.writerow(['resp.corr', 'total_setsize', 'trial_type', 'resp.rt', 'dcolor', 'participant'])
-                csv_data_file.close()
-                self.run_suite([[['red', 'nocheatX', 'above'], ['red', 'nocheatO', 'below']], 1], [[[['red', 'nocheatO', 'above'], ['red', 'nocheatX', 'below']], 1]], str(self.data_file_index), 1, [0, 1, 3, 7, 15], 52)
-                self.run_suite([[['red', 'nocheatX', 'above'], ['red', 'nocheatO', 'below']], 1], [[[['orange', 'nocheatO', 'above'], ['orange', 'nocheatX', 'below']], 1]], str(self.data_file_index), 2, [0, 1, 3, 7, 15], 52)
-                self.run_suite([[['red', 'nocheatX', 'above'], ['red', 'nocheatO', 'below']], 1], [[[['orange', 'nocheatX', 'above'], ['orange', 'nocheatO', 'below']], 1]], str(self.data_file_index), 3,  [0, 1, 3, 7, 15], 52)
-                self.data_file_index += 1
-
-
-        # Cheat feature multicolor (salience and other parameters are set elsewhere according to the )
-        elif SIM_ID == 8:
-
-            dim_index = 0
-            for i in range(len(self.model.color_vectors['red'])):
-                self.model.COLOR_DIMENSIONS.append(dim_index)
-                dim_index += 1
-
-            for i in range(len(self.model.shape_vectors['cheatXabove'])):
-                self.model.SHAPE_DIMENSIONS.append(dim_index)
-                dim_index += 1
-
-            for i in range(len(self.model.relation_vectors['above'])):
-                self.model.RELATION_DIMENSIONS.append(dim_index)
-                dim_index += 1
-
-            self.model.non_relation_dimensions = self.model.COLOR_DIMENSIONS + self.model.SHAPE_DIMENSIONS
-            self.model.salience = [1] * 18 + [1] * 27 + [1]*2
-
-            num_subjects = 32
-            for subject in range(num_subjects):
-                csv_file_name = str(self.data_file_index) + '.csv'
-                csv_data_file = open('data/' + csv_file_name, 'a', encoding='UTF8')
-                writer = csv.writer(csv_data_file, delimiter=',')
-                writer.writerow(['resp.corr', 'total_setsize', 'trial_type', 'resp.rt', 'dcolor', 'participant'])
-                csv_data_file.close()
-                self.run_suite([[['red', 'cheatXabove', 'above'], ['green', 'cheatObelow', 'below']], 1], [[[['green', 'cheatOabove', 'above'], ['red', 'cheatXbelow', 'below']], 1]], str(self.data_file_index), 1, [0, 1, 3, 7, 15], 52)
-                self.run_suite([[['red', 'cheatXabove', 'above'], ['green', 'cheatObelow', 'below']], 1], [[[['green', 'cheatOabove', 'above'], ['orange', 'cheatXbelow', 'below']], 1]], str(self.data_file_index), 2, [0, 1, 3, 7, 15], 52)
-                self.run_suite([[['red', 'cheatXabove', 'above'], ['green', 'cheatObelow', 'below']], 1], [[[['orange', 'cheatXabove', 'above'], ['green', 'cheatObelow', 'below']], 1]], str(self.data_file_index), 3, [0, 1, 3, 7, 15], 52)
-                self.data_file_index += 1
-
-        # Cheat feeture multicolor reduced salience
-
-        elif SIM_ID == 9:
-            dim_index = 0
-
-            for i in range(len(self.model.color_vectors['red'])):
-                self.model.COLOR_DIMENSIONS.append(dim_index)
-                dim_index += 1
-
-            for i in range(len(self.model.shape_vectors['cheatXabove'])):
-                self.model.SHAPE_DIMENSIONS.append(dim_index)
-                dim_index += 1
-            for i in range(len(self.model.relation_vectors['above'])):
-                self.model.RELATION_DIMENSIONS.append(dim_index)
-                dim_index += 1
-
-            self.model.non_relation_dimensions = self.model.COLOR_DIMENSIONS + self.model.SHAPE_DIMENSIONS
-            self.model.salience = [1] * 18 + [1] * 27 + [0.33] * 2
-            num_subjects = 32
-
-            for subject in range(num_subjects):
-                csv_file_name = str(self.data_file_index) + '.csv'
-                csv_data_file = open('data/' + csv_file_name, 'a', encoding='UTF8')
-                writer = csv.writer(csv_data_file, delimiter=',')
-                writer.writerow(['resp.corr', 'total_setsize', 'trial_type', 'resp.rt', 'dcolor', 'participant'])
-                csv_data_file.close()
-                self.run_suite([[['red', 'cheatXabove', 'above'], ['green', 'cheatObelow', 'below']], 1], [[[['green', 'cheatOabove', 'above'], ['red', 'cheatXbelow', 'below']], 1]], str(self.data_file_index), 1, [0, 1, 3, 7, 15], 52)
-                self.run_suite([[['red', 'cheatXabove', 'above'], ['green', 'cheatObelow', 'below']], 1], [[[['green', 'cheatOabove', 'above'], ['orange', 'cheatXbelow', 'below']], 1]], str(self.data_file_index), 2, [0, 1, 3, 7, 15], 52)
-                self.run_suite([[['red', 'cheatXabove', 'above'], ['green', 'cheatObelow', 'below']], 1], [[[['orange', 'cheatXabove', 'above'], ['green', 'cheatObelow', 'below']], 1]], str(self.data_file_index), 3, [0, 1, 3, 7, 15], 52)
-                self.data_file_index += 1
-
-
-        # Cheat featire monocolor
-
-
-        elif SIM_ID == 10:
-
-            dim_index = 0
-            for i in range(len(self.model.color_vectors['red'])):
-                self.model.COLOR_DIMENSIONS.append(dim_index)
-                dim_index += 1
-
-            for i in range(len(self.model.shape_vectors['cheatXabove'])):
-                self.model.SHAPE_DIMENSIONS.append(dim_index)
-                dim_index += 1
-
-            for i in range(len(self.model.relation_vectors['above'])):
-                self.model.RELATION_DIMENSIONS.append(dim_index)
-                dim_index += 1
-
-            self.model.non_relation_dimensions = self.model.COLOR_DIMENSIONS + self.model.SHAPE_DIMENSIONS
-            self.model.salience = [1] * 18 + [1] * 27 + [1] * 2
-
-            num_subjects = 32
-            for subject in range(num_subjects):
-                csv_file_name = str(self.data_file_index) + '.csv'
-                csv_data_file = open('data/' + csv_file_name, 'a', encoding='UTF8')
-                writer = csv.writer(csv_data_file, delimiter=',')
-                writer.writerow(['resp.corr', 'total_setsize', 'trial_type', 'resp.rt', 'dcolor', 'participant'])
-                csv_data_file.close()
-                self.run_suite([[['red', 'cheatXabove', 'above'], ['red', 'cheatObelow', 'below']], 1], [[[['red', 'cheatOabove', 'above'], ['red', 'cheatXbelow', 'below']], 1]], str(self.data_file_index), 1, [0, 1, 3, 7, 15], 52)
-                self.run_suite([[['red', 'cheatXabove', 'above'], ['red', 'cheatObelow', 'below']], 1], [[[['orange', 'cheatOabove', 'above'], ['orange', 'cheatXbelow', 'below']], 1]], str(self.data_file_index), 2, [0, 1, 3, 7, 15], 52)
-                self.run_suite([[['red', 'cheatXabove', 'above'], ['red', 'cheatObelow', 'below']], 1], [[[['orange', 'cheatXabove', 'above'], ['orange', 'cheatObelow', 'below']], 1]], str(self.data_file_index), 3,  [0, 1, 3, 7, 15], 52)
-
-                self.data_file_index += 1
-
-        # No emergent cheat feature in Relation + feature and Feature-only conditions
-        elif SIM_ID == 11:
-
-            dim_index = 0
-            for i in range(len(self.model.color_vectors['red'])):
-                self.model.COLOR_DIMENSIONS.append(dim_index)
-                dim_index += 1
-
-            for i in range(len(self.model.shape_vectors['cheatXabove'])):
-                self.model.SHAPE_DIMENSIONS.append(dim_index)
-                dim_index += 1
-
-            for i in range(len(self.model.relation_vectors['above'])):
-                self.model.RELATION_DIMENSIONS.append(dim_index)
-                dim_index += 1
-
-            self.model.non_relation_dimensions = self.model.COLOR_DIMENSIONS + self.model.SHAPE_DIMENSIONS
-            self.model.salience = [1] * 18 + [1] * 27 + [1] * 2
-
-            num_subjects = 32
-            for subject in range(num_subjects):
-                csv_file_name = str(self.data_file_index) + '.csv'
-                csv_data_file = open('data/' + csv_file_name, 'a', encoding='UTF8')
-                writer = csv.writer(csv_data_file, delimiter=',')
-                writer.writerow(['resp.corr', 'total_setsize', 'trial_type', 'resp.rt', 'dcolor', 'participant'])
-                csv_data_file.close()
-                self.run_suite([[['red', 'cheatXabove', 'above'], ['red', 'cheatObelow', 'below']], 1], [[[['red', 'cheatOabove', 'above'], ['red', 'cheatXbelow', 'below']], 1]], str(self.data_file_index), 1, [0, 1, 3, 7, 15], 52)
-                self.run_suite([[['red', 'nocheatX', 'above'], ['red', 'nocheatO', 'below']], 1], [[[['orange', 'nocheatO', 'above'], ['orange', 'nocheatX', 'below']], 1]], str(self.data_file_index), 2, [0, 1, 3, 7, 15], 52)
-                self.run_suite([[['red', 'nocheatX', 'above'], ['red', 'nocheatO', 'below']], 1], [[[['orange', 'nocheatX', 'above'], ['orange', 'nocheatO', 'below']], 1]], str(self.data_file_index), 3, [0, 1, 3, 7, 15], 52)
-                self.data_file_index += 1
-
-
-        elif SIM_ID ==12:
-
-            dim_index = 0
-            for i in range(len(self.model.color_vectors['red'])):
-                self.model.COLOR_DIMENSIONS.append(dim_index)
-                dim_index += 1
-
-            for i in range(len(self.model.shape_vectors['cheatXabove'])):
-                self.model.SHAPE_DIMENSIONS.append(dim_index)
-                dim_index += 1
-
-            for i in range(len(self.model.relation_vectors['above'])):
-                self.model.RELATION_DIMENSIONS.append(dim_index)
-                dim_index += 1
-
-            self.model.non_relation_dimensions = self.model.COLOR_DIMENSIONS + self.model.SHAPE_DIMENSIONS
-            self.model.salience = [1] * 18 + [1] * 27 + [0.33] * 2
-
-            num_subjects = 32
-            for subject in range(num_subjects):
-                csv_file_name = str(self.data_file_index) + '.csv'
-                csv_data_file = open('data/' + csv_file_name, 'a', encoding='UTF8')
-                writer = csv.writer(csv_data_file, delimiter=',')
-                writer.writerow(['resp.corr', 'total_setsize', 'trial_type', 'resp.rt', 'dcolor', 'participant'])
-                csv_data_file.close()
-                self.run_suite([[['red', 'cheatXabove', 'above'], ['green', 'cheatObelow', 'below']], 1], [[[['green', 'cheatOabove', 'above'], ['red', 'cheatXbelow', 'below']], 1]], str(self.data_file_index), 1, [0, 1, 3, 7, 15], 52)
-                self.run_suite([[['red', 'cheatXabove', 'above'], ['green', 'cheatObelow', 'below']], 1], [[[['green', 'cheatOabove', 'above'], ['orange', 'cheatXbelow', 'below']], 1]], str(self.data_file_index), 2, [0, 1, 3, 7, 15], 52)
-                self.run_suite([[['red', 'cheatXabove', 'above'], ['green', 'cheatObelow', 'below']], 1], [[[['orange', 'cheatXabove', 'above'], ['green', 'cheatObelow', 'below']], 1]], str(self.data_file_index), 3, [0, 1, 3, 7, 15], 52)
-                self.data_file_index += 1
-
+        # reserve the datafile indices here: a unique index for each SUBJECT of the suite. they're written to the
+        # file now, not when the suite is done, so neither another run nor an interrupted suite gets them again
+        num_subjects = PremadeSimulations.PREMADE_SIMULATIONS[SIM_ID]['num_subjects']
+        first_index  = DataFiles.reserve_indices(num_subjects)
+        self.data_file_index = first_index + num_subjects
 
+        # keep a journal as the suite runs, so it can be resumed if it's interrupted (see SuiteCheckpoint), and run it
+        self.checkpoint = SuiteCheckpoint.SuiteCheckpoint(SuiteCheckpoint.CHECKPOINT_FILE % first_index,
+                                                          {'sim_id': SIM_ID, 'first_index': first_index, 'num_subjects': num_subjects})
+        self.run_premade_subjects()
 
 
         # # Cheat feature multicolor SPACED OUT like Experiment 4b
@@ -1348,29 +1115,145 @@ class SearchModelInterface(object):
         #                    [[[['orange', 'nocheatX', 'above'], ['orange', 'nocheatO', 'below']], 1]],
         #                    str(self.data_file_index), 3, [0, 1, 3, 7, 15], 52)
         #     self.data_file_index += 1
-        print(str(self.regression_summary_rts))
-        self.graph_regression()
 
-        # and finally, write the updated index to the file so it can be incremented next run
+        self.close_worker_pool()
+        exit()
+
+    def close_worker_pool(self):
+        """
+        stops the worker processes suites run in, if they're up
+        :return:
+        """
+        if self.worker_pool is not None:
+            self.worker_pool.close()
+            self.worker_pool = None
+
+    def resume_premade_suite(self):
+        """
+        resumes a premade suite that was interrupted (see SuiteCheckpoint): the subjects, suites and set sizes it
+        finished are skipped, and the rest are run as they would have been
+        :return:
+        """
+        unfinished = SuiteCheckpoint.find_unfinished()
+        if not unfinished:
+            print( 'There are no interrupted suites to resume')
+            return
+        print("Which suite would you like to resume?")
+        for number in range(len(unfinished)):
+            header = unfinished[number][1]
+            print("%2i - %s (data files %i...%i)\n" % (number, PremadeSimulations.PREMADE_SIMULATIONS[header['sim_id']]['title'],
+                                                         header['first_index'], header['first_index'] + header['num_subjects'] - 1))
+        number = -1
+        while not (0 <= number < len(unfinished)):
+            number = int(input('Suite number >'))
+
+        self.model.VERBOSE = False
+        self.checkpoint = SuiteCheckpoint.SuiteCheckpoint(unfinished[number][0])
+        # (in case data_index.txt lost the suite's indices)
+        self.data_file_index = max(self.data_file_index, self.checkpoint.header['first_index'] + self.checkpoint.header['num_subjects'])
         self.write_file_index()
+        self.run_premade_subjects()
+        self.close_worker_pool()
 
         exit()
 
+    def run_premade_subjects(self):
+        """
+        runs the subjects of the premade suite self.checkpoint is the journal of (skipping what it says is done
+        already), then graphs the regressions
+        :return:
+        """
+        header     = self.checkpoint.header
+        next_index = self.data_file_index # (run_suite names its files by self.data_file_index: it's set to each subject's)
+        self.regression_summary_rts = []
+        subject_quantiles = [] # each suite's subjects' rt quantiles, for Vincentizing (see write_vincentized)
+
+        # set the feature dimensions and salience for this simulation, then run its suites once per subject
+        simulation = PremadeSimulations.configure_model(self.model, header['sim_id'])
+        if self.PROGRESS:
+            total = 0
+            for (target, distractors, condition, num_distractors_list, num_runs) in simulation['suites']:
+                total += num_runs * len(num_distractors_list)
+            self.progress_reporter = SuiteProgress.ProgressReporter(simulation['title'], total * header['num_subjects'], self.PROGRESS)
+        for subject in range(header['num_subjects']):
+            self.data_file_index = header['first_index'] + subject
+            csv_file_name = str(self.data_file_index) + '.csv' + BackgroundWriter.COMPRESSIONS[self.COMPRESSION]
+            # the subject's csv file, which all its suites write to (see run_suite)
+            self.checkpoint.restore_file('data/' + csv_file_name)
+            self.csv_writer = BackgroundWriter.BackgroundWriter('data/' + csv_file_name, 'a', self.COMPRESSION)
+            if not self.checkpoint.completed('s%i' % subject):
+                self.csv_writer.writerow(['resp.corr', 'total_setsize', 'trial_type', 'resp.rt', 'dcolor', 'participant'])
+                self.checkpoint.commit('s%i' % subject, None, [self.csv_writer])
+            for suite in range(len(simulation['suites'])):
+                (target, distractors, condition, num_distractors_list, num_runs) = simulation['suites'][suite]
+                self.checkpoint.begin_suite(subject, suite)
+                self.run_suite(target, distractors, str(self.data_file_index), condition, num_distractors_list, num_runs)
+                if subject == 0:
+                    subject_quantiles.append([])
+                if self.suite_rt_quantiles:
+                    subject_quantiles[suite].append(self.suite_rt_quantiles)
+            self.csv_writer.close()
+            self.csv_writer = None
+        self.data_file_index = next_index
+        if self.progress_reporter:
+            self.progress_reporter.finish()
+            self.progress_reporter = None
+        self.checkpoint.finish()
+        self.checkpoint = None
+        self.write_vincentized(simulation, header['first_index'], subject_quantiles)
+
+        print(str(self.regression_summary_rts))
+        self.graph_regression()
+
+    def write_vincentized(self, simulation, first_index, subject_quantiles):
+        """
+        writes each suite's Vincentized rt quantiles (each quantile of each set size averaged over the subjects) to
+        data/<first_index>_vincentized.txt
+        :param simulation: the premade simulation (see PremadeSimulations.configure_model)
+        :param first_index: the first subject's data file index
+        :param subject_quantiles: for each suite, its subjects' (num. lures, quantiles) (see run_suite)
+        :return:
+        """
+        if RTDistributions.NUMPY_FAILED:
+            return
+        file_name = 'data/' + str(first_index) + '_vincentized.txt'
+        text = 'Vincentized RT quantiles of ' + simulation['title'] + ' (n = num. distractors; subj = num. subjects with correct runs; q10...q90 = rt quantiles, averaged over subjects)\n'
+        for suite in range(len(subject_quantiles)):
+            (target, distractors, condition, num_distractors_list, num_runs) = simulation['suites'][suite]
+            text += '\nTarget: ' + str(target) + '\nDistractors: ' + str(distractors) + '\n'
+            text += 'n\tsubj\t' + '\t'.join(['q%i' % round(100 * p) for p in RTDistributions.QUANTILES]) + '\n'
+            if not subject_quantiles[suite]:
+                continue
+            (lures, averages, counts) = RTDistributions.vincentize(subject_quantiles[suite])
+            for row in range(len(lures)):
+                text_data = [str(lures[row]), str(counts[row])]
+                text_data.extend([RTDistributions.format_number(value) for value in averages[row]])
+                text += '\t'.join(text_data) + '\n'
+        DataFiles.write_atomically(file_name, text)
+        print(file_name + ' saved')
+
     def graph_regression(self):
 
         """
         attempt to show graphs in graphic mode. if fail, then just curl up and die
+        with self.EXPORT_GRAPHS, export them (see export_graphs) without asking
         :return:
         """
+        if self.EXPORT_GRAPHS:
+            self.export_graphs()
+            return
+
         # ask whether user wants graphic run
-        legal_responses = ('y', 'n')
+        legal_responses = ('y', 'n', 'e')
         response = ''
         while not response in legal_responses:
-            response = input('Graphic: (y)es or (n)o?')
+            response = input('Graphic: (y)es, (n)o or (e)xport to data/graphs?')
 
+        if response == 'e':
+            self.export_graphs()
 
         # otherwise TRY to run graphic, and note whether you failed
-        if response == 'y':
+        elif response == 'y':
             # if you don't already have the graphics handler, then try to create it
             if not self.graphics_handler:
                 try:
@@ -1383,9 +1266,47 @@ class SearchModelInterface(object):
             if self.graphics_handler and not self.graphics_failed:
                 self.graphics_handler.show_graphs(self.regression_summary_rts)
 
+    def export_graphs(self):
+        """
+        saves the regression graphs, and any display snapshots, to data/graphs as .png files, drawn off screen
+        (so it works with no display, e.g., in a batch job)
+        :return:
+        """
+        if GraphicalRun1.GRAPHICS_FAILED:
+            print( 'Exporting graphs needs pygame, which failed to load')
+            return 0
+        file_names = GraphicalRun1.export_images(self.regression_summary_rts, 'data/graphs', '(%3i)'%self.data_file_index, self.display_snapshots)
+        print( str(len(file_names))+' images saved to data/graphs')
+        self.display_snapshots = []
+        return 1
 
-
-
+    def replay_recorded_trial(self):
+        """
+        replays a recorded trial (made with (r)ecord in a graphic run, or a trace from a suite) in the graphics window
+        :return:
+        """
+        if TraceRecorder.NUMPY_FAILED:
+            print( 'Replay needs numpy, which failed to load')
+            return 0
+        file_name = input('Recording (.npz) file >')
+        speed = input('Iterations per second (default 10) >')
+        if speed: speed = float(speed)
+        else: speed = 10.0
+        start_iteration = input('Start at iteration (default 0) >')
+        if start_iteration: start_iteration = int(start_iteration)
+        else: start_iteration = 0
+
+        if not self.graphics_handler:
+            try:
+                self.graphics_handler = GraphicalRun1.GraphicalRun(self)
+            except:
+                self.graphics_handler = None
+                self.graphics_failed  = True
+        if self.graphics_handler and not self.graphics_failed:
+            self.graphics_handler.replay(file_name, speed, start_iteration)
+            return 1
+        print( "No go, Jack. I couldn't init the graphics handler.")
+        return 0
 
     def modify_parameters(self):
         """
@@ -1504,9 +1425,18 @@ class SearchModelInterface(object):
         text_lines.append('\n* * * Search Model * * *')
         text_lines.append('* *     Main Menu    * *\n')
         text_lines.append('(v) Verbose is ' + str(self.VERBOSE) + '. Toggle to ' + str(not (self.VERBOSE)) + '.')
+        text_lines.append('(t) Trace is ' + str(self.TRACE) + '. Toggle to ' + str(not (self.TRACE)) + '.')
+        text_lines.append('(x) Export graphs (no window) is ' + str(self.EXPORT_GRAPHS) + '. Toggle to ' + str(not (self.EXPORT_GRAPHS)) + '.')
+        text_lines.append('(d) Export displays with the graphs is ' + str(self.EXPORT_DISPLAYS) + '. Toggle to ' + str(not (self.EXPORT_DISPLAYS)) + '.')
+        text_lines.append('(w) Worker processes for suites: ' + str(self.PROCESSES) + '. Change.')
+        text_lines.append('(z) Compression of suites\' csv files: ' + str(self.COMPRESSION) + '. Change.')
+        text_lines.append('(o) Progress reports of suites: ' + str(self.PROGRESS) + '. Change.')
+        text_lines.append('(m) Metrics file (data/metrics/casper.prom) is ' + str(self.METRICS) + '. Toggle to ' + str(not (self.METRICS)) + '.')
         # text_lines.append('(g) Switch to graphics (there is no coming back)\n')
         #text_lines.append('\n(1) Run a ready-made simulation')
         text_lines.append('(1) Run a ready-made suite of simulations')
+        text_lines.append('(r) Resume an interrupted suite')
+        text_lines.append('(p) Play back a recorded trial')
         #text_lines.append('\n(3) Make and run a new simulation')
         #text_lines.append('(4) Make and run a new suite of simulations\n')
         #text_lines.append('(5) Modify parameters\n')
@@ -1519,7 +1449,7 @@ class SearchModelInterface(object):
         this is the main menu of the interface when it's run in non-graphical mode
         :return:
         """
-        legal_responses = ('q','v','1')#,'2','3','4','5','6')
+        legal_responses = ('q','v','t','x','d','w','z','o','m','p','r','1')#,'2','3','4','5','6')
         all_done = False
         while not(all_done):
             text_lines = self.get_menu_items()
@@ -1530,8 +1460,33 @@ class SearchModelInterface(object):
             while not response in legal_responses:
                 response = input('<<<< Your desire? >>>>')
 
-            if response == 'q': all_done = True
+            if response == 'q':
+                self.close_worker_pool()
+                all_done = True
             elif response == 'v': self.VERBOSE = not(self.VERBOSE)
+            elif response == 't':
+                if TraceRecorder.NUMPY_FAILED:
+                    print( 'Tracing needs numpy, which failed to load')
+                else:
+                    self.TRACE = not(self.TRACE)
+            elif response == 'x': self.EXPORT_GRAPHS = not(self.EXPORT_GRAPHS)
+            elif response == 'm': self.METRICS = not(self.METRICS)
+            elif response == 'd': self.EXPORT_DISPLAYS = not(self.EXPORT_DISPLAYS)
+            elif response == 'w':
+                processes = input('How many worker processes (1 runs suites here, 0 means one per CPU)? ')
+                try:
+                    self.PROCESSES = max(int(processes), 0) or None
+                    self.close_worker_pool() # (the next suite starts a pool of the new size)
+                except ValueError:
+                    print( 'That is not a number. Worker processes left at ' + str(self.PROCESSES))
+            elif response == 'z':
+                # None -> gzip -> lzma -> None
+                compressions = [None, 'gzip', 'lzma']
+                self.COMPRESSION = compressions[(compressions.index(self.COMPRESSION) + 1) % len(compressions)]
+            elif response == 'o':
+                # None -> terminal -> file (data/progress.json) -> None
+                modes = SuiteProgress.MODES
+                self.PROGRESS = modes[(modes.index(self.PROGRESS) + 1) % len(modes)]
             elif response == 'g':
                 return True # True here means Go to the graphical menu
             elif response == '2':
@@ -1544,6 +1499,10 @@ class SearchModelInterface(object):
                     print
             elif response == '1':
                 self.run_premade_suite()
+            elif response == 'r':
+                self.resume_premade_suite()
+            elif response == 'p':
+                self.replay_recorded_trial()
             elif response == '3':
                 self.run_handmade_simulation()
             elif response == '4':
@@ -1565,15 +1524,17 @@ class SearchModelInterface(object):
 # * * * * * * * * * * * Main Body * * * * * * * * * * *
 # * * * * * * * * * * * * * * * * * * * * * * * * * * *
 
-# create the model and the interface
-model = SearchModel1.SearchModel()
-main_interface = SearchModelInterface(model)
+# the guard keeps export_images' worker processes (which re-import the main module where they're spawned) from starting the menu
+if __name__ == '__main__':
+    # create the model and the interface
+    model = SearchModel1.SearchModel()
+    main_interface = SearchModelInterface(model)
 
-main_interface.main_menu()
+    main_interface.main_menu()
 
-# close pygame, if it's open
-if main_interface.graphics_handler:
-    # TRY to close the graphics
-    main_interface.graphics_handler.close_display()
+    # close pygame, if it's open
+    if main_interface.graphics_handler:
+        # TRY to close the graphics
+        main_interface.graphics_handler.close_display()
 
 
@@ -0,0 +1,361 @@
+
+import os, random, multiprocessing, time, json, hashlib, collections
+from multiprocessing import resource_tracker
+import SearchModel1, SharedConditions, SuiteScheduler
+
+
+# * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+# * * * * * * * * * Suites in Worker Processes * * * * * * * * * *
+# * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+
+# Runs the trials of a suite's conditions in a pool of worker processes. The conditions are compiled once, here, and
+# published in shared memory (see SharedConditions); each worker makes its own model, with this model's parameters,
+# and attaches to them by the block's name. A task is just (condition id, seed, first trial, number of trials): a
+# SuiteScheduler splits the conditions into tasks, sized by what it estimates they cost.
+#
+# Every trial gets its own seed, made from the suite's seed, the condition and the trial number (see trial_seed), so
+# the results don't depend on how many workers there are or on which worker runs which trials. They aren't the same
+# random numbers run_suite uses when it runs the trials itself, one after another in one model.
+#
+# The tasks are handed out in order of condition, and each condition's records are handed on as soon as they're all
+# back (see run), so a suite's trials never have to be held in memory all at once.
+#
+# The workers are a WorkerPool's (see below): they stay up from one suite to the next, so a run of short suites (e.g.,
+# a premade suite's subjects) pays for starting them only once. A suite not given a pool starts one of its own.
+
+def get_model_parameters(model):
+    """
+    :param model: a SearchModel
+    :return: the model's parameters (its upper case attributes), its dimension lists and its salience, as a dictionary
+    """
+    parameters = {}
+    for name in vars(model):
+        if name.isupper():
+            parameters[name] = getattr(model, name)
+    parameters['non_relation_dimensions'] = list(model.non_relation_dimensions)
+    parameters['salience'] = list(model.salience)
+    return parameters
+
+def make_model(parameters):
+    """
+    :param parameters: from get_model_parameters
+    :return: a new SearchModel with those parameters
+    """
+    model = SearchModel1.SearchModel(parameters['POMERANTZ_UNITS'])
+    for name in parameters:
+        setattr(model, name, parameters[name])
+    return model
+
+def trial_seed(suite_seed, condition_id, trial):
+    # the seed for one trial (a string: random.seed hashes it, so nearby trials get unrelated random numbers)
+    return '%i:%i:%i' % (suite_seed, condition_id, trial)
+
+class ParallelSuite(object):
+    """
+    the trials of a suite's conditions, run in worker processes
+    """
+    def __init__(self, model, processes=None, seed=None, scheduler=None, pool=None, timed=False):
+        """
+        :param model: the SearchModel whose parameters the trials are run with (the conditions are compiled in it)
+        :param processes: how many worker processes; None means one per CPU
+        :param seed: the suite's seed (see trial_seed); None means a new random one
+        :param scheduler: the SuiteScheduler that splits and orders the tasks; None means one with the usual history
+        :param pool: the WorkerPool to run the trials in; None means a pool of new workers, just for this suite
+        :param timed: whether to time each phase of the trials (see SearchModel.run_whole_search): each record then
+                      has them, as 'phases' (see PhaseRecorder)
+        """
+        self.model      = model
+        self.pool       = pool
+        if pool:
+            processes = pool.processes
+        self.processes  = processes or multiprocessing.cpu_count()
+        if seed is None:
+            seed = random.getrandbits(32)
+        self.seed       = seed
+        self.conditions = SharedConditions.SharedConditions({'overrides': {}, 'timed': timed})
+        self.scheduler  = scheduler or SuiteScheduler.SuiteScheduler()
+        self.specs      = [] # condition id -> {'key', 'num_items', 'num_dimensions', 'num_trials'} (see SuiteScheduler.schedule)
+
+    def add_condition(self, target, non_targets, num_trials):
+        """
+        compiles a condition to run (with model.create_simulation)
+        :param target, non_targets: as for create_simulation
+        :param num_trials: how many trials of it to run
+        :return: the condition's id
+        """
+        condition_id = self.conditions.compile_condition(self.model, target, non_targets)
+        num_items = target[1]
+        for non_target in non_targets:
+            num_items += non_target[1]
+        self.specs.append({'key'           : SuiteScheduler.condition_key(self.model, target, non_targets),
+                           'num_items'     : num_items,
+                           'num_dimensions': len(self.model.non_relation_dimensions) * len(target[0]),
+                           'num_trials'    : num_trials})
+        return condition_id
+
+    def make_tasks(self, in_order=False):
+        # the conditions split into chunks of trials, the costliest first, or in order (see SuiteScheduler.schedule)
+        return self.scheduler.schedule(self.specs, self.processes, in_order)
+
+    def publish(self):
+        """
+        publishes the conditions in shared memory, for the pool's workers (once: after this, no more can be added),
+        with the parameters that differ from the workers' defaults (see WorkerPool.get_overrides)
+        :return: the block's name
+        """
+        if self.conditions.memory is None:
+            if self.pool:
+                self.conditions.info['user']['overrides'] = self.pool.get_overrides(self.model)
+            self.conditions.publish()
+        return self.conditions.memory.name
+
+    def make_jobs(self, in_order=False):
+        # the tasks, as jobs for the WorkerPool (tagged with their condition ids); the conditions are published first
+        block = self.publish()
+        for (condition_id, first_trial, num_trials) in self.make_tasks(in_order):
+            yield {'tag': condition_id, 'block': block, 'condition_id': condition_id, 'seed': self.seed,
+                   'first': first_trial, 'count': num_trials}
+
+    def run(self, progress=None):
+        """
+        runs all the conditions' trials, handing each condition's records on as soon as they're all back (and the
+        conditions before it are done), so only the ones back before their turn are ever kept
+        :param progress: called with (condition id, number of trials, seconds) as each task is done, if it's given
+                         (e.g., SuiteProgress.ProgressReporter.add_trials)
+        :return: (a generator of) for each condition, in order, (a generator of) its trials' records, in trial order.
+                 each condition's are to be used up before the next condition's are asked for (as
+                 SuitePipeline.trial_events does)
+        """
+        chunks = self.run_chunks(progress)
+        for spec in self.specs:
+            yield self.take_records(chunks, spec['num_trials'])
+
+    def take_records(self, chunks, num_trials):
+        # (a generator of) the next num_trials records, from run_chunks
+        while num_trials > 0:
+            records = next(chunks)
+            num_trials -= len(records)
+            for record in records:
+                yield record
+
+    def run_chunks(self, progress):
+        """
+        runs the tasks, in the pool's workers
+        :return: (a generator of) the tasks' records, in order of condition and then trial (a task back before its
+                 turn waits for the ones before it)
+        """
+        pool     = self.pool or WorkerPool(self.model, self.processes)
+        finished = False
+        try:
+            jobs    = list(self.make_jobs(in_order=True))
+            order   = [(job['condition_id'], job['first']) for job in jobs]
+            seconds = [0.0] * len(self.specs) # time spent on each condition
+            waiting = {} # (condition id, first trial) -> the records of a task back before its turn
+            next_chunk = 0 # the index in order of the next task to hand on
+            for (condition_id, first_trial, records, task_seconds) in pool.run(jobs):
+                seconds[condition_id] += task_seconds
+                if progress:
+                    progress(condition_id, len(records), task_seconds)
+                waiting[(condition_id, first_trial)] = records
+                if next_chunk + len(waiting) == len(order):
+                    # (all back: done with the workers before the last records are handed on)
+                    finished = True
+                    self.finish(pool, seconds)
+                while next_chunk < len(order) and order[next_chunk] in waiting:
+                    yield waiting.pop(order[next_chunk])
+                    next_chunk += 1
+        finally:
+            if not finished:
+                self.finish(pool)
+
+    def finish(self, pool, seconds=None):
+        """
+        lets go of the workers (if they're the suite's own) and the conditions' shared memory
+        :param seconds: for each condition, the seconds spent on its trials, to record (see record_costs); None if
+                        they weren't all run
+        """
+        if pool is not self.pool:
+            pool.close()
+        self.close()
+        if seconds is not None:
+            self.record_costs(seconds)
+
+    def close(self):
+        """
+        removes the conditions' shared memory (once the workers are done with them)
+        :return:
+        """
+        self.conditions.close()
+
+    def record_costs(self, seconds):
+        """
+        remembers what the conditions cost, for scheduling them next time
+        :param seconds: for each condition, the seconds spent on its trials
+        """
+        for condition_id in range(len(self.specs)):
+            spec = self.specs[condition_id]
+            self.scheduler.record(spec['key'], spec['num_items'], spec['num_dimensions'], seconds[condition_id], spec['num_trials'])
+        self.scheduler.save()
+
+
+# * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+# * * * * * * * * * * * Warm Worker Pool * * * * * * * * * * * *
+# * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+
+# A WorkerPool's workers stay up until it's closed, and run a stream of jobs, each of them a dictionary:
+#   'block'                 : the name of the shared memory block a suite's conditions are published in (see
+#                             ParallelSuite.publish), with the parameters that differ from the pool's model's
+#   'condition_id'          : the condition to run (its id in the block)
+#   'seed'                  : the suite's seed (the trials' seeds come from it: see trial_seed)
+#   'first', 'count'        : which trials to run
+#   'tag'                   : anything, handed back with the results
+# If the suite is timed, each trial's record also has the time it spent in each phase, as 'phases' (see PhaseRecorder).
+# Each worker keeps a model for each set of parameters it has been asked for, and stays attached to the last
+# WARM_BLOCKS blocks it has used (the suites running now: several, in the simulation service), so a job only costs
+# its trials, once a worker has seen its suite.
+
+WARM_BLOCKS = 8 # the blocks each worker stays attached to
+
+def content_hash(thing):
+    # a hash of anything JSON-able, from its content
+    return hashlib.sha1(json.dumps(thing, sort_keys=True).encode('utf-8')).hexdigest()
+
+# each warm worker's parameters and caches, made by init_warm_worker
+warm_parameters = None
+warm_models     = {} # hash of overrides -> SearchModel
+warm_blocks     = collections.OrderedDict() # block name -> (SharedConditions, hash of its overrides), the latest used last
+warm_loaded     = {} # hash of overrides -> (block name, condition id) its model is set up for
+
+class PhaseRecorder(object):
+    """
+    stands in for a model's metrics in a worker (see SearchModel.run_whole_search): keeps the last trial's time in each
+    phase, for its record (SuiteMetrics adds them up, from the records)
+    """
+    def __init__(self):
+        self.last = None # ({phase: seconds}, {phase: steps})
+
+    def add_phases(self, phase_seconds, phase_steps):
+        self.last = (phase_seconds, phase_steps)
+
+def init_warm_worker(parameters):
+    """
+    sets up a warm worker process
+    :param parameters: the pool's model's parameters (see get_model_parameters)
+    """
+    global warm_parameters
+    warm_parameters = parameters
+    warm_models.clear()
+    warm_blocks.clear()
+    warm_loaded.clear()
+
+def attach_block(name):
+    """
+    :param name: a block's name (see ParallelSuite.publish)
+    :return: (the block, attached: a SharedConditions, the hash of its overrides). the least recently used block is
+             let go of, if the worker is attached to WARM_BLOCKS already
+    """
+    if name in warm_blocks:
+        warm_blocks.move_to_end(name)
+        return warm_blocks[name]
+    while len(warm_blocks) >= WARM_BLOCKS:
+        (old_name, (old_conditions, old_key)) = warm_blocks.popitem(last=False)
+        for model_key in list(warm_loaded):
+            if warm_loaded[model_key][0] == old_name:
+                # (the model's location tables are read from the block: see SharedConditions.close)
+                warm_models[model_key].location_tables = None
+                del warm_loaded[model_key]
+        old_conditions.close()
+    conditions = SharedConditions.attach(name)
+    warm_blocks[name] = (conditions, content_hash(conditions.info['user']['overrides']))
+    return warm_blocks[name]
+
+def run_job(job):
+    """
+    runs a job's trials in a warm worker process
+    :param job: see above
+    :return: (the job's tag, its first trial, [a record (see SearchModel.get_trial_record) for each trial], seconds taken)
+    """
+    start = time.time()
+    (conditions, model_key) = attach_block(job['block'])
+    if not model_key in warm_models:
+        parameters = dict(warm_parameters)
+        parameters.update(conditions.info['user']['overrides'])
+        warm_models[model_key] = make_model(parameters)
+    model = warm_models[model_key]
+    if warm_loaded.get(model_key) != (job['block'], job['condition_id']):
+        conditions.load_condition(model, job['condition_id'])
+        warm_loaded[model_key] = (job['block'], job['condition_id'])
+
+    model.metrics = None
+    if conditions.info['user']['timed']:
+        model.metrics = PhaseRecorder()
+
+    records = []
+    for trial in range(job['first'], job['first'] + job['count']):
+        random.seed(trial_seed(job['seed'], job['condition_id'], trial))
+        model.run_whole_search()
+        records.append(model.get_trial_record())
+        if model.metrics:
+            records[-1]['phases'] = model.metrics.last
+    return job['tag'], job['first'], records, time.time() - start
+
+class WorkerPool(object):
+    """
+    a pool of worker processes that stay up (with their caches) from one suite to the next; see above
+    """
+    def __init__(self, model, processes=None):
+        """
+        :param model: the SearchModel whose parameters are the workers' defaults (jobs give what differs from them)
+        :param processes: how many worker processes; None means one per CPU
+        """
+        self.parameters = get_model_parameters(model)
+        self.processes  = processes or multiprocessing.cpu_count()
+        self.pool       = None # started with the first jobs
+
+    def get_overrides(self, model):
+        """
+        :return: the parameters of model that differ from the workers' defaults
+        """
+        overrides = {}
+        parameters = get_model_parameters(model)
+        for name in parameters:
+            if not name in self.parameters or parameters[name] != self.parameters[name]:
+                overrides[name] = parameters[name]
+        return overrides
+
+    def start(self):
+        # starts the workers, if they aren't up
+        if self.pool is None:
+            if os.name == 'posix':
+                # the workers have to share this process's resource tracker, so it's started before they are: else
+                # each starts its own, which takes the blocks it attaches to (see SharedConditions) for its own, and
+                # removes them when the worker stops
+                resource_tracker.ensure_running()
+            self.pool = multiprocessing.Pool(self.processes, init_warm_worker, (self.parameters,))
+
+    def run(self, jobs):
+        """
+        :param jobs: the jobs (any iterable)
+        :return: (an iterator of) the jobs' results, as they're done (see run_job)
+        """
+        self.start()
+        return self.pool.imap_unordered(run_job, jobs)
+
+    def submit(self, job, callback, error_callback):
+        """
+        runs one job, without waiting for it (for callers that hand the workers their jobs a few at a time)
+        :param callback: called with the job's result (see run_job), in a thread of the pool's: it should be quick
+        :param error_callback: called with the exception instead, if the job fails
+        """
+        self.start()
+        self.pool.apply_async(run_job, (job,), callback=callback, error_callback=error_callback)
+
+    def close(self):
+        """
+        stops the workers
+        :return:
+        """
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
@@ -0,0 +1,156 @@
+
+# * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+# * * * * * * * * * * The Ready-made Simulations * * * * * * * * * *
+# * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+
+# The suites behind the ready-made simulations on the main menu (see SearchModelInterface.run_premade_suite).
+# Each one is a title, the shape vector that sets the number of shape dimensions, the number of subjects, and a
+# list of suites: (target, distractors, condition, num_distractors_list, num_runs), the arguments to run_suite.
+# Anything that needs the same conditions (e.g., SearchBenchmark) should get them from here.
+
+PREMADE_SIMULATIONS = {
+    # 1) Triesman & Gelade (1980)
+    1 : {'title'       : 'Simulation 1: Treisman & Gelade (1980)',
+         'shape_key'   : 'X',
+         'num_subjects': 100,
+         'suites'      : [([[['blue', 'X', 'none']], 1], [[[['dkgrn', 'X','none']],1], [[['brown', 'T1','none']],1]], 1, [0, 4, 14, 29], 52),
+                          ([[['dkgrn', 'T1', 'none']], 1], [[[['dkgrn', 'X', 'none']], 1], [[['brown', 'T1', 'none']], 1]], 2, [0, 4, 14, 29], 52)]},
+    # 2) Wolfe, Cave & Franzel (1989)
+    2 : {'title'       : 'Simulation 2: Wolfe et al. (1989)',
+         'shape_key'   : 'X',
+         'num_subjects': 100,
+         'suites'      : [([[['green', 'horizontal', 'none']], 1], [[[['red', 'vertical', 'none']], 1]], 1, [0, 2, 4, 8, 16, 24, 36], 52),
+                          ([[['green', 'horizontal','none']],1], [[[['green', 'vertical','none']],1], [[['red', 'horizontal','none']],1]], 2, [0, 2, 4, 8, 16, 24, 36], 52)]},
+    # 3) Target-distractor similarity (Buetti et al., 2016)
+    3 : {'title'       : 'Simulation 3: Buetti et al. (2016)',
+         'shape_key'   : 'X',
+         'num_subjects': 100,
+         'suites'      : [([[['red', 'vertical', 'none']], 1], [[[['ltblue', 'horizontal', 'none']], 1]], 1, [0, 1, 4, 9, 19, 31], 52),
+                          ([[['red', 'vertical', 'none']], 1], [[[['yel2ow', 'vertical', 'none']], 1]], 2, [0, 1, 4, 9, 19, 31], 52),
+                          ([[['red', 'vertical', 'none']], 1], [[[['orange', 'vertical', 'none']], 1]], 3, [0, 1, 4, 9, 19, 31], 52)]},
+    # 4) Search asymmetries (Treisman & Souther, 1985)
+    4 : {'title'       : 'Simulation 4: Treisman & Souther (1985)',
+         'shape_key'   : 'X',
+         'num_subjects': 100,
+         'suites'      : [([[['white', 'Q', 'none']],1], [[[['white', 'O','none']],1]], 1, [0,5,11], 100),
+                          ([[['white', 'O','none']],1], [[[['white', 'Q','none']],1]], 2, [0,5,11], 100)]},
+    # 5) Search for oppositely oriented diagonals and Pomerantz stimuli Pomerantz, Saeger, and Stover (1977)
+    5 : {'title'       : 'Simulation 5: Pomerantz et al. (1977)',
+         'shape_key'   : 'P1',
+         'num_subjects': 64,
+         'suites'      : [([[['red', 'DORN2','none']],1], [[[['red', 'DORN6','none']],1]], 1, [1, 3, 5], 100),
+                          ([[['red', 'P1','none']],1], [[[['red', 'P2','none']],1]], 2, [1, 3, 5], 100),
+                          ([[['red', 'arrow','none']],1], [[[['red', 'triangle','none']],1]], 3, [1, 3, 5], 100)]},
+    # Relational searches. No cheat feature multicolor
+    6 : {'title'       : 'Simulation 6: Similar to Logan (1994) using multicolor items',
+         'shape_key'   : 'cheatXabove',
+         'num_subjects': 32,
+         'suites'      : [([[['red', 'nocheatX', 'above'], ['green', 'nocheatO', 'below']], 1], [[[['green','nocheatO', 'above'],['red', 'nocheatX', 'below']], 1]], 1, [0, 1, 3, 7, 15], 52),
+                          ([[['red', 'nocheatX', 'above'], ['green', 'nocheatO', 'below']], 1], [[[['green', 'nocheatO', 'above'], ['orange', 'nocheatX', 'below']], 1]], 2, [0, 1, 3, 7, 15], 52),
+                          ([[['red', 'nocheatX', 'above'], ['green', 'nocheatO', 'below']], 1], [[[['orange', 'nocheatX', 'above'], ['green', 'nocheatO', 'below']], 1]], 3, [0, 1, 3, 7, 15], 52)]},
+    # No cheat feature monocolor
+    7 : {'title'       : 'Simulation 7: Similar to Logan (1994) using single color items',
+         'shape_key'   : 'cheatXabove',
+         'num_subjects': 32,
+         'suites'      : [([[['red', 'nocheatX', 'above'], ['red', 'nocheatO', 'below']], 1], [[[['red', 'nocheatO', 'above'], ['red', 'nocheatX', 'below']], 1]], 1, [0, 1, 3, 7, 15], 52),
+                          ([[['red', 'nocheatX', 'above'], ['red', 'nocheatO', 'below']], 1], [[[['orange', 'nocheatO', 'above'], ['orange', 'nocheatX', 'below']], 1]], 2, [0, 1, 3, 7, 15], 52),
+                          ([[['red', 'nocheatX', 'above'], ['red', 'nocheatO', 'below']], 1], [[[['orange', 'nocheatX', 'above'], ['orange', 'nocheatO', 'below']], 1]], 3, [0, 1, 3, 7, 15], 52)]},
+    # Cheat feature multicolor
+    8 : {'title'       : 'Simulation 8: Multicolor relations with emergent feature, default salience',
+         'shape_key'   : 'cheatXabove',
+         'num_subjects': 32,
+         'suites'      : [([[['red', 'cheatXabove', 'above'], ['green', 'cheatObelow', 'below']], 1], [[[['green', 'cheatOabove', 'above'], ['red', 'cheatXbelow', 'below']], 1]], 1, [0, 1, 3, 7, 15], 52),
+                          ([[['red', 'cheatXabove', 'above'], ['green', 'cheatObelow', 'below']], 1], [[[['green', 'cheatOabove', 'above'], ['orange', 'cheatXbelow', 'below']], 1]], 2, [0, 1, 3, 7, 15], 52),
+                          ([[['red', 'cheatXabove', 'above'], ['green', 'cheatObelow', 'below']], 1], [[[['orange', 'cheatXabove', 'above'], ['green', 'cheatObelow', 'below']], 1]], 3, [0, 1, 3, 7, 15], 52)]},
+    # Cheat feature multicolor reduced salience
+    9 : {'title'       : 'Simulation 8: Multicolor relations with emergent feature, reduced salience',
+         'shape_key'   : 'cheatXabove',
+         'num_subjects': 32,
+         'suites'      : [([[['red', 'cheatXabove', 'above'], ['green', 'cheatObelow', 'below']], 1], [[[['green', 'cheatOabove', 'above'], ['red', 'cheatXbelow', 'below']], 1]], 1, [0, 1, 3, 7, 15], 52),
+                          ([[['red', 'cheatXabove', 'above'], ['green', 'cheatObelow', 'below']], 1], [[[['green', 'cheatOabove', 'above'], ['orange', 'cheatXbelow', 'below']], 1]], 2, [0, 1, 3, 7, 15], 52),
+                          ([[['red', 'cheatXabove', 'above'], ['green', 'cheatObelow', 'below']], 1], [[[['orange', 'cheatXabove', 'above'], ['green', 'cheatObelow', 'below']], 1]], 3, [0, 1, 3, 7, 15], 52)]},
+    # Cheat feature monocolor
+    10: {'title'       : 'Simulation 9: Monocolor relations with emergent feature, default salience',
+         'shape_key'   : 'cheatXabove',
+         'num_subjects': 32,
+         'suites'      : [([[['red', 'cheatXabove', 'above'], ['red', 'cheatObelow', 'below']], 1], [[[['red', 'cheatOabove', 'above'], ['red', 'cheatXbelow', 'below']], 1]], 1, [0, 1, 3, 7, 15], 52),
+                          ([[['red', 'cheatXabove', 'above'], ['red', 'cheatObelow', 'below']], 1], [[[['orange', 'cheatOabove', 'above'], ['orange', 'cheatXbelow', 'below']], 1]], 2, [0, 1, 3, 7, 15], 52),
+                          ([[['red', 'cheatXabove', 'above'], ['red', 'cheatObelow', 'below']], 1], [[[['orange', 'cheatXabove', 'above'], ['orange', 'cheatObelow', 'below']], 1]], 3, [0, 1, 3, 7, 15], 52)]},
+    # No emergent cheat feature in Relation + feature and Feature-only conditions
+    11: {'title'       : 'Simulation 9: Monocolor relations with emergent feature in relation-only condition only',
+         'shape_key'   : 'cheatXabove',
+         'num_subjects': 32,
+         'suites'      : [([[['red', 'cheatXabove', 'above'], ['red', 'cheatObelow', 'below']], 1], [[[['red', 'cheatOabove', 'above'], ['red', 'cheatXbelow', 'below']], 1]], 1, [0, 1, 3, 7, 15], 52),
+                          ([[['red', 'nocheatX', 'above'], ['red', 'nocheatO', 'below']], 1], [[[['orange', 'nocheatO', 'above'], ['orange', 'nocheatX', 'below']], 1]], 2, [0, 1, 3, 7, 15], 52),
+                          ([[['red', 'nocheatX', 'above'], ['red', 'nocheatO', 'below']], 1], [[[['orange', 'nocheatX', 'above'], ['orange', 'nocheatO', 'below']], 1]], 3, [0, 1, 3, 7, 15], 52)]},
+    # Cheat feature multicolor with increased spacing
+    12: {'title'       : 'Simulation 10: Multicolor relations with emergent feature with increased spacing',
+         'shape_key'   : 'cheatXabove',
+         'num_subjects': 32,
+         'suites'      : [([[['red', 'cheatXabove', 'above'], ['green', 'cheatObelow', 'below']], 1], [[[['green', 'cheatOabove', 'above'], ['red', 'cheatXbelow', 'below']], 1]], 1, [0, 1, 3, 7, 15], 52),
+                          ([[['red', 'cheatXabove', 'above'], ['green', 'cheatObelow', 'below']], 1], [[[['green', 'cheatOabove', 'above'], ['orange', 'cheatXbelow', 'below']], 1]], 2, [0, 1, 3, 7, 15], 52),
+                          ([[['red', 'cheatXabove', 'above'], ['green', 'cheatObelow', 'below']], 1], [[[['orange', 'cheatXabove', 'above'], ['green', 'cheatObelow', 'below']], 1]], 3, [0, 1, 3, 7, 15], 52)]},
+}
+
+def premade_salience(model, sim_id):
+    """
+    :param model: a SearchModel
+    :param sim_id: the simulation (a key of PREMADE_SIMULATIONS)
+    :return: the salience vector the simulation runs with: one weight per color and shape dimension
+    """
+    if sim_id == 3: # Buetti et al.: shape is more salient
+        return [1] * 18 + [1.5] * 27
+    elif sim_id == 5: # Pomerantz et al.: plus the emergent feature units
+        return [1] * 18 + [1] * 27 + [1] * model.POMERANTZ_UNITS + [1] * model.POMERANTZ_UNITS
+    elif sim_id in {9, 12}: # emergent (cheat) feature with reduced salience
+        return [1] * 18 + [1] * 27 + [0.33] * 2
+    elif sim_id >= 6: # relational searches: the emergent (cheat) feature at default salience
+        return [1] * 18 + [1] * 27 + [1] * 2
+    else:
+        return [1] * 18 + [1] * 27
+
+def configure_model(model, sim_id):
+    """
+    sets the model's feature dimensions and salience for a ready-made simulation
+    :param model: a SearchModel
+    :param sim_id: the simulation (a key of PREMADE_SIMULATIONS)
+    :return: the simulation's entry in PREMADE_SIMULATIONS
+    """
+    simulation = PREMADE_SIMULATIONS[sim_id]
+    # start the dimension lists over, so a model can be configured more than once
+    model.COLOR_DIMENSIONS    = []
+    model.SHAPE_DIMENSIONS    = []
+    model.RELATION_DIMENSIONS = []
+
+    dim_index = 0
+    for i in range(len(model.color_vectors['red'])):
+        model.COLOR_DIMENSIONS.append(dim_index)
+        dim_index += 1
+
+    for i in range(len(model.shape_vectors[simulation['shape_key']])):
+        model.SHAPE_DIMENSIONS.append(dim_index)
+        dim_index += 1
+
+    for i in range(len(model.relation_vectors['above'])):
+        model.RELATION_DIMENSIONS.append(dim_index)
+        dim_index += 1
+
+    model.non_relation_dimensions = model.COLOR_DIMENSIONS + model.SHAPE_DIMENSIONS
+    model.salience = premade_salience(model, sim_id)
+    return simulation
+
+def make_distractor_list(distractors, num_distractors):
+    """
+    :param distractors: the distractor types of a suite: [[parts, 1], ...]
+    :param num_distractors: the number of distractors in the display
+    :return: the non_targets argument to SearchModel.create_simulation: [[parts, number], ...]. with two
+             distractor types, each gets half the distractors; otherwise each type gets num_distractors
+    """
+    if len(distractors) == 2:
+        num_dist_per = int(num_distractors / 2)  # half of the number of distractors for each distractor type
+    else:
+        num_dist_per = num_distractors
+    distractor_list = []
+    for distractor in distractors:
+        distractor_list.append([distractor[0], num_dist_per])  # list is: [parts, number]
+    return distractor_list
@@ -0,0 +1,153 @@
+
+try:
+    import numpy
+    NUMPY_FAILED = False
+except:
+    NUMPY_FAILED = True # (then there are no distribution summaries)
+
+
+# * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+# * * * * * * * * * * * RT Distributions * * * * * * * * * * * *
+# * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+
+# The shape of the rt (iteration) distributions, not just their means, for comparing with people's: quantiles, and the
+# parameters of an ex-Gaussian and of a shifted Wald, for every condition (set size) of a suite at once, and
+# Vincentized quantiles (each quantile averaged over subjects) for a premade suite's subjects.
+#
+# All of it comes from the conditions' rt histograms (see SuitePipeline.TrialStats), which the suites keep as they
+# run: the histogram is a sketch of the trials that loses nothing, so the quantiles are exact and there's never a list
+# of every rt. The conditions' histograms are laid side by side in arrays (a row each), so each step is done for all
+# of them at once.
+#
+# The distributions are fit by the method of moments (from the mean, variance and skew):
+#   ex-Gaussian  (mu, sigma, tau)        : tau = sd * (skew / 2) ** (1/3), mu = mean - tau, sigma ** 2 = var - tau ** 2
+#                                          (tau is 0 if the skew isn't positive, and at most sd)
+#   shifted Wald (shift, drift, threshold): threshold * drift = 9 / skew ** 2, var = threshold / drift ** 3,
+#                                          shift = mean - threshold / drift (all nan if the skew isn't positive, or if
+#                                          the shift isn't from 0 up to the fastest rt: no shifted Wald fits then)
+
+QUANTILES = (0.1, 0.3, 0.5, 0.7, 0.9)
+
+def histogram_arrays(stats):
+    """
+    :param stats: the conditions' rts, a TrialStats each
+    :return: (values, counts): arrays shaped (conditions, most distinct values), each row a condition's histogram in
+             order of value (padded on the right with its last value, and counts of 0)
+    """
+    width  = max([len(trial_stats.counts) for trial_stats in stats] + [1])
+    values = numpy.zeros((len(stats), width))
+    counts = numpy.zeros((len(stats), width))
+    for row in range(len(stats)):
+        row_values = sorted(stats[row].counts)
+        if not row_values:
+            continue
+        values[row, :len(row_values)] = row_values
+        values[row, len(row_values):] = row_values[-1]
+        counts[row, :len(row_values)] = [stats[row].counts[value] for value in row_values]
+    return values, counts
+
+def get_quantiles(values, counts, probabilities=QUANTILES):
+    """
+    :param values, counts: from histogram_arrays
+    :return: each condition's rt quantiles, shaped (conditions, probabilities): interpolated between the order
+             statistics, as numpy.percentile does; nan for a condition with no trials
+    """
+    num_trials = counts.sum(axis=1)
+    cumulative = numpy.cumsum(counts, axis=1)
+    position   = (num_trials - 1)[:, None] * numpy.asarray(probabilities)[None, :]
+    low        = numpy.floor(position)
+    high       = numpy.minimum(low + 1, numpy.maximum(num_trials - 1, 0)[:, None])
+
+    def order_statistic(rank):
+        # the value of the rank'th trial (from 0), in order: the first value whose cumulative count is past it
+        index = (cumulative[:, None, :] <= rank[:, :, None]).sum(axis=2)
+        index = numpy.minimum(index, values.shape[1] - 1)
+        return numpy.take_along_axis(values, index, axis=1)
+
+    with numpy.errstate(invalid='ignore'):
+        quantiles = order_statistic(low) + (position - low) * (order_statistic(high) - order_statistic(low))
+    quantiles[num_trials == 0] = numpy.nan
+    return quantiles
+
+def get_moments(values, counts):
+    """
+    :return: each condition's (number of trials, mean, variance, skew), arrays (the variance and skew of the trials
+             themselves, not estimates of the population's); nan where they're undefined
+    """
+    num_trials = counts.sum(axis=1)
+    with numpy.errstate(invalid='ignore', divide='ignore'):
+        mean      = (counts * values).sum(axis=1) / num_trials
+        deviation = values - mean[:, None]
+        variance  = (counts * deviation ** 2).sum(axis=1) / num_trials
+        skew      = (counts * deviation ** 3).sum(axis=1) / num_trials / variance ** 1.5
+    return num_trials, mean, variance, skew
+
+def fit_ex_gaussian(mean, variance, skew):
+    """
+    :return: (mu, sigma, tau), arrays: the ex-Gaussians with these moments (see above)
+    """
+    sd    = numpy.sqrt(variance)
+    shape = numpy.clip(numpy.nan_to_num(skew), 0.0, 2.0) # (an ex-Gaussian's skew is 0 to 2)
+    tau   = sd * (shape / 2.0) ** (1.0 / 3.0)
+    mu    = mean - tau
+    sigma = numpy.sqrt(numpy.maximum(variance - tau ** 2, 0.0))
+    return mu, sigma, tau
+
+def fit_shifted_wald(mean, variance, skew, minimum):
+    """
+    :param minimum: each condition's fastest rt
+    :return: (shift, drift, threshold), arrays: the shifted Walds with these moments (see above); nan where there's
+             none (a shift below 0, or at or past the fastest rt, is no fit: the rts can't start there)
+    """
+    with numpy.errstate(invalid='ignore', divide='ignore'):
+        valid     = (skew > 0) & (variance > 0)
+        product   = numpy.where(valid, 9.0 / skew ** 2, numpy.nan) # threshold * drift
+        drift     = (product / variance) ** 0.25
+        threshold = product / drift
+        shift     = mean - threshold / drift
+        valid     = (shift >= 0) & (shift < minimum)
+    return numpy.where(valid, shift, numpy.nan), numpy.where(valid, drift, numpy.nan), numpy.where(valid, threshold, numpy.nan)
+
+def describe(stats, probabilities=QUANTILES):
+    """
+    summarizes the rt distributions of any number of conditions at once
+    :param stats: the conditions' rts, a TrialStats each
+    :return: {'n', 'mean', 'quantiles', 'ex_gaussian': (mu, sigma, tau), 'shifted_wald': (shift, drift, threshold)},
+             each an array with a row (or entry) per condition; None without numpy
+    """
+    if NUMPY_FAILED or not stats:
+        return None
+    (values, counts) = histogram_arrays(stats)
+    (num_trials, mean, variance, skew) = get_moments(values, counts)
+    minimum = values[:, 0] # (each row's values are in order)
+    return {'n'           : num_trials,
+            'mean'        : mean,
+            'quantiles'   : get_quantiles(values, counts, probabilities),
+            'ex_gaussian' : fit_ex_gaussian(mean, variance, skew),
+            'shifted_wald': fit_shifted_wald(mean, variance, skew, minimum)}
+
+def vincentize(subjects):
+    """
+    averages each quantile over subjects, a set size at a time
+    :param subjects: for each subject, (the numbers of lures of its set sizes, its quantiles: a row per set size). a
+                     set size a subject has no quantiles for (no correct runs) is left out of its average
+    :return: (the numbers of lures, the average quantiles: a row per set size, the number of subjects in each); None
+             without numpy
+    """
+    if NUMPY_FAILED:
+        return None
+    all_lures = sorted(set([num_lures for (lures, quantiles) in subjects for num_lures in lures]))
+    totals    = {}
+    for (lures, quantiles) in subjects:
+        for row in range(len(lures)):
+            if not numpy.isnan(quantiles[row]).any():
+                totals.setdefault(lures[row], []).append(quantiles[row])
+    lures     = [num_lures for num_lures in all_lures if num_lures in totals]
+    averages  = numpy.array([numpy.mean(totals[num_lures], axis=0) for num_lures in lures])
+    return lures, averages, [len(totals[num_lures]) for num_lures in lures]
+
+def format_number(value):
+    # a number for the summary files: '-' if it's not a number
+    if value != value: # (nan)
+        return '-'
+    return '%.3f' % value
@@ -0,0 +1,359 @@
+
+import sys, os, io, time, json, math, random, platform, argparse, contextlib
+import SearchModel1, PremadeSimulations
+
+
+# * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+# * * * * * * * * * * Model Throughput Benchmarks * * * * * * * * * *
+# * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+
+# Times the model's hot spots on the ready-made simulations' conditions (PremadeSimulations) across set sizes,
+# fits a scaling exponent to each (seconds ~ set_size ** exponent), saves the results as JSON and flags anything
+# that got slower than a saved baseline. Run it from the directory with data/ in it:
+#
+#   python SearchBenchmark.py                    # everything; compares to data/benchmarks/baseline.json if it's there
+#   python SearchBenchmark.py --quick --sims 2 5 # a fast look at a couple of simulations
+#   python SearchBenchmark.py --save-baseline    # make this run the baseline that later runs are compared to
+
+BENCHMARK_SET_SIZES    = [1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024]
+QUICK_SET_SIZES        = [1, 4, 16, 64, 256]
+BENCHMARKED_FUNCTIONS  = ('run_whole_search', 'run_search_step', 'random_sample_feature_match',
+                          'randomly_select_item', 'randomly_select_item_with_distance', 'fixate_selected')
+POMERANTZ_UNITS_LIST   = [32, 128, 512] # the Pomerantz simulation (5) is run at each of these
+FIT_MIN_SET_SIZE       = 8    # smaller set sizes are mostly fixed overhead: leave them out of the exponent fits
+BASELINE_FILE          = 'data/benchmarks/baseline.json'
+RESULTS_FORMAT         = 1    # bump when the layout of the results changes, so old baselines aren't misread
+
+
+class SearchBenchmark(object):
+    """
+    Times the model's functions on the ready-made simulations' conditions, at a list of set sizes
+    """
+    def __init__(self, sim_ids=None, set_sizes=None, functions=None, pomerantz_units_list=None, min_time=0.05, max_calls=1000, seed=1):
+        """
+        :param sim_ids: which ready-made simulations (keys of PremadeSimulations.PREMADE_SIMULATIONS); None means all
+        :param set_sizes: the total numbers of items in the display (target included)
+        :param functions: which of BENCHMARKED_FUNCTIONS to time
+        :param pomerantz_units_list: the values of POMERANTZ_UNITS to run simulation 5 at
+        :param min_time: keep calling a function until this many seconds have been spent on it...
+        :param max_calls: ...or it has been called this many times (it's always called at least once)
+        :param seed: the random seed, set before each timing, so runs see the same displays
+        """
+        if sim_ids is None: sim_ids = sorted(PremadeSimulations.PREMADE_SIMULATIONS)
+        if set_sizes is None: set_sizes = BENCHMARK_SET_SIZES
+        if functions is None: functions = BENCHMARKED_FUNCTIONS
+        if pomerantz_units_list is None: pomerantz_units_list = POMERANTZ_UNITS_LIST
+        self.sim_ids              = sim_ids
+        self.set_sizes            = set_sizes
+        self.functions            = functions
+        self.pomerantz_units_list = pomerantz_units_list
+        self.min_time             = min_time
+        self.max_calls            = max_calls
+        self.seed                 = seed
+        self.VERBOSE              = True
+
+    def settings(self):
+        # what was run: saved with the results, so a comparison can tell whether it's comparing like with like
+        return {'sim_ids'             : list(self.sim_ids),
+                'set_sizes'           : list(self.set_sizes),
+                'functions'           : list(self.functions),
+                'pomerantz_units_list': list(self.pomerantz_units_list),
+                'min_time'            : self.min_time,
+                'max_calls'           : self.max_calls,
+                'seed'                : self.seed}
+
+    # * * * * * * * * * * * * * * *  * * *
+    # * * * Setting up the conditions * * *
+    # * * * * * * * * * * * * * * *  * * *
+
+    def make_model(self, sim_id, pomerantz_units):
+        """
+        :return: a SearchModel with the feature dimensions and salience of ready-made simulation sim_id
+        """
+        model = SearchModel1.SearchModel(pomerantz_units)
+        PremadeSimulations.configure_model(model, sim_id)
+        self.default_display_radius = model.DISPLAY_RADIUS # fit_display starts from here every time
+        return model
+
+    def fit_display(self, model, set_size):
+        """
+        makes the display big enough to hold set_size items (the default display holds about 300).
+        DISTANCE_AT_ZERO grows with it, as it's set in SearchModel.__init__, so the items far from fixation
+        still get some processing. this changes the model's distance weighting, so it's only for timing
+        :return:
+        """
+        model.DISPLAY_RADIUS = self.default_display_radius
+        while self.grid_positions(model) < set_size:
+            model.DISPLAY_RADIUS += model.ITEM_DISTANCE
+        model.DISTANCE_AT_ZERO = int(model.DISPLAY_RADIUS * 4.0)
+
+    def grid_positions(self, model):
+        # the number of locations SearchModel.make_cartesian_locations will make
+        per_side = int((2*model.DISPLAY_RADIUS - 3*model.ITEM_RADIUS) / model.ITEM_DISTANCE) + 1
+        return per_side * per_side
+
+    def create_condition(self, model, suite, set_size):
+        """
+        creates a target present display of set_size items with the target and distractor types of a suite,
+        the distractors split as evenly as they go among the distractor types
+        :param suite: (target, distractors, condition, num_distractors_list, num_runs), from PREMADE_SIMULATIONS
+        :return:
+        """
+        (target, distractors, condition, num_distractors_list, num_runs) = suite
+        num_distractors = set_size - 1
+        distractor_list = []
+        for index in range(len(distractors)):
+            num_this_type = int(num_distractors / len(distractors))
+            if index < num_distractors % len(distractors):
+                num_this_type += 1
+            distractor_list.append([distractors[index][0], num_this_type])
+        self.fit_display(model, set_size)
+        # create_simulation prints the relevant dimensions every time: keep that out of the report
+        with contextlib.redirect_stdout(io.StringIO()):
+            model.create_simulation([target[0], 1], distractor_list)
+
+    # * * * * * * * * * * * * * * *  * * *
+    # * * * * * * * * Timing * * * * * * *
+    # * * * * * * * * * * * * * * *  * * *
+
+    def time_calls(self, function):
+        """
+        calls function (with no arguments) until it has taken self.min_time seconds or been called self.max_calls times
+        :return: mean seconds per call
+        """
+        calls   = 0
+        elapsed = 0.0
+        while calls == 0 or (calls < self.max_calls and elapsed < self.min_time):
+            start = time.perf_counter()
+            function()
+            elapsed += time.perf_counter() - start
+            calls += 1
+        return elapsed / calls
+
+    def time_function(self, model, function_name):
+        """
+        times one of BENCHMARKED_FUNCTIONS on the display the model has been created with
+        :return: mean seconds per call (per trial for run_whole_search, per iteration for run_search_step)
+        """
+        random.seed(self.seed)
+        if function_name == 'run_whole_search':
+            return self.time_calls(model.run_whole_search)
+
+        if function_name == 'run_search_step':
+            # whole trials, but only the steps are timed
+            elapsed = [0.0]
+            steps   = [0]
+            def one_trial():
+                model.init_search()
+                all_done = False
+                while not all_done:
+                    start = time.perf_counter()
+                    all_done = model.run_search_step()
+                    elapsed[0] += time.perf_counter() - start
+                    steps[0] += 1
+            self.time_calls(one_trial)
+            return elapsed[0] / steps[0]
+
+        # the rest are timed on a freshly initialized display
+        model.init_search()
+        items = model.search_items
+        if function_name == 'random_sample_feature_match':
+            return self.time_calls(lambda: model.random_sample_feature_match(random.choice(items)))
+        elif function_name == 'randomly_select_item':
+            return self.time_calls(model.randomly_select_item)
+        elif function_name == 'randomly_select_item_with_distance':
+            return self.time_calls(model.randomly_select_item_with_distance)
+        elif function_name == 'fixate_selected':
+            def fixate():
+                model.selected_item = random.choice(items)
+                model.fixate_selected()
+            return self.time_calls(fixate)
+        raise ValueError('SearchBenchmark: no benchmark for ' + str(function_name))
+
+    def run(self):
+        """
+        runs all the benchmarks
+        :return: the results: a dictionary ready to be saved as JSON (see save_results)
+        """
+        results = {}
+        for sim_id in self.sim_ids:
+            simulation = PremadeSimulations.PREMADE_SIMULATIONS[sim_id]
+            if simulation['shape_key'] == 'P1':
+                pomerantz_units_list = self.pomerantz_units_list
+            else:
+                pomerantz_units_list = [None] # POMERANTZ_UNITS only matters to the Pomerantz shapes
+            for pomerantz_units in pomerantz_units_list:
+                if pomerantz_units is None:
+                    model = self.make_model(sim_id, 128)
+                else:
+                    model = self.make_model(sim_id, pomerantz_units)
+                for suite in simulation['suites']:
+                    condition = suite[2]
+                    seconds   = dict((function_name, []) for function_name in self.functions)
+                    for set_size in self.set_sizes:
+                        self.create_condition(model, suite, set_size)
+                        for function_name in self.functions:
+                            seconds[function_name].append(self.time_function(model, function_name))
+                    for function_name in self.functions:
+                        key = benchmark_key(sim_id, condition, function_name, pomerantz_units)
+                        results[key] = {'sim_id'         : sim_id,
+                                        'condition'      : condition,
+                                        'function'       : function_name,
+                                        'pomerantz_units': pomerantz_units,
+                                        'template_parts' : len(suite[0][0]),
+                                        'set_sizes'      : list(self.set_sizes),
+                                        'seconds'        : seconds[function_name],
+                                        'exponent'       : scaling_exponent(self.set_sizes, seconds[function_name])}
+                    if self.VERBOSE:
+                        print( 'Timed ' + benchmark_key(sim_id, condition, '', pomerantz_units).rstrip('.'))
+        return {'format'             : RESULTS_FORMAT,
+                'created'            : time.strftime('%Y-%m-%d %H:%M:%S'),
+                'python'             : platform.python_version(),
+                'platform'           : platform.platform(),
+                'model_last_modified': SearchModel1.SearchModel().LAST_MODIFIED,
+                'settings'           : self.settings(),
+                'results'            : results}
+
+
+# * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+# * * * * * * * * * Scaling Fits and Baselines * * * * * * * * * *
+# * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+
+def benchmark_key(sim_id, condition, function_name, pomerantz_units=None):
+    """
+    :return: the name of one benchmark in the results, e.g., 'SIM5.c2.pu128.run_whole_search'
+    """
+    key = 'SIM' + str(sim_id) + '.c' + str(condition) + '.'
+    if pomerantz_units is not None:
+        key += 'pu' + str(pomerantz_units) + '.'
+    return key + function_name
+
+def scaling_exponent(set_sizes, seconds, min_set_size=FIT_MIN_SET_SIZE):
+    """
+    fits seconds = a * set_size ** exponent by least squares on the log-log points
+    :param min_set_size: leave out smaller set sizes (if that leaves fewer than two points, use them all)
+    :return: the exponent (1.0 means linear in set size), or None if there aren't two usable points
+    """
+    points = [(math.log(n), math.log(s)) for (n, s) in zip(set_sizes, seconds) if n >= min_set_size and s > 0]
+    if len(points) < 2:
+        points = [(math.log(n), math.log(s)) for (n, s) in zip(set_sizes, seconds) if n > 0 and s > 0]
+    if len(points) < 2:
+        return None
+    mean_x = sum([x for (x, y) in points]) / len(points)
+    mean_y = sum([y for (x, y) in points]) / len(points)
+    sxx = sum([(x - mean_x)**2 for (x, y) in points])
+    sxy = sum([(x - mean_x)*(y - mean_y) for (x, y) in points])
+    if sxx == 0:
+        return None
+    return sxy / sxx
+
+def save_results(benchmark_results, file_name):
+    """
+    saves the results of SearchBenchmark.run as JSON
+    :return:
+    """
+    directory = os.path.dirname(file_name)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory)
+    results_file = open(file_name, 'w')
+    json.dump(benchmark_results, results_file, indent=1)
+    results_file.close()
+
+def load_results(file_name):
+    results_file = open(file_name, 'r')
+    benchmark_results = json.load(results_file)
+    results_file.close()
+    return benchmark_results
+
+def compare_to_baseline(benchmark_results, baseline, tolerance=0.25, exponent_tolerance=0.15):
+    """
+    finds the benchmarks that got slower than the baseline
+    :param tolerance: flag a set size whose time is more than (1 + tolerance) times the baseline's
+    :param exponent_tolerance: flag a benchmark whose scaling exponent grew by more than this
+    :return: a list of lines of text, one per regression (empty if nothing regressed)
+    """
+    regressions = []
+    if baseline.get('format') != benchmark_results.get('format'):
+        return ['Baseline is in format ' + str(baseline.get('format')) + ', not ' + str(benchmark_results.get('format')) + ': not compared']
+    for key in sorted(benchmark_results['results']):
+        if not key in baseline['results']:
+            continue
+        new = benchmark_results['results'][key]
+        old = baseline['results'][key]
+        old_seconds = dict(zip(old['set_sizes'], old['seconds']))
+        for (set_size, seconds) in zip(new['set_sizes'], new['seconds']):
+            if set_size in old_seconds and old_seconds[set_size] > 0 and seconds > (1.0 + tolerance) * old_seconds[set_size]:
+                regressions.append('%s, set size %i: %.3g s, %.2f times the baseline (%.3g s)' % (key, set_size, seconds, seconds/old_seconds[set_size], old_seconds[set_size]))
+        # exponents fit to different set sizes aren't comparable
+        if new['set_sizes'] == old['set_sizes'] and new['exponent'] is not None and old['exponent'] is not None and new['exponent'] > old['exponent'] + exponent_tolerance:
+            regressions.append('%s: scales as set size ** %.2f, up from ** %.2f' % (key, new['exponent'], old['exponent']))
+    return regressions
+
+def print_report(benchmark_results):
+    """
+    prints one line per benchmark: its scaling exponent and its time at the smallest and largest set sizes
+    :return:
+    """
+    print
+    print( 'Benchmark\t\t\t\t\t\texponent\tsmallest\tlargest')
+    for key in sorted(benchmark_results['results']):
+        result = benchmark_results['results'][key]
+        if result['exponent'] is None: exponent = '-'
+        else: exponent = '%.2f' % result['exponent']
+        print( '%-48s\t%s\t\t%.3g s\t%.3g s' % (key, exponent, result['seconds'][0], result['seconds'][-1]))
+        if result['function'] == 'run_whole_search':
+            print( '%-48s\t\t\t%.1f trials/s\t%.1f trials/s' % ('', 1.0/result['seconds'][0], 1.0/result['seconds'][-1]))
+
+
+# * * * * * * * * * * * * * * * * * * * * * * * * * * *
+# * * * * * * * * * * * Main Body * * * * * * * * * * *
+# * * * * * * * * * * * * * * * * * * * * * * * * * * *
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description='Time the search model across set sizes and compare to a baseline')
+    parser.add_argument('--sims', type=int, nargs='+', help='ready-made simulations to run (default: all)')
+    parser.add_argument('--sizes', type=int, nargs='+', help='set sizes (default: 1 to 1024 in powers of 2)')
+    parser.add_argument('--functions', nargs='+', choices=BENCHMARKED_FUNCTIONS, help='functions to time (default: all)')
+    parser.add_argument('--pomerantz-units', type=int, nargs='+', help='POMERANTZ_UNITS values for simulation 5')
+    parser.add_argument('--min-time', type=float, default=0.05, help='seconds to spend timing each function at each set size')
+    parser.add_argument('--max-calls', type=int, default=1000, help='most calls to each function at each set size')
+    parser.add_argument('--quick', action='store_true', help='fewer set sizes and less time per timing')
+    parser.add_argument('--output', help='results file (default: data/benchmarks/benchmark_<date>_<time>.json)')
+    parser.add_argument('--baseline', default=BASELINE_FILE, help='baseline to compare to')
+    parser.add_argument('--save-baseline', action='store_true', help='save the results as the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='flag times more than 1 + this times the baseline')
+    args = parser.parse_args(arguments)
+
+    set_sizes = args.sizes
+    min_time  = args.min_time
+    if args.quick:
+        if set_sizes is None: set_sizes = QUICK_SET_SIZES
+        min_time = min(min_time, 0.01)
+    benchmark = SearchBenchmark(args.sims, set_sizes, args.functions, args.pomerantz_units, min_time, args.max_calls)
+    benchmark_results = benchmark.run()
+    print_report(benchmark_results)
+
+    output = args.output
+    if not output:
+        output = 'data/benchmarks/benchmark_' + time.strftime('%Y%m%d_%H%M%S') + '.json'
+    save_results(benchmark_results, output)
+    print( 'Results saved to ' + output)
+
+    regressions = []
+    if args.save_baseline:
+        save_results(benchmark_results, args.baseline)
+        print( 'Saved as the baseline, ' + args.baseline)
+    elif os.path.isfile(args.baseline):
+        regressions = compare_to_baseline(benchmark_results, load_results(args.baseline), args.tolerance)
+        if regressions:
+            print( str(len(regressions)) + ' regressions against ' + args.baseline + ':')
+            for line in regressions:
+                print( '    ' + line)
+        else:
+            print( 'No regressions against ' + args.baseline)
+    else:
+        print( 'No baseline to compare to (' + args.baseline + '). Make one with --save-baseline')
+    return len(regressions)
+
+if __name__ == '__main__':
+    sys.exit(main() and 1)
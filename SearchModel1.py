@@ -7,9 +7,11 @@ class VisualItem(object):
     This is the basic VisualItem data class for the model
     VisualItems include the target (in the display), the distractors & lures (which are in the display) and the target template (not in the display)
     """
-    def __init__(self,my_list,feature_vectors,item_properties,name='',is_target=False):
+    def __init__(self,my_list,feature_vectors,item_properties,name='',is_target=False,type_id=None):
         """
         :param my_list:  the list in the larger program to which this item belongs
+        :param feature_vectors: the item's feature lists (shared by every item of its type; don't modify them)
+        :param type_id: the item's type in the model's FeatureVocabulary
         :param location: location on the screen, in [x,y] coordinates
         :param name: name (e.g., 'target', 'lure', 'template', etc.
         :param is_target: boolean that indicates whether this visual item is in fact the target
@@ -25,11 +27,13 @@ class VisualItem(object):
 
         self.item_properties      = item_properties
         self.feature_lists        = feature_vectors # this is a feature vector: will get compared to the template during search
+        self.type_id              = type_id # items of the same type have the same parts, so they match the template the same way
 
         #self.vector_length   = 0.0 # vector length: will be computed based on what's relevant below
 
         # the moving parts
         self.location   = None # location on the screen, in [x,y] coordinates
+        self.location_index = None # which location of the display grid it's at (see LocationTables)
         self.fix_dist   = 0.0 # distance from fixation
         self.dist_wt    = 1.0 # weighting on the acculumlator as a function of the distance from fixation
         self.integrator = 1.0 # the thing that, when it passes upper theshold, registers match (i.e., target found) and when below neg threshold registers mismatch (rejection)
@@ -64,7 +68,10 @@ class VisualItem(object):
             distance += (self.location[i] - fixation[i])**2
         self.fix_dist = pow(distance,0.5)
 
-import random, math, trig
+import random, math, time, trig, bisect
+from FeatureVocabulary import FeatureVocabulary, NUMPY_FAILED
+if not NUMPY_FAILED:
+    import numpy
 
 
 # * * * * * * * * * * * * * * * * * * * * * * * * * * *
@@ -72,8 +79,87 @@ import random, math, trig
 # * * * * * * * * * * * * * * * * * * * * * * * * * * *
 
 
+class LocationTables(object):
+    """
+    The display grid for one display layout, in order (assign_locations shuffles it), and, for fixation at each grid
+    location, the distance to every grid location and that distance's weighting on the accumulators. Fixation at the
+    display center is row len(grid). Items and fixation only ever sit on the grid (or the center), so these replace
+    working out distances item by item every time the eyes move. Rows are worked out the first time they're needed,
+    unless the whole tables are handed in (e.g., from shared memory: see SharedConditions)
+    """
+    def __init__(self, model, grid=None, fix_dist=None, dist_wt=None):
+        """
+        :param model: the SearchModel whose display parameters the tables are for
+        :param grid: the display grid; if None, model.make_location_grid()
+        :param fix_dist, dist_wt: the whole tables, flat (row f starts at f * len(grid)), as any sequences of floats;
+               if None, rows are made as needed
+        """
+        self.layout   = model.get_location_layout()
+        self.grid     = grid if grid is not None else model.make_location_grid()
+        self.fixations = list(self.grid) + [model.DISPLAY_CENTER] # row f is for fixation at fixations[f]
+        self.fix_dist = fix_dist
+        self.dist_wt  = dist_wt
+        self.rows     = {} # row f -> (fix_dist, dist_wt) for fixation at fixations[f]
+        self.source   = None # where the whole tables came from, if they were handed in (see SharedConditions)
+
+        # the distance cost parameters
+        self.LINEAR_DISTANCE_COST  = model.LINEAR_DISTANCE_COST
+        self.DISTANCE_AT_ZERO      = model.DISTANCE_AT_ZERO
+        self.DISTANCE_FALLOFF_RATE = model.DISTANCE_FALLOFF_RATE
+        self.DISPLAY_RADIUS        = model.DISPLAY_RADIUS
+
+    def get_row(self, f):
+        """
+        :param f: a fixation: a grid location's index, or len(grid) for the display center
+        :return: (fix_dist, dist_wt): lists of the distance from the fixation to each grid location, and its weight
+        """
+        if not f in self.rows:
+            num_locations = len(self.grid)
+            if self.fix_dist is not None:
+                # (copied out of the tables a row at a time: lists are quicker to look things up in)
+                self.rows[f] = (list(self.fix_dist[f*num_locations:(f+1)*num_locations]),
+                                list(self.dist_wt[f*num_locations:(f+1)*num_locations]))
+            else:
+                self.rows[f] = self.make_row(self.fixations[f])
+        return self.rows[f]
+
+    def make_row(self, fixation):
+        # the distances and weights just as SearchModel works them out item by item (so they come out the same)
+        fix_dists = []
+        dist_wts  = []
+        for location in self.grid:
+            distance = 0
+            for i in range(len(fixation)):
+                distance += (fixation[i] - location[i])**2
+            fix_dist = pow(distance,0.5)
+            if self.LINEAR_DISTANCE_COST:
+                dist_wt = 1.0 - (float(fix_dist)/self.DISTANCE_AT_ZERO)
+                if dist_wt < 0.0: dist_wt = 0.0
+            else: # original (pre-2/14/19) nonlinear distance cost
+                scaled_distance = self.DISTANCE_FALLOFF_RATE * (float(fix_dist)/self.DISPLAY_RADIUS)
+                dist_wt = 1.0/(1.0 + scaled_distance)
+            fix_dists.append(fix_dist)
+            dist_wts.append(dist_wt)
+        return fix_dists, dist_wts
+
+    def make_tables(self):
+        """
+        :return: (fix_dist, dist_wt): the whole tables, flat (row f starts at f * len(grid)), as lists
+        """
+        fix_dist = []
+        dist_wt  = []
+        for f in range(len(self.fixations)):
+            (fix_dist_row, dist_wt_row) = self.get_row(f)
+            fix_dist.extend(fix_dist_row)
+            dist_wt.extend(dist_wt_row)
+        return fix_dist, dist_wt
+
 class SearchModel(object):
-    def __init__(self):
+    def __init__(self, pomerantz_units=128):
+        """
+        :param pomerantz_units: the number of emergent-feature units in the Pomerantz shape vectors (sets POMERANTZ_UNITS,
+                                which has to be known before the shape vectors are made)
+        """
 
 
         # * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
@@ -94,7 +180,7 @@ class SearchModel(object):
         # 0.1 appears to be too low with no differentiation between high and medium target-distractor similarity  06/01/2023 RFH
         self.P_IRRELEVANT_SAMPLING      = 0.15
         self.MIN_SELECTION_PRIORITY     = 0.0001#0.0001#0.1 # the smallest selection priority for non-rejected items is allowed to go
-        self.POMERANTZ_UNITS            = 128
+        self.POMERANTZ_UNITS            = pomerantz_units
 
         # effect of distance between fixation and item location in the display: how much does distance from fixation impair the rate of feature sampling:
         self.DISTANCE_FALLOFF_RATE      = 1.0 # Larger means sharper falloff with distance; effect of distance modulated by DISPLAY_RADIUS
@@ -123,6 +209,13 @@ class SearchModel(object):
         self.PERMIT_EYE_MOVEMENTS       = True # whether model is allowed to change fixation when it moves attention
         self.EYE_MOVEMENT_TIME_COST     = 30#60#30 #40  how long it takes to move the eyes
 
+        # run control parameters: keep batch runs from hanging on trials that never finish
+        self.MAX_ITERATIONS             = None # hard cap on the iterations in one trial; None means no cap
+        self.STALL_ITERATIONS           = 1000 # watchdog: a trial is stalled after this many consecutive iterations in which nothing could be selected
+        self.COMPILED_SEARCH            = True # match items by type, from plans compiled from the vocabulary (same results, same random numbers)
+        self.FUSED_STEPPING             = True # run_whole_search runs the iterations while attention shifts in one go (see run_idle_steps)
+        self.LOCATION_TABLES            = True # look distances from fixation up in tables made once per display layout (see LocationTables)
+
         # * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
         # * * * * * * * * Display Characteristics * * * * * * * * *
         # * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
@@ -157,10 +250,17 @@ class SearchModel(object):
         self.attn_shift_timer = 0    # a timer that counts down to permit attention shift
         self.relevant         = []   # the list of relevant dimensions
         self.fixation         = self.DISPLAY_CENTER # the locatin of fixation
+        self.fixation_index   = None # with LOCATION_TABLES, the row of the location tables for fixation
+        self.location_tables  = None # the LocationTables for the current display layout, made when first needed
         self.iteration        = 0
         self.target_found     = False  # boolean indicating whether the target was found
         self.found_target     = None   # a pointer to the target that was found
         self.correct          = False # did the model get the correct answer
+        self.stalled          = False # did the watchdog give up on the trial (neither correct nor an error)
+        self.stall_reason     = ''    # why the watchdog gave up
+        self.stall_snapshot   = None  # the state of the model when the watchdog gave up (see get_state_snapshot)
+        self.idle_iterations  = 0     # how many iterations in a row nothing has been selected
+        self.timed_out        = False # was the trial cut off by run_whole_search's deadline (not a stall: the trial was still going)
 
         # response stats
         self.num_attended        = 0 # how many things were selected during the run
@@ -168,6 +268,13 @@ class SearchModel(object):
         self.num_auto_rejections = 0 # how many things were rejected without being attended
 
         self.messages         = [] # a list of strings to tell the interface what (if anything) has happened
+        self.match_plans      = {} # item type id -> its compiled match plan (see compile_match_plan)
+        self.match_plan_key   = None # what the match plans were compiled for; when it changes, they're thrown out
+        self.sampling_runs    = None # the dimensions the match plans sample (see compile_sampling_runs)
+        self.identity_verdicts = {} # item type id -> whether it's identified as the target (see identity_verdict)
+        self.relevance_cache  = {} # (template type, item types, # dimensions) -> (relevant, irrelevant) (see compute_relevance)
+        self.trace_recorder   = None # if not None, a TraceRecorder.TrialTraceRecorder that snapshots every iteration
+        self.metrics          = None # if not None, a SuiteMetrics.SuiteMetrics that's told the time each trial spends in each phase
 
         self.legal_colors = ('white','black','red','green','blue','yellow','orange','pink')
         self.legal_shapes = ('vertical','horizontal','T1','T2','T3','T4','L1','L2',
@@ -230,6 +337,9 @@ class SearchModel(object):
                                  'below': [0, 0, 1, 1],
                                  'none' : [0, 0, 0, 0]}
 
+        # every item's feature lists come from here, interned by part and by item type
+        self.vocabulary = FeatureVocabulary(self.color_vectors, self.shape_vectors, self.relation_vectors)
+
         # DEFAULTS
         # FOR SIMULATION 1: TREISMAN & GELADE (1980),
         # SIMULATION 2: WOLFE ET AL. (1989),
@@ -353,29 +463,12 @@ class SearchModel(object):
 
 
     def make_feature_vectors(self, item_properties):
-
-
-
-
-
-        # target : [[[p1-1c ,p1-1s, p1-1r][p1-2c, p1-2s, p1-2r],[p1-3c,p1-3s,p1-3r]], 'tp/a']
-        # distractors : [[[[p1-1c ,p1-1s, p1-1r][p1-2c, p1-2s, p1-2r],[p1-3c,p1-3s,p1-3r]], '#p1'] , [[[p2-1c ,p2-1s, p2-1r][p2-2c, p2-2s, p2-2r],[p2-3c,p2-3s,p2-3r]], '#p2']]
-
-        all_feature_vectors = [] # a list of the form [[color, shape, relational role],[color, shape, relational role]...], #]
-        # # print("DEBUG item properties in make_feature_vectors(): " + str(item_properties))
-        for element in item_properties[0]:  # each element is a list of the form [[color, shape, relational role], #]
-            # # print("DEBUG element: " + str(element))
-            color_vector = self.color_vectors[element[0]] # color
-            shape_vector = self.shape_vectors[element[1]] # shape
-            relation_vector = self.relation_vectors[element[2]] # relational role
-            feature_vector = []
-            feature_vector.extend(color_vector)
-            feature_vector.extend(shape_vector)
-            feature_vector.extend(relation_vector)
-            all_feature_vectors.append(feature_vector)
-
-        #print("VERIF all_feature_vectors from make_feature_vectors() : " + str(all_feature_vectors))
-        return all_feature_vectors
+        """
+        :param item_properties: [[[color, shape, relational role], [color, shape, relational role]...], #]
+        :return: the feature lists of an item with those parts: one [color + shape + relation] vector per part. they
+                 belong to the vocabulary and are shared by every item of the type, so don't modify them
+        """
+        return self.vocabulary.type_rows[self.vocabulary.type_id(item_properties[0])]
 
 
     def add_search_items(self,num, item_properties, name = '',is_target=False):
@@ -387,12 +480,13 @@ class SearchModel(object):
         disply_list: the larger search display list to which they will be added
         :return: the list of items in the display
         """
-        # get the feature vector
-        features = self.make_feature_vectors(item_properties)
+        # get the feature vector (shared by all items of this type)
+        type_id  = self.vocabulary.type_id(item_properties[0])
+        features = self.vocabulary.type_rows[type_id]
         # make the required number of these guys
         for i in range(num):
             # my_list,feature_vector,color_name='',shape_name='',name='',is_garget=False
-            self.search_items.append(VisualItem(self.search_items,features,item_properties,name, is_target))
+            self.search_items.append(VisualItem(self.search_items,features,item_properties,name, is_target, type_id))
 
 
 
@@ -401,10 +495,11 @@ class SearchModel(object):
     # * * * * * * * * * Search Display * * * * * * * * * *
     # * * * * * * * * * * * * * * * * * * * * * * * * * * *
 
-    def make_cartesian_locations(self):
+    def make_cartesian_locations(self, shuffle=True):
         """
         Makes a list of locations on an (x,y) cartesian grid for stimuli. 
         param: display_space: a rectangle [center_x,center_y,half_width], center_x and center_y are the coordinates of the center of the display and half_width is half the width of the full display (like a radius)
+        :param shuffle: if False, leave the locations in grid order
         :return: a list of locations in a randomized order (random.shuffle()); each location is only (upper_left,upper_right), expressed in screen coordinates
         """
         locations = []
@@ -425,13 +520,15 @@ class SearchModel(object):
             xpos += self.ITEM_DISTANCE
 
         # the locations are constructed: shuffle and return them
-        random.shuffle(locations)
+        if shuffle:
+            random.shuffle(locations)
         return locations
 
-    def make_polar_locations(self, dense = False):
+    def make_polar_locations(self, dense = False, shuffle=True):
         """
         makes a list oflocations arrayed in a polar fashion around the center od the display for for stimuli
         :param dense means fill as many angles as possible; if not, then increment abgle by Pi/8 for all radii
+        :param shuffle: if False, leave the locations in the order they were made
         :return: a list of locations in a randomized order (random.shuffle()); each location is (upper_left,upper_right), expressed in screen (cartesian) coordinates
         """
         locations = []
@@ -465,14 +562,48 @@ class SearchModel(object):
                 radius *= 1.5 # += ITEM_DISTANCE # * 1.5
 
         # the locations are all made: shuffle & return them
-        random.shuffle(locations)
+        if shuffle:
+            random.shuffle(locations)
         return locations
 
+    def make_location_grid(self):
+        """
+        :return: the display grid, in order (unshuffled)
+        """
+        if self.CARTESIAN_GRID:
+            return self.make_cartesian_locations(shuffle=False)
+        else:
+            return self.make_polar_locations(shuffle=False)
+
+    def get_location_layout(self):
+        """
+        :return: the display parameters the display grid and the location tables depend on
+        """
+        return (self.CARTESIAN_GRID, tuple(self.DISPLAY_CENTER), self.DISPLAY_RADIUS, self.ITEM_RADIUS, self.ITEM_DISTANCE,
+                self.LINEAR_DISTANCE_COST, self.DISTANCE_AT_ZERO, self.DISTANCE_FALLOFF_RATE)
+
+    def get_location_tables(self):
+        """
+        :return: the LocationTables for the current display layout (remade if the display parameters have changed)
+        """
+        if self.location_tables is None or self.location_tables.layout != self.get_location_layout():
+            self.location_tables = LocationTables(self)
+        return self.location_tables
+
     def assign_locations(self):
         """
         assign screen locations to the search items
         :return: the search display, once items have been assigned
         """
+        if self.LOCATION_TABLES:
+            # shuffling the grid's indices shuffles them just as shuffling the grid itself would
+            grid  = self.get_location_tables().grid
+            order = list(range(len(grid)))
+            random.shuffle(order)
+            for i in range(len(self.search_items)):
+                self.search_items[i].location_index = order[i]
+                self.search_items[i].location = list(grid[order[i]])
+            return
         if self.CARTESIAN_GRID:
             locations = self.make_cartesian_locations()
         else:
@@ -502,6 +633,22 @@ class SearchModel(object):
         self.target_found     = False  # boolean indicating whethr the target was found
         self.found_target     = None   # a pointer to the target that was found
         self.correct          = False # did the model get the correct answer
+        self.stalled          = False
+        self.stall_reason     = ''
+        self.stall_snapshot   = None
+        self.idle_iterations  = 0
+        self.timed_out        = False
+
+        # the match plans hold onto the template, the relevant dimensions and the weights: recompile them if any changed
+        if self.COMPILED_SEARCH:
+            match_plan_key = (self.search_template.type_id, tuple(self.relevant), tuple(self.irrelevant),
+                              len(self.non_relation_dimensions), tuple(self.salience), self.P_RELEVANT_SAMPLING,
+                              self.P_IRRELEVANT_SAMPLING, self.IN_TEMPLATE_WEIGHT, self.OUT_OF_TEMPLATE_WEIGHT,
+                              self.MATCH_WEIGHT)
+            if match_plan_key != self.match_plan_key:
+                self.match_plans    = {}
+                self.match_plan_key = match_plan_key
+                self.sampling_runs  = None
 
         self.clear_messages()
         self.messages.append(verbose_title)
@@ -528,20 +675,31 @@ class SearchModel(object):
         self.assign_locations()
 
         # and set the initial fixation distance weights (new, 2/12/19:previously wasn't doing this till eye movement)
-        for item in self.search_items:
-            distance = 0
-            for i in range(len(self.fixation)):
-                distance += (self.fixation[i] - item.location[i])**2
-            item.fix_dist = pow(distance,0.5)
+        if self.LOCATION_TABLES:
+            self.fixation_index = len(self.location_tables.grid) # the display center
+            (fix_dists, dist_wts) = self.location_tables.get_row(self.fixation_index)
+            for item in self.search_items:
+                item.fix_dist = fix_dists[item.location_index]
+                item.dist_wt  = dist_wts[item.location_index]
+        else:
+            self.fixation_index = None
+            for item in self.search_items:
+                distance = 0
+                for i in range(len(self.fixation)):
+                    distance += (self.fixation[i] - item.location[i])**2
+                item.fix_dist = pow(distance,0.5)
 
-            # and compute distance_wt: the weighting on the accumuators as a function of fixation distance
-            if self.LINEAR_DISTANCE_COST:
-                item.dist_wt = 1.0 - (float(item.fix_dist)/self.DISTANCE_AT_ZERO)
-                # print(item.dist_wt)
-                if item.dist_wt < 0.0: item.dist_wt = 0.0
-            else: # original (pre-2/14/19) nonlinear distance cost
-                scaled_distance = self.DISTANCE_FALLOFF_RATE * (float(item.fix_dist)/self.DISPLAY_RADIUS)
-                item.dist_wt = 1.0/(1.0 + scaled_distance)
+                # and compute distance_wt: the weighting on the accumuators as a function of fixation distance
+                if self.LINEAR_DISTANCE_COST:
+                    item.dist_wt = 1.0 - (float(item.fix_dist)/self.DISTANCE_AT_ZERO)
+                    # print(item.dist_wt)
+                    if item.dist_wt < 0.0: item.dist_wt = 0.0
+                else: # original (pre-2/14/19) nonlinear distance cost
+                    scaled_distance = self.DISTANCE_FALLOFF_RATE * (float(item.fix_dist)/self.DISPLAY_RADIUS)
+                    item.dist_wt = 1.0/(1.0 + scaled_distance)
+
+        if self.trace_recorder:
+            self.trace_recorder.start_trial(self)
 
 
     def randomly_select_item_with_distance(self):
@@ -619,7 +777,111 @@ class SearchModel(object):
         # 4) if you get to this point, you found nothing: return None
         return None
 
+    def compile_sampling_runs(self):
+        """
+        :return: the dimensions random_sample_feature_match samples, as runs: [(start, stop, p_sample)...] for every
+                 stretch of dimensions sampled with the same probability and with the same salience. dimensions that
+                 are neither relevant nor irrelevant aren't in any run: they're never sampled
+        """
+        relevant   = set(self.relevant)
+        irrelevant = set(self.irrelevant)
+        runs = []
+        for i in range(len(self.non_relation_dimensions)):
+            if i in relevant:
+                p_sample = self.P_RELEVANT_SAMPLING
+            elif i in irrelevant:
+                p_sample = self.P_IRRELEVANT_SAMPLING
+            else:
+                continue
+            if runs and runs[-1][1] == i and runs[-1][2] == p_sample and self.salience[i] == self.salience[i - 1]:
+                runs[-1] = (runs[-1][0], i + 1, p_sample)
+            else:
+                runs.append((i, i + 1, p_sample))
+        return runs
+
+    def compile_match_plan(self, type_id):
+        """
+        compiles what random_sample_feature_match does with an item of a type into a flat plan: everything that
+        doesn't depend on the random numbers (relevance, weights, salience, feature comparisons) is worked out here, once.
+        it works from the parts' runs (see FeatureVocabulary), a stretch of dimensions at a time, so wide, mostly constant
+        feature vectors cost little to compile and run
+        :param type_id: the item type (in the vocabulary)
+        :return: (steps, relevant_sum), where steps is a list of (p_sample, terms, count): count dimensions in a row,
+                 in the order random_sample_feature_match samples them, each sampled with probability p_sample and
+                 adding terms (one per item part that doesn't cancel out) to the match when it is. subtractions are
+                 added negated, which is exact, so the sums come out bit for bit the same. a dimension that's 0 in both
+                 the template part and the item adds nothing, but it still uses up a random number when it's sampled
+        """
+        if self.sampling_runs is None:
+            self.sampling_runs = self.compile_sampling_runs()
+        vocabulary = self.vocabulary
+        item_parts = vocabulary.type_parts[type_id]
+        steps = []
+        for template_part in vocabulary.type_parts[self.search_template.type_id]:
+            # the points where anything might change: the ends of the sampling runs and of every part's runs
+            boundaries = set()
+            for (start, stop, p_sample) in self.sampling_runs:
+                boundaries.add(start)
+                boundaries.add(stop)
+            for part_id in (template_part,) + item_parts:
+                for (start, stop, value) in vocabulary.part_runs[part_id]:
+                    boundaries.add(start)
+                    boundaries.add(stop)
+            boundaries = sorted(boundaries)
+
+            # and, between them, one step for each stretch that's sampled
+            for (start, stop, p_sample) in self.sampling_runs:
+                for b in range(bisect.bisect_left(boundaries, start), len(boundaries) - 1):
+                    if boundaries[b] >= stop: break
+                    i     = boundaries[b]
+                    count = min(boundaries[b + 1], stop) - i
+                    template_value = vocabulary.part_value(template_part, i)
+                    salience       = self.salience[i]
+                    terms = []
+                    for part_id in item_parts:
+                        value = vocabulary.part_value(part_id, i)
+                        if template_value == 0:
+                            if value != 0: terms.append(-(self.OUT_OF_TEMPLATE_WEIGHT*salience))
+                        elif template_value == value:
+                            terms.append(self.IN_TEMPLATE_WEIGHT*salience)
+                        else:
+                            terms.append(-(self.IN_TEMPLATE_WEIGHT*salience))
+                    terms = tuple(terms)
+                    if steps and steps[-1][0] == p_sample and steps[-1][1] == terms:
+                        steps[-1] = (p_sample, terms, steps[-1][2] + count)
+                    else:
+                        steps.append((p_sample, terms, count))
+
+        relevant_sum = 0
+        for i in self.relevant:
+            relevant_sum += self.salience[i]
+        return steps, relevant_sum
+
     def random_sample_feature_match(self,item):
+        if self.COMPILED_SEARCH:
+            # the same computation as below, from the item type's compiled plan
+            plan = self.match_plans.get(item.type_id)
+            if plan is None:
+                plan = self.match_plans[item.type_id] = self.compile_match_plan(item.type_id)
+            steps, relevant_sum = plan
+            match = 0
+            rand  = random.random
+            for p_sample, terms, count in steps:
+                if not terms:
+                    for k in range(count): rand() # sampled or not, it adds nothing
+                elif count == 1:
+                    if rand() < p_sample:
+                        for term in terms:
+                            match += term
+                else:
+                    for k in range(count):
+                        if rand() < p_sample:
+                            for term in terms:
+                                match += term
+            match *= self.MATCH_WEIGHT
+            if self.relevant: match /= relevant_sum
+            return match
+
         vect = item.feature_lists
 
         # for unattended processing: decide vect1-vect2 similarity by randomly sampling
@@ -782,17 +1044,21 @@ class SearchModel(object):
             num_features = len(self.selected_item.feature_lists)
             list_indices = [i for i in range(num_features)]
             found_match = []
-            random.shuffle(list_indices)
-            for index in list_indices:   # for each of the feature vectors in the selected item (in random order because of shuffle)
-                feature_list_match = False
-                for template_feature_list in self.search_template.feature_lists: # for each feature list in the search template
-                    mismatches = 0
-                    for feature in range(len(template_feature_list)):
-                        if self.selected_item.feature_lists[index][feature] != template_feature_list[feature]:
-                            mismatches += 1
-                    if mismatches == 0:
-                        feature_list_match = True
-                found_match.append(feature_list_match)
+            random.shuffle(list_indices) # (keep this even when it doesn't matter: it uses up random numbers)
+            if self.COMPILED_SEARCH:
+                # whether items of this type match the template was worked out in create_simulation
+                found_match.append(self.identity_verdict(self.selected_item.type_id))
+            else:
+                for index in list_indices:   # for each of the feature vectors in the selected item (in random order because of shuffle)
+                    feature_list_match = False
+                    for template_feature_list in self.search_template.feature_lists: # for each feature list in the search template
+                        mismatches = 0
+                        for feature in range(len(template_feature_list)):
+                            if self.selected_item.feature_lists[index][feature] != template_feature_list[feature]:
+                                mismatches += 1
+                        if mismatches == 0:
+                            feature_list_match = True
+                    found_match.append(feature_list_match)
             # print("VERIF found_match " + str(found_match))
             if all(found_match) == False:
                 #if random.random() > self.OFF_TASK_PROBABILITY:
@@ -810,26 +1076,44 @@ class SearchModel(object):
 
 
 
+    def identity_verdict(self, type_id):
+        """
+        :param type_id: an item type (in the vocabulary)
+        :return: whether process_selected_item_better identifies items of the type as the target: it has as many parts
+                 as the template, and every one of them is one of the template's parts. worked out once per type
+        """
+        if not type_id in self.identity_verdicts:
+            template_parts = self.vocabulary.type_parts[self.search_template.type_id]
+            item_parts     = self.vocabulary.type_parts[type_id]
+            self.identity_verdicts[type_id] = (len(item_parts) == len(template_parts) and
+                                               frozenset(item_parts) <= frozenset(template_parts))
+        return self.identity_verdicts[type_id]
+
     def fixate_selected(self):
         """
         changes the fixation point to the location of the selected item and recomputes everyone's distance from fixation    
         """
 
-        distance_to_selected = 0
-        for i in range(len(self.fixation)):
-            distance_to_selected += (self.fixation[i] - self.selected_item.location[i]) ** 2
-        fix_to_selected_dist = pow(distance_to_selected, 0.5)
+        use_tables = self.LOCATION_TABLES and self.fixation_index is not None
+        if use_tables:
+            dist_wt = self.location_tables.get_row(self.fixation_index)[1][self.selected_item.location_index]
+        else:
+            distance_to_selected = 0
+            for i in range(len(self.fixation)):
+                distance_to_selected += (self.fixation[i] - self.selected_item.location[i]) ** 2
+            fix_to_selected_dist = pow(distance_to_selected, 0.5)
 
-        if self.LINEAR_DISTANCE_COST:
-            dist_wt = 1.0 - (float(fix_to_selected_dist) / self.DISTANCE_AT_ZERO)
-            if dist_wt < 0.0: dist_wt = 0.0
-        #    print("dist_wt = " + str(dist_wt))
-        else:  # original (pre-2/14/19) nonlinear distance cost
-            scaled_distance = self.DISTANCE_FALLOFF_RATE * (float(fix_to_selected_dist) / self.DISPLAY_RADIUS)
-            dist_wt = 1.0 / (1.0 + scaled_distance)
+            if self.LINEAR_DISTANCE_COST:
+                dist_wt = 1.0 - (float(fix_to_selected_dist) / self.DISTANCE_AT_ZERO)
+                if dist_wt < 0.0: dist_wt = 0.0
+            #    print("dist_wt = " + str(dist_wt))
+            else:  # original (pre-2/14/19) nonlinear distance cost
+                scaled_distance = self.DISTANCE_FALLOFF_RATE * (float(fix_to_selected_dist) / self.DISPLAY_RADIUS)
+                dist_wt = 1.0 / (1.0 + scaled_distance)
 
         if random.random() < dist_wt:#(1.0 - dist_wt):
             self.fixation = list(self.selected_item.location)
+            self.fixation_index = self.selected_item.location_index
             # 3.A.1.1) pay the eye movement cost:
             # Simply adding the iterations in this way is tantamount to suspending all
             #   processing, including unattended processing, during the eye movement
@@ -844,6 +1128,13 @@ class SearchModel(object):
         self.make_message('Fixation moved to '+str(self.fixation))
         self.num_eye_movements += 1  # how many times de the model move its eyes
 
+        if use_tables:
+            (fix_dists, dist_wts) = self.location_tables.get_row(self.fixation_index)
+            for item in self.search_items:
+                item.fix_dist = fix_dists[item.location_index]
+                item.dist_wt  = dist_wts[item.location_index]
+            return
+
         for item in self.search_items:
             distance = 0
             for i in range(len(self.fixation)):
@@ -919,6 +1210,12 @@ class SearchModel(object):
                 # report that a new thing has been selected
                 self.make_message('Moving attention to item '+ str(self.selected_item.index)+' at '+str(self.selected_item.location))
 
+        # for the watchdog: count the iterations in a row on which nothing could be selected
+        if self.selected_item:
+            self.idle_iterations = 0
+        else:
+            self.idle_iterations += 1
+
         # 3) process selected item
         if self.selected_item:
 
@@ -967,15 +1264,90 @@ class SearchModel(object):
             self.make_message('I have concluded the Target is Absent on iteration ' + str(self.iteration) + '\n')
             all_done = True
 
+        # 6) the watchdog: give up on the trial if it has hit the iteration cap or if nothing has been
+        #    selectable for STALL_ITERATIONS iterations (e.g., every viable item has a dist_wt of 0)
+        elif self.MAX_ITERATIONS and self.iteration >= self.MAX_ITERATIONS:
+            self.mark_stalled('iteration cap of ' + str(self.MAX_ITERATIONS) + ' reached')
+            all_done = True
+
+        elif self.STALL_ITERATIONS and self.idle_iterations >= self.STALL_ITERATIONS:
+            self.mark_stalled('nothing selectable for ' + str(self.idle_iterations) + ' iterations')
+            all_done = True
+
+        if self.trace_recorder:
+            self.trace_recorder.record(self)
+
         return all_done # let whoever called you know whether the simulation is done
 
+    def run_idle_steps(self, num_steps):
+        """
+        runs up to num_steps iterations during which the serial stage is idle: an item has been selected and attention
+        is still on its way to it (attn_shift_timer > 0). that leaves only decay and parallel processing to do, so the
+        iterations are run here in one tight loop instead of a call to run_search_step each. the result (random numbers
+        included) is just what num_steps calls to run_search_step would have given, and the loop stops where
+        run_search_step would have said the search is done
+        :param num_steps: how many iterations to run; no more than attn_shift_timer
+        :return: (all_done, the number of iterations run)
+        """
+        decay = 1.0 - self.ITEM_INTEGRATOR_DECAY
+        rand  = random.random
+        match = self.random_sample_feature_match
+        for step in range(1, num_steps + 1):
+            self.iteration += 1
+            self.messages.append('\n* * * Iteration '+str(self.iteration)+' * * *')
+
+            # decay and parallel processing (what process_parallel does), an item at a time: an item's decay
+            # doesn't use random numbers, so this uses them in the same order as decaying everything first
+            rejections = False
+            for item in self.viable_items:
+                item.integrator *= decay
+                item.integrator += match(item) * rand() * item.dist_wt
+                if item.integrator < self.MIN_SELECTION_PRIORITY:
+                    item.integrator = self.MIN_SELECTION_PRIORITY
+                item.priority = item.integrator
+                if item.integrator < self.REJECTION_THRESHOLD:
+                    item.rejected = True
+                    item.priority = 0.0
+                    self.make_message('----------'+str(item.index)+' rejected in parallel phase---------')
+                    self.num_auto_rejections += 1
+                    rejections = True
+            if rejections:
+                self.update_viability()
+
+            self.idle_iterations = 0 # (something is selected)
+            self.attn_shift_timer -= 1
+
+            # the end of run_search_step: the target can't have been found while attention was shifting
+            all_done = False
+            if len(self.viable_items) == 0:
+                self.iteration += self.TARGET_ABSENT_COST
+                self.make_message('I have concluded the Target is Absent on iteration ' + str(self.iteration) + '\n')
+                all_done = True
+            elif self.MAX_ITERATIONS and self.iteration >= self.MAX_ITERATIONS:
+                self.mark_stalled('iteration cap of ' + str(self.MAX_ITERATIONS) + ' reached')
+                all_done = True
+            elif self.STALL_ITERATIONS and self.idle_iterations >= self.STALL_ITERATIONS:
+                self.mark_stalled('nothing selectable for ' + str(self.idle_iterations) + ' iterations')
+                all_done = True
+
+            if self.trace_recorder:
+                self.trace_recorder.record(self)
+
+            if all_done or self.attn_shift_timer == 0:
+                return all_done, step
+        return False, num_steps
+
     def analyze_result(self):
         """
         at the end of the search, determines whether it got the search right or wrong
         :return: 
         """
 
-        if self.target_found:
+        if self.stalled or self.timed_out:
+            # a stalled or cut off trial is neither right nor wrong: it's its own outcome
+            self.correct = False
+
+        elif self.target_found:
             #print('Found target!')
             # you found something. make sure it's the target
             self.correct = self.found_target.is_target
@@ -989,17 +1361,109 @@ class SearchModel(object):
                     break
             self.correct = correct
 
-    def run_whole_search(self,verbose_title=''):
+    def run_whole_search(self,verbose_title='',deadline=None):
         """
         this runs the whole search. if you're calling ths, then you aren't using graphics
         If you wanna use graphics, then use the interface to run the search one iteraiton at a time
+        :param deadline: if not None, a time.time() value; the trial is cut off (self.timed_out) if it is still running then
         :return: 
         """
+        # with metrics, time each phase of the trial (see SuiteMetrics): the clock is only read if they're wanted
+        timed = self.metrics is not None
+        if timed:
+            clock = time.perf_counter
+            start = clock()
+            phase_seconds = {'setup': 0.0, 'step': 0.0, 'idle': 0.0}
+            phase_steps   = {'step': 0, 'idle': 0}
         self.init_search(verbose_title)
+        if timed:
+            phase_seconds['setup'] = clock() - start
         all_done = False
+        steps    = 0
+        next_clock_check = 256
         while not all_done:
-            all_done = self.run_search_step()
+            if timed:
+                start = clock()
+            if self.FUSED_STEPPING and self.selected_item and self.attn_shift_timer > 0:
+                # attention is still on its way to the selected item: nothing to do but parallel processing
+                (all_done, num_steps) = self.run_idle_steps(self.attn_shift_timer)
+                phase = 'idle'
+            else:
+                all_done  = self.run_search_step()
+                num_steps = 1
+                phase     = 'step'
+            if timed:
+                phase_seconds[phase] += clock() - start
+                phase_steps[phase]   += num_steps
+            steps += num_steps
+            # only look at the clock every 256 steps or so: it's cheap, but not free
+            if deadline and not all_done and steps >= next_clock_check:
+                next_clock_check = steps + 256
+                if time.time() <= deadline: continue
+                self.timed_out = True
+                self.make_message('Trial cut off: wall-clock budget exhausted')
+                all_done = True
         self.analyze_result() # determine whether your response was correct
+        if self.trace_recorder:
+            self.trace_recorder.end_trial(self)
+        if timed:
+            self.metrics.add_phases(phase_seconds, phase_steps)
+
+    def mark_stalled(self, reason):
+        """
+        records that the watchdog has given up on this trial, along with a snapshot of the state of the model
+        :param reason: text saying why the trial was given up on
+        :return:
+        """
+        self.stalled        = True
+        self.stall_reason   = reason
+        self.stall_snapshot = self.get_state_snapshot()
+        self.make_message('Trial stalled: ' + reason)
+
+    def get_state_snapshot(self):
+        """
+        returns a snapshot of the moving parts of the model, for diagnosing trials that went wrong
+        :return: a dictionary of plain python values (safe to print or write to a file)
+        """
+        items = []
+        for item in self.search_items:
+            items.append({'index'     : item.index,
+                          'name'      : item.name,
+                          'location'  : item.location,
+                          'integrator': item.integrator,
+                          'priority'  : item.priority,
+                          'dist_wt'   : item.dist_wt,
+                          'subrange'  : list(item.subrange),
+                          'rejected'  : item.rejected})
+        if self.selected_item:
+            selected = self.selected_item.index
+        else:
+            selected = None
+        return {'iteration'       : self.iteration,
+                'fixation'        : list(self.fixation),
+                'selected_item'   : selected,
+                'attn_shift_timer': self.attn_shift_timer,
+                'idle_iterations' : self.idle_iterations,
+                'num_viable'      : len(self.viable_items),
+                'num_attended'    : self.num_attended,
+                'num_eye_movements': self.num_eye_movements,
+                'items'           : items}
+
+    def get_trial_record(self):
+        """
+        returns the outcome of the last run, as run_suite records it
+        :return: a dictionary of plain python values (safe to pickle, e.g., back from a worker process)
+        """
+        return {'correct'            : self.correct,
+                'iteration'          : self.iteration,
+                'num_attended'       : self.num_attended,
+                'num_eye_movements'  : self.num_eye_movements,
+                'num_auto_rejections': self.num_auto_rejections,
+                'num_lures'          : self.num_lures,
+                'stalled'            : self.stalled,
+                'stall_reason'       : self.stall_reason,
+                'stall_snapshot'     : self.stall_snapshot,
+                'timed_out'          : self.timed_out}
 
     def create_simulation(self,target,non_targets,relevant=None):
         """
@@ -1014,7 +1478,8 @@ class SearchModel(object):
 
         # 1) make the search template...
         # Target is of form [[color,shape, rel_role], [color, shape, rel_role]]
-        self.search_template = VisualItem(None, self.make_feature_vectors(target), target)  # target[0] is color, target[1] is shape
+        template_type = self.vocabulary.type_id(target[0])
+        self.search_template = VisualItem(None, self.vocabulary.type_rows[template_type], target, type_id=template_type)  # target[0] is color, target[1] is shape
 
 
         # 3) make the search items
@@ -1041,65 +1506,20 @@ class SearchModel(object):
             name = 'Lure=' + str(non_target[0]) + '_' + str(non_target[1])
             self.add_search_items(non_target[1], non_target, name, False)
             self.num_lures += non_target[1]
+
+        # whether each type of item will be identified as the target when it's selected
+        self.identity_verdicts = {}
+        for search_item in self.search_items:
+            self.identity_verdict(search_item.type_id)
         #print("DISTRACTOR # " + str(self.num_lures))
         #print("NUM SEARCH ITEMS " + str(len(self.search_items)))
         # (2 alternate, 10/23) Set relevance on a dimension-by-dimension (not dimension class) basis
         # A dimension is relevant iff it distinguishes the target from any distractors
         # This is ONLY used for the parallel component of the search.
         # Things that are relevant are things that distinguish the target from the distractors
-        self.relevant = []
-        self.irrelevant = []
         # irrelevants are properties that are present in the stimuli but are constant across the target and distractors
-
-        #for template_feature_list_index in range(len(self.search_template.feature_lists)):
-        #    print("DEBUG " + str(template_feature_list_index))
-
-
-
-
-        # new plan
-        # iterate through all features in the outermost loop
         # 08/03/2023 RFH I think relevance should only be computed over non relation dimensions
-        #for feature_index in range(len(self.search_template.feature_lists[0])):
-        for feature_index in range(len(self.non_relation_dimensions)):
-            is_relevant = False
-            # print("VERIF non_relation_dimensions: " + str(self.non_relation_dimensions))
-            #for this feature check to see whether it's relevant (different across the template and the search items )
-            '''
-            for template_list in self.search_template.feature_lists:
-              
-                for search_item in self.search_items:
-                    for item_list in search_item.feature_lists:
-                        # If the value of template_list[i] is not equal to the item_list[i] then i is relevant
-                        if item_list[feature_index] != template_list[feature_index]:
-                            is_relevant = True
-                            
-                            
-            if is_relevant:
-                self.relevant.append(feature_index)
-
-            else:
-                # If you make it his far (past the break) then i is the same in both the template list and item list
-                # So i is not relevant. However, if it is present in either, then it's not absent but merely irrelevant
-                is_irrelevant = False
-                for feature_list in self.search_template.feature_lists:
-                    if feature_list[feature_index] != 0: is_irrelevant = True
-                if is_irrelevant: self.irrelevant.append(feature_index)
-            '''
-           
-            for i in range(len(self.search_template.feature_lists)):
-                for search_item in self.search_items:
-                    if self.search_template.feature_lists[i][feature_index] != search_item.feature_lists[i][feature_index]:
-                        is_relevant = True
-
-            if is_relevant:
-                self.relevant.append(feature_index)
-
-            else:
-                is_irrelevant = False
-                for feature_list in self.search_template.feature_lists:
-                    if feature_list[feature_index] != 0: is_irrelevant = True
-                if is_irrelevant: self.irrelevant.append(feature_index)
+        (self.relevant, self.irrelevant) = self.compute_relevance()
 
         #print(self.relevant)
         #print(self.irrelevant)
@@ -1120,6 +1540,97 @@ class SearchModel(object):
         #    item.get_vector_length(self.relevant,self.RELEVANT_WEIGHT,self.IRRELEVANT_WEIGHT)
 
 
+    def load_simulation(self, target, item_kinds, kind_of_item, relevant, irrelevant):
+        """
+        sets up the same simulation create_simulation would have, from a condition it has already worked out
+        (see SharedConditions.compile_condition), without working any of it out again
+        :param target: the target, as passed to create_simulation
+        :param item_kinds: [[item_properties, name, is_target]...]: the kinds of items in the display
+        :param kind_of_item: for each search item, in order, its kind (an index into item_kinds)
+        :param relevant, irrelevant: the relevant and irrelevant dimensions
+        """
+        template_type = self.vocabulary.type_id(target[0])
+        self.search_template = VisualItem(None, self.vocabulary.type_rows[template_type], target, type_id=template_type)
+        self.target_present  = target[1] == 1
+
+        self.search_items = []
+        self.num_lures    = 0
+        for kind in kind_of_item:
+            [item_properties, name, is_target] = item_kinds[kind]
+            self.add_search_items(1, item_properties, name, is_target)
+            if not is_target:
+                self.num_lures += 1
+
+        self.identity_verdicts = {}
+        for search_item in self.search_items:
+            self.identity_verdict(search_item.type_id)
+        self.relevant   = list(relevant)
+        self.irrelevant = list(irrelevant)
+
+    def compute_relevance(self):
+        """
+        works out which of the non-relation dimensions are relevant (the template's part i differs there from part i
+        of some search item) and which are irrelevant (not relevant, but some template part has the feature). items
+        come in only a few types, so this is done over the unique item types (as arrays if numpy is there), and the
+        answer is kept for the next display with the same template and the same types in it. an item with fewer parts
+        than the template counts as having all-0 parts where it has none; parts past the template's are ignored
+        :return: (relevant, irrelevant), lists of dimension indices in order
+        """
+        vocabulary     = self.vocabulary
+        num_dimensions = len(self.non_relation_dimensions)
+        item_types     = frozenset([search_item.type_id for search_item in self.search_items])
+        key = (self.search_template.type_id, item_types, num_dimensions)
+        if key in self.relevance_cache:
+            (relevant, irrelevant) = self.relevance_cache[key]
+            return list(relevant), list(irrelevant)
+
+        template_parts = vocabulary.type_parts[self.search_template.type_id]
+        matrix = vocabulary.part_matrix()
+        if matrix is not None:
+            # rows of the part matrix, with a row of 0s at the end for the parts items don't have
+            width = min(num_dimensions, matrix.shape[1])
+            rows  = numpy.zeros((matrix.shape[0] + 1, num_dimensions), dtype=numpy.int8)
+            rows[:-1, :width] = matrix[:, :width]
+            missing = matrix.shape[0]
+            template = rows[list(template_parts)] # (template parts, dimensions)
+            items = []
+            for type_id in sorted(item_types):
+                item_parts = vocabulary.type_parts[type_id]
+                items.append([item_parts[i] if i < len(item_parts) else missing for i in range(len(template_parts))])
+            if items:
+                is_relevant = (rows[numpy.array(items)] != template[numpy.newaxis]).any(axis=(0, 1))
+            else:
+                is_relevant = numpy.zeros(num_dimensions, dtype=bool)
+            is_irrelevant = ~is_relevant & (template != 0).any(axis=0)
+            relevant   = numpy.nonzero(is_relevant)[0].tolist()
+            irrelevant = numpy.nonzero(is_irrelevant)[0].tolist()
+        else:
+            relevant   = []
+            irrelevant = []
+            template = [vocabulary.part_row(part_id) for part_id in template_parts]
+            items    = [vocabulary.type_parts[type_id] for type_id in sorted(item_types)]
+            for feature_index in range(num_dimensions):
+                is_relevant = False
+                for i in range(len(template_parts)):
+                    template_value = template[i][feature_index] if feature_index < len(template[i]) else 0
+                    for item_parts in items:
+                        if i < len(item_parts):
+                            item_value = vocabulary.part_value(item_parts[i], feature_index)
+                        else:
+                            item_value = 0
+                        if template_value != item_value:
+                            is_relevant = True
+                if is_relevant:
+                    relevant.append(feature_index)
+                else:
+                    for template_row in template:
+                        if feature_index < len(template_row) and template_row[feature_index] != 0:
+                            irrelevant.append(feature_index)
+                            break
+
+        self.relevance_cache[key] = (tuple(relevant), tuple(irrelevant))
+        return relevant, irrelevant
+
     # * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
     # * * * * * * * * * * Ancillary Functions * * * * * * * * * * *
     # * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
@@ -0,0 +1,140 @@
+
+import multiprocessing
+
+try:
+    import numpy
+    NUMPY_FAILED = False
+except:
+    NUMPY_FAILED = True # (then there are point estimates, but no confidence intervals)
+
+
+# * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+# * * * * * * * * * * * Search Regression * * * * * * * * * * * *
+# * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+
+# The search function (mean rt as a function of the number of lures): its slope, intercept and the variance the line
+# accounts for, and bootstrap confidence intervals on all three.
+#
+# The bootstrap resamples the trials within each set size: each resample of a set size is as many trials as it had,
+# drawn with replacement, and its mean rt goes into the fit. A set size's trials are kept as a histogram (see
+# SuitePipeline.TrialStats), so drawing n trials with replacement is just a multinomial draw of n over the histogram's
+# counts: a whole chunk of resamples of every set size is a few array operations, with no list of trials anywhere.
+# The resamples are done in chunks, each with its own random numbers (spawned from the one seed), so the intervals are
+# the same however many processes the chunks are spread over. None of it touches the random module's numbers, which
+# the suites' trials use.
+
+BOOTSTRAP_RESAMPLES = 2000 # resamples per interval
+BOOTSTRAP_CHUNK     = 500  # resamples per chunk
+BOOTSTRAP_SEED      = 0    # so the same trials always give the same intervals
+CONFIDENCE          = 0.95
+
+def slope_and_intercept(data):
+    """
+    computes the slope and intercept of the search function
+    :param data: [[num lures, mean rt, ...]...], a line per set size
+    :return: (slope, intercept, variance accounted for); the variance accounted for is None if the rts are all the same
+    """
+    num_scores = len(data)
+    mean_n  = sum([entry[0] for entry in data]) / num_scores
+    mean_rt = sum([entry[1] for entry in data]) / num_scores
+    ss_n    = 0.0 # the sums of squared deviations, and of the products of the deviations
+    ss_rt   = 0.0
+    sp      = 0.0
+    for entry in data:
+        ss_n  += (entry[0] - mean_n) ** 2
+        ss_rt += (entry[1] - mean_rt) ** 2
+        sp    += (entry[0] - mean_n) * (entry[1] - mean_rt)
+    slope     = sp / ss_n
+    intercept = mean_rt - slope * mean_n
+    variance_accounted = None
+    if ss_rt > 0:
+        variance_accounted = sp * sp / (ss_n * ss_rt) # (the correlation, squared)
+    return (slope, intercept, variance_accounted)
+
+def fit_lines(num_lures, rts):
+    """
+    fits the search function to any number of sets of mean rts at once (numpy)
+    :param num_lures: the set sizes' numbers of lures (K of them)
+    :param rts: an array of mean rts, shaped (..., K): a set of K per line to fit
+    :return: (slopes, intercepts, variances accounted for), each an array shaped (...); a variance accounted for is nan
+             where the rts are all the same
+    """
+    x   = numpy.asarray(num_lures, dtype=float)
+    y   = numpy.asarray(rts, dtype=float)
+    dx  = x - x.mean()
+    ss_n = numpy.dot(dx, dx)
+    mean_rt = y.mean(axis=-1)
+    dy  = y - mean_rt[..., None]
+    sp  = numpy.dot(dy, dx)
+    ss_rt = (dy * dy).sum(axis=-1)
+    slopes     = sp / ss_n
+    intercepts = mean_rt - slopes * x.mean()
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        variances = numpy.where(ss_rt > 0, sp * sp / (ss_n * ss_rt), numpy.nan)
+    return slopes, intercepts, variances
+
+def resample_chunk(task):
+    """
+    one chunk of resamples (in this process or a worker's)
+    :param task: (num lures, [(values, counts) for each set size], number of resamples, numpy SeedSequence)
+    :return: (slopes, intercepts, variances accounted for) of the resamples, arrays
+    """
+    (num_lures, histograms, num_resamples, seed_sequence) = task
+    generator = numpy.random.default_rng(seed_sequence)
+    rts = numpy.empty((num_resamples, len(histograms)))
+    for index in range(len(histograms)):
+        (values, counts) = histograms[index]
+        num_trials = counts.sum()
+        draws = generator.multinomial(num_trials, counts / num_trials, size=num_resamples)
+        rts[:, index] = numpy.dot(draws, values) / num_trials
+    return fit_lines(num_lures, rts)
+
+def bootstrap_lines(num_lures, stats, num_resamples=BOOTSTRAP_RESAMPLES, seed=BOOTSTRAP_SEED, processes=1,
+                    chunk_size=BOOTSTRAP_CHUNK, confidence=CONFIDENCE):
+    """
+    bootstrap confidence intervals on the search function (see above)
+    :param num_lures: the set sizes' numbers of lures
+    :param stats: the set sizes' rts, a SuitePipeline.TrialStats each (with at least one trial)
+    :param processes: how many processes to spread the chunks over (1 does them here)
+    :return: {'slope', 'intercept', 'variance_accounted': (low, high)..., 'resamples', 'confidence'}; None without numpy
+    """
+    if NUMPY_FAILED:
+        return None
+    histograms = []
+    for trial_stats in stats:
+        values = sorted(trial_stats.counts)
+        histograms.append((numpy.array(values, dtype=float), numpy.array([trial_stats.counts[value] for value in values], dtype=float)))
+    sizes = [chunk_size] * (num_resamples // chunk_size)
+    if num_resamples % chunk_size:
+        sizes.append(num_resamples % chunk_size)
+    seed_sequences = numpy.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(list(num_lures), histograms, sizes[index], seed_sequences[index]) for index in range(len(sizes))]
+    if processes == 1:
+        chunks = [resample_chunk(task) for task in tasks]
+    else:
+        pool = multiprocessing.Pool(processes)
+        try:
+            chunks = pool.map(resample_chunk, tasks)
+        finally:
+            pool.close()
+            pool.join()
+
+    tail = 100.0 * (1.0 - confidence) / 2
+    intervals = {'resamples': num_resamples, 'confidence': confidence}
+    for (index, key) in enumerate(('slope', 'intercept', 'variance_accounted')):
+        estimates = numpy.concatenate([chunk[index] for chunk in chunks])
+        estimates = estimates[~numpy.isnan(estimates)]
+        if len(estimates):
+            intervals[key] = (float(numpy.percentile(estimates, tail)), float(numpy.percentile(estimates, 100.0 - tail)))
+        else:
+            intervals[key] = None
+    return intervals
+
+def format_interval(intervals, key, scale=1.0):
+    """
+    :return: ' (95% CI low to high)' for intervals[key] (times scale), for the summary files; '' if there's none
+    """
+    if not intervals or intervals.get(key) is None:
+        return ''
+    (low, high) = intervals[key]
+    return ' (%i%% CI %.3f to %.3f)' % (round(100 * intervals['confidence']), scale * low, scale * high)
@@ -0,0 +1,162 @@
+
+import json, array
+from multiprocessing import shared_memory
+import SearchModel1
+
+
+# * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+# * * * * * * * * Conditions in Shared Memory * * * * * * * * * *
+# * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+
+# A block of shared memory is laid out as:
+#   8 bytes     : the length of the header, as an unsigned long long
+#   the header  : JSON: {'info': ..., 'arrays': {array name: [type code, offset, length]...}}
+#   the arrays  : one after another, each starting on an 8 byte boundary; type codes are the array module's
+#
+# The info holds what's small (each condition's target, its kinds of items and the display grids); the arrays hold
+# what's big: each condition's items (kind by kind), relevant and irrelevant dimensions, and the location tables for
+# each display layout (see SearchModel1.LocationTables).
+
+HEADER_SIZE = array.array('Q').itemsize
+
+def describe_condition(model):
+    """
+    :param model: a SearchModel, set up for a condition (by create_simulation)
+    :return: (the kinds of items: [[item_properties, name, is_target]...], each search item's kind), as for
+             SearchModel.load_simulation. (an item's kind is its type, its name and whether it's the target)
+    """
+    kinds        = []
+    kind_index   = {}
+    kind_of_item = []
+    for item in model.search_items:
+        key = (item.type_id, item.name, item.is_target)
+        if not key in kind_index:
+            kind_index[key] = len(kinds)
+            kinds.append([item.item_properties, item.name, item.is_target])
+        kind_of_item.append(kind_index[key])
+    return kinds, kind_of_item
+
+class SharedConditions(object):
+    """
+    Compiles the conditions of a suite (what create_simulation works out for each display, and the location tables for
+    its layout) and publishes them, once, in one block of shared memory. Worker processes attach to the block by name
+    (see attach) and read the tables where they are, without a copy each, so a task only has to say which condition to
+    run, and which trials
+    """
+    def __init__(self, info=None):
+        """
+        :param info: anything else the workers need to know (e.g., a seed); must be JSON-able
+        """
+        self.info   = {'conditions': [], 'layouts': [], 'user': info}
+        self.arrays = {} # array name -> array.array while compiling; memoryview once attached
+        self.layout_index = {} # display layout (see SearchModel.get_location_layout) -> its index in info['layouts']
+        self.memory = None   # the SharedMemory, once published or attached
+        self.owner  = False  # whether this made the block (and so has to unlink it)
+
+    def compile_condition(self, model, target, non_targets):
+        """
+        works out a condition (with model.create_simulation) and adds it to the ones to publish
+        :param model: the SearchModel, with the parameters the workers' models will have
+        :param target, non_targets: as for create_simulation
+        :return: the condition's id (its index)
+        """
+        model.create_simulation(target, non_targets)
+        condition_id = len(self.info['conditions'])
+        (kinds, kind_of_item) = describe_condition(model)
+
+        self.info['conditions'].append({'target': target, 'kinds': kinds, 'layout': self.compile_layout(model)})
+        self.arrays['c%i_items' % condition_id]      = array.array('i', kind_of_item)
+        self.arrays['c%i_relevant' % condition_id]   = array.array('i', model.relevant)
+        self.arrays['c%i_irrelevant' % condition_id] = array.array('i', model.irrelevant)
+        return condition_id
+
+    def compile_layout(self, model):
+        """
+        adds the model's display grid and location tables to the ones to publish, if they aren't there already
+        :return: the layout's index
+        """
+        layout = model.get_location_layout()
+        if not layout in self.layout_index:
+            tables = model.get_location_tables()
+            (fix_dist, dist_wt) = tables.make_tables()
+            index = len(self.info['layouts'])
+            self.info['layouts'].append({'grid': tables.grid})
+            self.arrays['l%i_fix_dist' % index] = array.array('d', fix_dist)
+            self.arrays['l%i_dist_wt' % index]  = array.array('d', dist_wt)
+            self.layout_index[layout] = index
+        return self.layout_index[layout]
+
+    def publish(self):
+        """
+        copies everything compiled so far into a new block of shared memory
+        :return: the block's name, for attach
+        """
+        directory = {}
+        offset    = 0
+        for name in sorted(self.arrays):
+            directory[name] = [self.arrays[name].typecode, offset, len(self.arrays[name])]
+            offset += len(self.arrays[name]) * self.arrays[name].itemsize
+            offset += -offset % 8
+        header = json.dumps({'info': self.info, 'arrays': directory}).encode('utf-8')
+        start  = HEADER_SIZE + len(header)
+        start += -start % 8
+
+        self.memory = shared_memory.SharedMemory(create=True, size=max(start + offset, 1))
+        self.owner  = True
+        self.memory.buf[:HEADER_SIZE] = array.array('Q', [len(header)]).tobytes()
+        self.memory.buf[HEADER_SIZE:HEADER_SIZE + len(header)] = header
+        for name in directory:
+            data = self.arrays[name].tobytes()
+            self.memory.buf[start + directory[name][1]:start + directory[name][1] + len(data)] = data
+        return self.memory.name
+
+    def load_condition(self, model, condition_id):
+        """
+        sets the model up to run a condition (as create_simulation would have), from an attached block
+        :param model: a SearchModel with the parameters the conditions were compiled with
+        """
+        condition = self.info['conditions'][condition_id]
+        model.load_simulation(condition['target'], condition['kinds'], self.arrays['c%i_items' % condition_id],
+                              self.arrays['c%i_relevant' % condition_id], self.arrays['c%i_irrelevant' % condition_id])
+        layout = condition['layout']
+        if model.location_tables is None or model.location_tables.source != (self.memory.name, layout):
+            model.location_tables = SearchModel1.LocationTables(model, self.info['layouts'][layout]['grid'],
+                                                                self.arrays['l%i_fix_dist' % layout],
+                                                                self.arrays['l%i_dist_wt' % layout])
+            model.location_tables.source = (self.memory.name, layout)
+
+    def close(self):
+        """
+        lets go of the block (and, if this made it, removes it). anything loaded from it has to be let go of first:
+        a model's location_tables (see load_condition) read from the block, so set it to None
+        :return:
+        """
+        if self.memory is None:
+            return
+        for name in list(self.arrays):
+            if isinstance(self.arrays[name], memoryview):
+                self.arrays[name].release()
+        self.arrays = {}
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+        self.memory = None
+
+def attach(name):
+    """
+    attaches to a block published by SharedConditions.publish (e.g., in a worker process)
+    :param name: the block's name
+    :return: a SharedConditions whose arrays are memoryviews right into the block
+    """
+    shared = SharedConditions()
+    shared.memory = shared_memory.SharedMemory(name=name)
+    header_length = array.array('Q', bytes(shared.memory.buf[:HEADER_SIZE]))[0]
+    header = json.loads(bytes(shared.memory.buf[HEADER_SIZE:HEADER_SIZE + header_length]).decode('utf-8'))
+    start  = HEADER_SIZE + header_length
+    start += -start % 8
+    shared.info = header['info']
+    for array_name in header['arrays']:
+        [typecode, offset, length] = header['arrays'][array_name]
+        size = length * array.array(typecode).itemsize
+        shared.arrays[array_name] = shared.memory.buf[start + offset:start + offset + size].cast(typecode)
+    return shared
@@ -0,0 +1,625 @@
+
+import sys, os, json, uuid, time, socket, threading, argparse, functools, collections
+import socketserver, http.server, http.client
+import SearchModel1, PremadeSimulations, ParallelSuite, SuitePipeline, DataFiles
+
+
+# * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+# * * * * * * * * * * Simulation Service * * * * * * * * * * * *
+# * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+
+# Runs suites for anyone on the machine, in one shared pool of warm workers (see ParallelSuite.WorkerPool), so several
+# people can run simulations on the same box without each starting their own workers (or each taking all the CPUs).
+# Start it with
+#
+#   python SimulationService.py                          # on http://127.0.0.1:8642
+#   python SimulationService.py --socket data/casper.sock --processes 8
+#
+# and submit jobs to it from Python, with a ServiceClient (or, in the same process, a LocalClient). A job is a JSON
+# dictionary, either a premade simulation:
+#   {'client': 'rachel', 'sim_id': 1, 'num_runs': 52}
+# or suites of its own:
+#   {'client': 'john', 'sim_id': 1, 'target': ..., 'distractors': ..., 'num_distractors_list': [0, 4, 14], 'num_runs': 52}
+# where target and distractors are as for run_suite. Every job has a sim_id: the model is set up for it (its feature
+# dimensions and salience, see PremadeSimulations.configure_model). Either can also have
+#   'parameters' : model parameters to change (e.g., {'MATCH_WEIGHT': 2.5})
+#   'seed'       : the seed of the first suite's trials (the next suite's is seed + 1, and so on: see
+#                  ParallelSuite.trial_seed); if it's missing, each suite gets a new random one
+#   'condition'  : the condition number recorded with a suite of its own (1, if it's missing)
+#
+# Jobs are queued by client, and the workers are handed the clients' tasks in turn (a task is a chunk of one set
+# size's trials, see SuiteScheduler), so one person's long job doesn't hold up everyone else's. While a job runs, its
+# progress (and a summary of the trials so far) can be followed as a stream of JSON lines; once it's done, its result
+# is saved in the result store (STORE_DIRECTORY, a JSON file per job), and served from there.
+#
+# Over HTTP (or the Unix socket):
+#   POST /jobs                : submits a job (the body is its JSON) -> {'job': its id}
+#   GET  /jobs                : the status of every job this service has run
+#   GET  /jobs/<id>           : a job's status
+#   GET  /jobs/<id>/progress  : a job's progress, one JSON line per finished task, until it's done
+#   GET  /jobs/<id>/result    : a finished job's result, from the result store
+
+STORE_DIRECTORY  = 'data/service' # finished jobs' results: <job id>.json
+DEFAULT_HOST     = '127.0.0.1'   # local only
+DEFAULT_PORT     = 8642
+TASKS_PER_WORKER = 2             # tasks handed to the pool per worker at a time (the rest wait in the fair queue)
+
+class ServiceJob(object):
+    """
+    a job the service has been given: its suites, what's been done of them, and its progress so far
+    """
+    def __init__(self, job_id, spec, suites, parallel_suites):
+        """
+        :param spec: the job, as submitted
+        :param suites: [(target, distractors, condition, num_distractors_list, num_runs)...], as in PREMADE_SIMULATIONS
+        :param parallel_suites: a ParallelSuite for each suite, its conditions added (it makes the suite's tasks)
+        """
+        self.id              = job_id
+        self.client          = spec.get('client', 'anonymous')
+        self.spec            = spec
+        self.suites          = suites
+        self.parallel_suites = parallel_suites
+        self.specs           = [] # for each suite, its conditions' specs (see SuitePipeline.condition_specs)
+        self.tallies         = [] # for each suite, a ConditionTally for each condition
+        self.seconds         = [] # for each suite, the seconds spent on each condition (see ParallelSuite.record_costs)
+        self.suite_trials    = [] # for each suite, [trials done, trials in all]
+        self.total           = 0  # trials in all
+        for suite_index in range(len(suites)):
+            (target, distractors, condition, num_distractors_list, num_runs) = suites[suite_index]
+            self.specs.append(list(SuitePipeline.condition_specs([target[0], 1], distractors, num_distractors_list)))
+            self.tallies.append([SuitePipeline.ConditionTally() for spec in self.specs[-1]])
+            self.seconds.append([0.0] * len(num_distractors_list))
+            self.suite_trials.append([0, num_runs * len(num_distractors_list)])
+            self.total += num_runs * len(num_distractors_list)
+        self.tasks      = self.make_tasks() # the tasks not yet handed to the workers
+        self.done       = 0   # trials done
+        self.state      = 'queued' # then 'running', 'finished' or 'failed'
+        self.error      = None
+        self.start_time = time.time()
+        self.events     = [] # the progress reports so far (see SimulationService.progress)
+
+    def make_tasks(self):
+        # the suites' tasks (for the workers: see ParallelSuite.run_job), tagged with this job and their suite
+        for suite_index in range(len(self.parallel_suites)):
+            for task in self.parallel_suites[suite_index].make_jobs():
+                task['tag'] = (self.id, suite_index, task['tag'])
+                yield task
+
+    def add_records(self, suite_index, condition_id, records, seconds):
+        tally = self.tallies[suite_index][condition_id]
+        for record in records:
+            tally('trial', self.specs[suite_index][condition_id], None, record)
+        self.seconds[suite_index][condition_id] += seconds
+        self.done += len(records)
+        self.suite_trials[suite_index][0] += len(records)
+        if self.suite_trials[suite_index][0] == self.suite_trials[suite_index][1]:
+            self.parallel_suites[suite_index].close() # (its trials are all back: the workers are done with its conditions)
+
+    def close(self):
+        """
+        removes the shared memory of the suites' conditions (see ParallelSuite.publish)
+        :return:
+        """
+        for parallel_suite in self.parallel_suites:
+            parallel_suite.close()
+
+    def summarize(self, full=False):
+        """
+        :param full: whether to include each condition's tally (see ConditionTally.get_state)
+        :return: for each suite, its target, distractors, condition and seed, and, for each of its conditions, its
+                 number of distractors and lures, its outcomes ([runs, errors, stalled, cut off]) and its mean rt
+                 and sem (None, if it's had no correct runs), so far
+        """
+        summary = []
+        for suite_index in range(len(self.suites)):
+            (target, distractors, condition, num_distractors_list, num_runs) = self.suites[suite_index]
+            conditions = []
+            for condition_id in range(len(self.specs[suite_index])):
+                spec  = self.specs[suite_index][condition_id]
+                tally = self.tallies[suite_index][condition_id]
+                entry = {'num_distractors': spec['num_distractors'],
+                         'num_lures'      : spec['num_lures'],
+                         'outcomes'       : [tally.runs, tally.errors, tally.stalled, tally.cut_off],
+                         'rt'             : tally.stats['rt'].mean_and_sem()}
+                if full:
+                    entry['tally'] = tally.get_state()
+                conditions.append(entry)
+            summary.append({'target'    : target,
+                            'distractors': distractors,
+                            'condition' : condition,
+                            'seed'      : self.parallel_suites[suite_index].seed,
+                            'conditions': conditions})
+        return summary
+
+    def get_status(self):
+        status = {'job'    : self.id,
+                  'client' : self.client,
+                  'state'  : self.state,
+                  'done'   : self.done,
+                  'total'  : self.total,
+                  'seconds': time.time() - self.start_time,
+                  'summary': self.summarize()}
+        if self.error:
+            status['error'] = self.error
+        return status
+
+class SimulationService(object):
+    """
+    a fair queue of jobs over a shared pool of warm workers, with a result store; see above
+    """
+    def __init__(self, model, processes=None, store=STORE_DIRECTORY):
+        """
+        :param model: the SearchModel whose parameters are the jobs' defaults (set up for some simulation: see
+                      PremadeSimulations.configure_model)
+        :param processes: how many worker processes; None means one per CPU
+        :param store: the result store's directory
+        """
+        self.pool        = ParallelSuite.WorkerPool(model, processes)
+        self.store       = store
+        self.jobs        = {} # job id -> ServiceJob
+        self.queue       = collections.OrderedDict() # client -> [the ids of its jobs with tasks to hand out], in turn
+        self.in_flight   = 0  # tasks handed to the pool and not back yet
+        self.max_in_flight = TASKS_PER_WORKER * self.pool.processes
+        self.lock        = threading.Condition()
+        self.stopping    = False
+        self.dispatcher  = None
+
+    def start(self):
+        """
+        starts the workers and the thread that hands them tasks
+        :return:
+        """
+        if not os.path.isdir(self.store):
+            os.makedirs(self.store)
+        self.pool.start() # (before there are any other threads to fork)
+        self.dispatcher = threading.Thread(target=self.dispatch, name='service dispatcher')
+        self.dispatcher.daemon = True
+        self.dispatcher.start()
+
+    def stop(self):
+        """
+        stops handing out tasks, and stops the workers (jobs that aren't done are dropped)
+        :return:
+        """
+        with self.lock:
+            self.stopping = True
+            self.lock.notify_all()
+        if self.dispatcher:
+            self.dispatcher.join()
+        self.pool.close()
+        for job_id in self.jobs:
+            self.jobs[job_id].close()
+
+    # * * * * * jobs * * * * *
+
+    def make_model(self, spec):
+        """
+        :return: a model with the parameters the job runs with (the service's, set up for its sim_id, and with its
+                 own parameters)
+        """
+        overrides = spec.get('parameters', {})
+        for name in overrides:
+            if not name in self.pool.parameters:
+                raise ValueError('unknown parameter ' + str(name))
+        parameters = dict(self.pool.parameters)
+        if 'POMERANTZ_UNITS' in overrides: # (the shape vectors are made with it)
+            parameters['POMERANTZ_UNITS'] = overrides['POMERANTZ_UNITS']
+        model = ParallelSuite.make_model(parameters)
+        PremadeSimulations.configure_model(model, spec['sim_id'])
+        for name in overrides:
+            setattr(model, name, overrides[name])
+        return model
+
+    def make_suites(self, spec):
+        """
+        :return: the job's suites, [(target, distractors, condition, num_distractors_list, num_runs)...]
+        """
+        if 'target' in spec:
+            for key in ('distractors', 'num_distractors_list', 'num_runs'):
+                if not key in spec:
+                    raise ValueError('a job with a target needs ' + key)
+            return [(spec['target'], spec['distractors'], spec.get('condition', 1), spec['num_distractors_list'], spec['num_runs'])]
+        suites = []
+        for (target, distractors, condition, num_distractors_list, num_runs) in PremadeSimulations.PREMADE_SIMULATIONS[spec['sim_id']]['suites']:
+            suites.append((target, distractors, condition, num_distractors_list, spec.get('num_runs', num_runs)))
+        return suites
+
+    def submit(self, spec):
+        """
+        queues a job
+        :param spec: the job (see above)
+        :return: the job's id
+        """
+        if not spec.get('sim_id') in PremadeSimulations.PREMADE_SIMULATIONS:
+            raise ValueError('no premade simulation ' + str(spec.get('sim_id')))
+        model  = self.make_model(spec)
+        suites = self.make_suites(spec)
+        parallel_suites = []
+        for suite_index in range(len(suites)):
+            (target, distractors, condition, num_distractors_list, num_runs) = suites[suite_index]
+            seed = spec.get('seed')
+            if seed is not None:
+                seed += suite_index
+            parallel_suite = ParallelSuite.ParallelSuite(model, seed=seed, pool=self.pool)
+            for num_distractors in num_distractors_list:
+                parallel_suite.add_condition([target[0], 1], PremadeSimulations.make_distractor_list(distractors, num_distractors), num_runs)
+            parallel_suites.append(parallel_suite)
+
+        with self.lock:
+            job = ServiceJob(uuid.uuid4().hex[:12], spec, suites, parallel_suites)
+            self.jobs[job.id] = job
+            self.queue.setdefault(job.client, []).append(job.id)
+            self.report(job)
+            if job.total == 0:
+                self.finish(job)
+            self.lock.notify_all()
+        return job.id
+
+    def get_status(self, job_id=None):
+        """
+        :return: the job's status (its state, trials done and total, and a summary of its trials so far), or, with
+                 no job_id, a list of every job's; None if there's no such job
+        """
+        with self.lock:
+            if job_id is None:
+                return [self.jobs[key].get_status() for key in self.jobs]
+            if job_id in self.jobs:
+                return self.jobs[job_id].get_status()
+        if self.get_result(job_id) is not None:
+            return {'job': job_id, 'state': 'finished'} # (run before this service started)
+        return None
+
+    def get_result(self, job_id):
+        """
+        :return: a finished job's result, from the result store (None, if it isn't there)
+        """
+        file_name = self.result_file_name(job_id)
+        if file_name is None or not os.path.isfile(file_name):
+            return None
+        with open(file_name, 'r') as result_file:
+            return json.load(result_file)
+
+    def result_file_name(self, job_id):
+        if not job_id.isalnum():
+            return None # (not a job id: don't let it name some other file)
+        return os.path.join(self.store, job_id + '.json')
+
+    def progress(self, job_id, timeout=None):
+        """
+        :return: (a generator of) the job's progress reports: the ones so far, then each new one as it comes, until
+                 the job is done (the last one says whether it finished or failed). each is its status (see
+                 get_status), as it was then
+        :param timeout: how long to wait for a report (seconds) before giving up; None means forever
+        """
+        next_event = 0
+        while True:
+            with self.lock:
+                job = self.jobs[job_id]
+                while next_event == len(job.events) and job.state in ('queued', 'running'):
+                    if not self.lock.wait(timeout):
+                        return
+                events = job.events[next_event:]
+                over   = job.state in ('finished', 'failed')
+            for event in events:
+                yield event
+            next_event += len(events)
+            if over and next_event == len(job.events):
+                return
+
+    # * * * * * the fair queue * * * * *
+
+    def next_task(self):
+        # the next task to hand out: the next client's (in turn), from its oldest job with any left (with the lock)
+        while self.queue:
+            client = next(iter(self.queue))
+            job_ids = self.queue[client]
+            task = None
+            while job_ids and task is None:
+                job = self.jobs[job_ids[0]]
+                if job.state in ('queued', 'running'):
+                    task = next(job.tasks, None)
+                if task is None:
+                    job_ids.pop(0) # (all handed out)
+            if job_ids:
+                self.queue.move_to_end(client) # (its turn is over)
+            else:
+                del self.queue[client]
+            if task is not None:
+                if job.state == 'queued':
+                    job.state = 'running'
+                return task
+        return None
+
+    def dispatch(self):
+        # hands tasks to the workers, a few at a time (in its own thread)
+        while True:
+            with self.lock:
+                while not self.stopping and (self.in_flight >= self.max_in_flight or not self.queue):
+                    self.lock.wait()
+                if self.stopping:
+                    return
+                task = self.next_task()
+                if task is None:
+                    continue
+                self.in_flight += 1
+            self.pool.submit(task, self.task_done, functools.partial(self.task_failed, task['tag'][0]))
+
+    def task_done(self, result):
+        # a task's records are back (in a thread of the pool's)
+        ((job_id, suite_index, condition_id), first_trial, records, seconds) = result
+        with self.lock:
+            self.in_flight -= 1
+            job = self.jobs[job_id]
+            if job.state == 'running':
+                job.add_records(suite_index, condition_id, records, seconds)
+                if job.done == job.total:
+                    self.finish(job)
+                else:
+                    self.report(job)
+            self.lock.notify_all()
+
+    def task_failed(self, job_id, error):
+        # a task failed (in a thread of the pool's): so does its job
+        with self.lock:
+            self.in_flight -= 1
+            job = self.jobs[job_id]
+            if job.state in ('queued', 'running'):
+                job.state = 'failed'
+                job.error = repr(error)
+                job.close()
+                print( 'Job ' + job_id + ' failed: ' + job.error)
+                self.report(job)
+            self.lock.notify_all()
+
+    def finish(self, job):
+        # the job is done: save its result in the store (with the lock)
+        result = {'job'    : job.id,
+                  'client' : job.client,
+                  'spec'   : job.spec,
+                  'seconds': time.time() - job.start_time,
+                  'suites' : job.summarize(full=True)}
+        DataFiles.write_atomically(self.result_file_name(job.id), json.dumps(result))
+        for suite_index in range(len(job.parallel_suites)):
+            job.parallel_suites[suite_index].record_costs(job.seconds[suite_index])
+        job.close()
+        job.state = 'finished'
+        self.report(job)
+
+    def report(self, job):
+        # adds a progress report (with the lock)
+        job.events.append(job.get_status())
+        self.lock.notify_all()
+
+
+# * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+# * * * * * * * * * * * * HTTP Server * * * * * * * * * * * * * *
+# * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+
+class ServiceRequestHandler(http.server.BaseHTTPRequestHandler):
+    """
+    the service's requests, over HTTP or the Unix socket (see above). the server has the service, as server.service
+    """
+    def do_POST(self):
+        if self.path.rstrip('/') != '/jobs':
+            return self.send_json(404, {'error': 'no such thing: ' + self.path})
+        try:
+            spec = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))).decode('utf-8'))
+            if not isinstance(spec, dict):
+                raise ValueError('a job is a JSON object')
+            job_id = self.server.service.submit(spec)
+        except (ValueError, KeyError, TypeError, IndexError) as error:
+            return self.send_json(400, {'error': str(error)})
+        self.send_json(201, {'job': job_id})
+
+    def do_GET(self):
+        parts   = self.path.strip('/').split('/')
+        service = self.server.service
+        if parts == ['jobs']:
+            return self.send_json(200, service.get_status())
+        if len(parts) < 2 or parts[0] != 'jobs' or len(parts) > 3:
+            return self.send_json(404, {'error': 'no such thing: ' + self.path})
+        job_id = parts[1]
+        status = service.get_status(job_id)
+        if status is None:
+            return self.send_json(404, {'error': 'no job ' + job_id})
+        if len(parts) == 2:
+            return self.send_json(200, status)
+        if parts[2] == 'result':
+            result = service.get_result(job_id)
+            if result is None:
+                return self.send_json(404, {'error': 'job ' + job_id + ' is ' + status['state']})
+            return self.send_json(200, result)
+        if parts[2] == 'progress':
+            if not job_id in service.jobs:
+                return self.send_json(200, status) # (done before this service started: that's all there is)
+            # one JSON line per report, as they come; the end of the stream is the end of the job
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/x-ndjson')
+            self.end_headers()
+            for event in service.progress(job_id):
+                self.wfile.write((json.dumps(event) + '\n').encode('utf-8'))
+                self.wfile.flush()
+            return
+        self.send_json(404, {'error': 'no such thing: ' + self.path})
+
+    def send_json(self, code, thing):
+        body = json.dumps(thing).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self):
+        if isinstance(self.client_address, tuple):
+            return self.client_address[0]
+        return 'local' # (a Unix socket's clients have no address)
+
+    def log_message(self, format, *args):
+        pass # (every poll and progress stream would be a line on the terminal)
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def serve(service, address):
+    """
+    :param address: (host, port) for HTTP, or a file name for a Unix socket
+    :return: the server, ready to serve_forever (each request has a thread of its own)
+    """
+    if isinstance(address, str):
+        if os.path.exists(address):
+            os.remove(address) # (left over from a service that's gone)
+        server = UnixHTTPServer(address, ServiceRequestHandler)
+    else:
+        server = http.server.ThreadingHTTPServer(tuple(address), ServiceRequestHandler)
+        server.daemon_threads = True
+    server.service = service
+    return server
+
+
+# * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+# * * * * * * * * * * * * * Clients * * * * * * * * * * * * * * *
+# * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    # an HTTPConnection over a Unix socket
+    def __init__(self, socket_name, timeout=None):
+        http.client.HTTPConnection.__init__(self, 'localhost', timeout=timeout)
+        self.socket_name = socket_name
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.timeout is not None:
+            self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_name)
+
+class ServiceClient(object):
+    """
+    submits jobs to a SimulationService, and follows them, over HTTP or its Unix socket
+    """
+    def __init__(self, address=(DEFAULT_HOST, DEFAULT_PORT), timeout=None):
+        """
+        :param address: (host, port), or the Unix socket's file name
+        :param timeout: seconds to wait for the service before giving up (None means forever)
+        """
+        self.address = address
+        self.timeout = timeout
+
+    def request(self, method, path, thing=None):
+        # :return: the open connection and the response
+        if isinstance(self.address, str):
+            connection = UnixHTTPConnection(self.address, self.timeout)
+        else:
+            connection = http.client.HTTPConnection(self.address[0], self.address[1], timeout=self.timeout)
+        body = None
+        headers = {}
+        if thing is not None:
+            body = json.dumps(thing).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        connection.request(method, path, body, headers)
+        return connection, connection.getresponse()
+
+    def call(self, method, path, thing=None):
+        # :return: the JSON the service answered with, or None if it found no such thing (raises ValueError if the
+        #          request was bad)
+        (connection, response) = self.request(method, path, thing)
+        try:
+            answer = json.loads(response.read().decode('utf-8'))
+        finally:
+            connection.close()
+        if response.status == 404:
+            return None
+        if response.status >= 400:
+            raise ValueError(answer.get('error'))
+        return answer
+
+    def submit(self, spec):
+        """
+        :return: the job's id
+        """
+        return self.call('POST', '/jobs', spec)['job']
+
+    def get_status(self, job_id=None):
+        if job_id is None:
+            return self.call('GET', '/jobs')
+        return self.call('GET', '/jobs/' + job_id)
+
+    def get_result(self, job_id):
+        return self.call('GET', '/jobs/' + job_id + '/result')
+
+    def progress(self, job_id):
+        """
+        :return: (a generator of) the job's progress reports, as they come, until it's done
+        """
+        (connection, response) = self.request('GET', '/jobs/' + job_id + '/progress')
+        try:
+            if response.getheader('Content-Type') != 'application/x-ndjson':
+                yield json.loads(response.read().decode('utf-8'))
+                return
+            for line in response:
+                yield json.loads(line.decode('utf-8'))
+        finally:
+            connection.close()
+
+    def wait(self, job_id):
+        """
+        follows the job until it's done
+        :return: its result (None, if it failed)
+        """
+        for event in self.progress(job_id):
+            pass
+        return self.get_result(job_id)
+
+class LocalClient(ServiceClient):
+    """
+    a ServiceClient for a SimulationService in this process: the same calls, with no server in between
+    """
+    def __init__(self, service):
+        self.service = service
+
+    def submit(self, spec):
+        return self.service.submit(spec)
+
+    def get_status(self, job_id=None):
+        return self.service.get_status(job_id)
+
+    def get_result(self, job_id):
+        return self.service.get_result(job_id)
+
+    def progress(self, job_id):
+        return self.service.progress(job_id)
+
+
+# * * * * * * * * * * * * * * * * * * * * * * * * * * *
+# * * * * * * * * * * * Main Body * * * * * * * * * * *
+# * * * * * * * * * * * * * * * * * * * * * * * * * * *
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description='Run simulation jobs for local clients, in a shared pool of workers')
+    parser.add_argument('--host', default=DEFAULT_HOST, help='address to serve HTTP on (default: this machine only)')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='port to serve HTTP on')
+    parser.add_argument('--socket', help='serve on this Unix socket instead of HTTP')
+    parser.add_argument('--processes', type=int, help='worker processes (default: one per CPU)')
+    parser.add_argument('--store', default=STORE_DIRECTORY, help="directory of the finished jobs' results")
+    args = parser.parse_args(arguments)
+
+    model = SearchModel1.SearchModel()
+    PremadeSimulations.configure_model(model, min(PremadeSimulations.PREMADE_SIMULATIONS))
+    service = SimulationService(model, args.processes, args.store)
+    service.start()
+    address = args.socket or (args.host, args.port)
+    server  = serve(service, address)
+    print( 'Simulation service on ' + str(address) + ', ' + str(service.pool.processes) + ' worker processes')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
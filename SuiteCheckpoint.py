@@ -0,0 +1,197 @@
+
+import os, json, random
+
+
+# * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+# * * * * * * * * * * Suite Checkpoints * * * * * * * * * * * *
+# * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+
+# A premade suite (e.g., SIM_ID 1: 100 subjects x 3 conditions x 7 set sizes x 52 runs) can take many hours, and if it
+# is killed partway, the csv file it was appending to has half a set size in it. So a suite keeps a journal, one JSON
+# line per unit of work, written (and synced to disk) as each unit is finished:
+#   the header  : {'sim_id', 'first_index', 'num_subjects'}: what was run, and the data file indices it has
+#   a subject   : {'key': 's<subject>', ...}: the subject's csv file has its header
+#   a suite     : {'suite': '<subject>:<suite>', 'random_state'}: a suite (one run_suite) started
+#   a unit      : {'key': '<subject>:<suite>:<condition index>', 'data': ..., ...}: one set size of a suite is done
+# every line but the header also has 'files', the length of each file written to so far (once the unit's writes were
+# synced) and 'random_state', the state of the random numbers at that point.
+#
+# Resuming a suite (see SearchModelInterface.resume_premade_suite) runs it again from the top, but skips the units in
+# the journal: their data are read back from it, the files are cut back to the lengths the journal gives them (which
+# throws away whatever an unfinished unit had written), and the random numbers are set back to where they were, so a
+# resumed suite writes the same files an uninterrupted one would have.
+
+CHECKPOINT_FILE = 'data/(%3i)_checkpoint.jsonl' # % the suite's first data file index
+
+class SuiteCheckpoint(object):
+    """
+    the journal of a premade suite: what's been done, so an interrupted suite can be resumed (see above)
+    """
+    def __init__(self, file_name, header=None):
+        """
+        :param file_name: the journal's file
+        :param header: for a new suite, {'sim_id', 'first_index', 'num_subjects'}: starts a new journal. None reads
+                       the journal that's there, to resume the suite
+        """
+        self.file_name    = file_name
+        self.header       = header
+        self.units        = {}    # unit or subject key -> its data
+        self.files        = {}    # file name -> the length it had at the last checkpoint
+        self.suite_states = {}    # suite key -> the random state when the suite started
+        self.last_state   = None  # the random state at the last checkpoint
+        self.finished     = False # whether the whole suite was done
+        self.resuming     = header is None
+        self.restored     = False # whether the random numbers have been set back (see restore_random)
+        self.restored_files = set() # the files that have been cut back (see restore_file)
+        self.suite_key    = None  # the suite being run (see begin_suite)
+
+        if header is None:
+            self.read_journal()
+        else:
+            with open(file_name, 'w') as journal:
+                journal.write(json.dumps(header) + '\n')
+                journal.flush()
+                os.fsync(journal.fileno())
+
+    def read_journal(self):
+        # reads the header and the checkpoints. a line that's cut short (the run was killed while writing it) and
+        # anything after it are cut off the journal
+        good_length = 0
+        with open(self.file_name, 'rb') as journal:
+            for line in journal:
+                try:
+                    entry = json.loads(line.decode('utf-8'))
+                except ValueError:
+                    break
+                if not line.endswith(b'\n'):
+                    break
+                good_length += len(line)
+                if self.header is None:
+                    self.header = entry
+                    continue
+                if entry.get('finished'):
+                    self.finished = True
+                if 'suite' in entry:
+                    self.suite_states[entry['suite']] = entry['random_state']
+                if 'key' in entry:
+                    self.units[entry['key']] = entry.get('data')
+                if 'files' in entry:
+                    self.files.update(entry['files'])
+                if 'random_state' in entry:
+                    self.last_state = entry['random_state']
+        if self.header is None:
+            raise ValueError(self.file_name + ' has no header')
+        if good_length < os.path.getsize(self.file_name):
+            os.truncate(self.file_name, good_length)
+
+    def write_entry(self, entry):
+        # appends a line to the journal, and makes sure it's on disk before going on. (when resuming, anything new in
+        # the journal is new work, so the random numbers have to have been set back by now)
+        self.restore_random()
+        entry['random_state'] = random.getstate()
+        with open(self.file_name, 'a') as journal:
+            journal.write(json.dumps(entry) + '\n')
+            journal.flush()
+            os.fsync(journal.fileno())
+
+    def begin_suite(self, subject, suite):
+        """
+        starts a suite (one run_suite) of a subject: the units after this are its set sizes
+        """
+        self.suite_key = '%i:%i' % (subject, suite)
+        if not self.suite_key in self.suite_states:
+            self.write_entry({'suite': self.suite_key})
+
+    def unit_key(self, condition_index):
+        return self.suite_key + ':' + str(condition_index)
+
+    def completed(self, key):
+        """
+        :param key: a subject's key ('s<subject>') or a set size's index in the current suite
+        :return: whether it's done
+        """
+        if not isinstance(key, str):
+            key = self.unit_key(key)
+        return key in self.units
+
+    def unit_data(self, condition_index):
+        """
+        :return: the data committed for a set size of the current suite
+        """
+        return self.units[self.unit_key(condition_index)]
+
+    def suite_completed(self, num_conditions):
+        """
+        :return: whether all num_conditions set sizes of the current suite are done
+        """
+        for condition_index in range(num_conditions):
+            if not self.completed(condition_index):
+                return False
+        return True
+
+    def commit(self, key, data, files):
+        """
+        records that a unit is done: syncs its files and writes the checkpoint
+        :param key: a subject's key ('s<subject>') or a set size's index in the current suite
+        :param data: what to keep of the unit (JSON-able), to be read back with unit_data when the suite is resumed
+        :param files: the open files the unit wrote to (None is skipped)
+        """
+        if not isinstance(key, str):
+            key = self.unit_key(key)
+        for data_file in files:
+            if data_file is None:
+                continue
+            data_file.flush()
+            os.fsync(data_file.fileno())
+            self.files[data_file.name] = os.fstat(data_file.fileno()).st_size
+        self.units[key] = data
+        self.write_entry({'key': key, 'data': data, 'files': self.files})
+
+    def finish(self):
+        """
+        records that the whole suite is done
+        """
+        self.finished = True
+        self.write_entry({'finished': True})
+
+    def restore_file(self, file_name):
+        """
+        when resuming, before a file is first opened to append to: cuts it back to its length at the last checkpoint
+        (or to nothing, if it wasn't written to before then)
+        """
+        if not self.resuming or file_name in self.restored_files:
+            return
+        self.restored_files.add(file_name)
+        if os.path.exists(file_name):
+            os.truncate(file_name, min(self.files.get(file_name, 0), os.path.getsize(file_name)))
+
+    def restore_random(self, suite=False):
+        """
+        when resuming, the first time work that isn't in the journal is about to be done: sets the random numbers back
+        to where they were at that point
+        :param suite: True to set them back to the start of the current suite (if it got that far), to redo all of it
+        """
+        if not self.resuming or self.restored:
+            return
+        self.restored = True
+        state = self.last_state
+        if suite and self.suite_key in self.suite_states:
+            state = self.suite_states[self.suite_key]
+        if state is not None:
+            random.setstate((state[0], tuple(state[1]), state[2]))
+
+def find_unfinished(directory='data'):
+    """
+    :return: the journals in directory of suites that weren't finished, [(file name, header)...]
+    """
+    unfinished = []
+    for file_name in sorted(os.listdir(directory)):
+        if file_name.endswith('_checkpoint.jsonl'):
+            path = os.path.join(directory, file_name)
+            try:
+                checkpoint = SuiteCheckpoint(path)
+            except ValueError:
+                continue
+            if not checkpoint.finished:
+                unfinished.append((path, checkpoint.header))
+    return unfinished
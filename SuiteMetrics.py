@@ -0,0 +1,168 @@
+
+import os, time, bisect
+import DataFiles
+
+
+# * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+# * * * * * * * * * * * Suite Metrics * * * * * * * * * * * * * *
+# * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+
+# Counters and histograms of what the suites run in this process have simulated, written every WRITE_INTERVAL
+# seconds in the Prometheus text format to METRICS_FILE (whole, so a scrape never sees half of it), for a node
+# exporter's textfile collector to pick up (point its --collector.textfile.directory at data/metrics). There's no
+# server: the file is all there is.
+#
+# The trials' counts come from the suites' events (a SuiteMetrics is a sink: see SuitePipeline), so they include the
+# trials run in worker processes. The time spent in each phase of a trial comes from the model (see
+# SearchModel.run_whole_search, which reports it when the model's metrics is set): here, straight from the model;
+# in a worker process, with the trial's record (as its 'phases': see ParallelSuite.PhaseRecorder).
+#
+#   casper_trials_total{outcome}               trials done, by outcome: correct, error, stalled or cut_off
+#   casper_iterations_total                    iterations simulated (all the trials' rts, added up)
+#   casper_selections_total                    attentional selections
+#   casper_eye_movements_total                 eye movements
+#   casper_auto_rejections_total               lures rejected without attention
+#   casper_conditions_total                    set sizes done
+#   casper_trial_iterations                    a histogram of the trials' rts, in iterations
+#   casper_phase_seconds{phase}                a histogram of the seconds a trial spent in each phase: setup
+#                                              (init_search), step (run_search_step) and idle (run_idle_steps)
+#   casper_phase_steps_total{phase}            the steps run in the step and idle phases
+#   casper_metrics_updated_timestamp_seconds   when the file was written
+
+METRICS_FILE      = 'data/metrics/casper.prom'
+WRITE_INTERVAL    = 15.0 # seconds between writes of the file
+ITERATION_BUCKETS = (10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+SECONDS_BUCKETS   = (0.0001, 0.0003, 0.001, 0.003, 0.01, 0.03, 0.1, 0.3, 1.0, 3.0, 10.0)
+OUTCOMES          = ('correct', 'error', 'stalled', 'cut_off')
+PHASES            = ('setup', 'step', 'idle')
+
+HELP = {'casper_trials_total'                     : ('counter', 'Trials done, by outcome'),
+        'casper_iterations_total'                 : ('counter', 'Search iterations simulated'),
+        'casper_selections_total'                 : ('counter', 'Attentional selections'),
+        'casper_eye_movements_total'              : ('counter', 'Eye movements'),
+        'casper_auto_rejections_total'            : ('counter', 'Lures rejected without attention'),
+        'casper_conditions_total'                 : ('counter', 'Set sizes done'),
+        'casper_trial_iterations'                 : ('histogram', 'Trial response times, in iterations'),
+        'casper_phase_seconds'                    : ('histogram', 'Seconds a trial spent in each phase'),
+        'casper_phase_steps_total'                : ('counter', 'Steps run in the step and idle phases'),
+        'casper_metrics_updated_timestamp_seconds': ('gauge', 'When these metrics were written')}
+
+class Histogram(object):
+    """
+    a Prometheus histogram: how many values fell at or under each bucket's bound, their sum and their count
+    """
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts  = [0] * (len(buckets) + 1) # (the last is for the values over every bound)
+        self.sum     = 0.0
+        self.count   = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum   += value
+        self.count += 1
+
+    def get_lines(self, name, labels):
+        # :return: the histogram's lines in the text format (the buckets are cumulative there)
+        lines = []
+        total = 0
+        for index in range(len(self.buckets)):
+            total += self.counts[index]
+            lines.append('%s_bucket{%sle="%s"} %i' % (name, labels, repr(float(self.buckets[index])), total))
+        lines.append('%s_bucket{%sle="+Inf"} %i' % (name, labels, self.count))
+        labels = labels.rstrip(',')
+        if labels:
+            labels = '{' + labels + '}'
+        lines.append('%s_sum%s %s' % (name, labels, repr(float(self.sum))))
+        lines.append('%s_count%s %i' % (name, labels, self.count))
+        return lines
+
+class SuiteMetrics(object):
+    """
+    the counters and histograms (see above), and the file they're written to
+    """
+    def __init__(self, file_name=METRICS_FILE, interval=WRITE_INTERVAL):
+        """
+        :param file_name: the file to write them to (a .prom file, for a textfile collector)
+        :param interval: the least time between writes (seconds)
+        """
+        self.file_name  = file_name
+        self.interval   = interval
+        self.next_write = time.time() + interval
+        self.counters   = {} # (name, labels) -> value (labels as in the text format, 'outcome="error",')
+        self.histograms = {} # (name, labels) -> Histogram
+        for outcome in OUTCOMES:
+            self.counters[('casper_trials_total', 'outcome="%s",' % outcome)] = 0
+        for name in ('casper_iterations_total', 'casper_selections_total', 'casper_eye_movements_total',
+                     'casper_auto_rejections_total', 'casper_conditions_total'):
+            self.counters[(name, '')] = 0
+        self.histograms[('casper_trial_iterations', '')] = Histogram(ITERATION_BUCKETS)
+        for phase in PHASES:
+            self.histograms[('casper_phase_seconds', 'phase="%s",' % phase)] = Histogram(SECONDS_BUCKETS)
+            if phase != 'setup': # (which has no steps)
+                self.counters[('casper_phase_steps_total', 'phase="%s",' % phase)] = 0
+
+    def __call__(self, kind, spec, run, record):
+        if kind == 'trial':
+            counters = self.counters
+            if record['timed_out']: outcome = 'cut_off'
+            elif record['stalled']: outcome = 'stalled'
+            elif record['correct']: outcome = 'correct'
+            else: outcome = 'error'
+            counters[('casper_trials_total', 'outcome="%s",' % outcome)] += 1
+            counters[('casper_iterations_total', '')]      += record['iteration']
+            counters[('casper_selections_total', '')]      += record['num_attended']
+            counters[('casper_eye_movements_total', '')]   += record['num_eye_movements']
+            counters[('casper_auto_rejections_total', '')] += record['num_auto_rejections']
+            self.histograms[('casper_trial_iterations', '')].observe(record['iteration'])
+            if 'phases' in record: # (timed in a worker process)
+                self.add_phases(*record['phases'])
+            if time.time() >= self.next_write:
+                self.write()
+        elif kind == 'end':
+            self.counters[('casper_conditions_total', '')] += 1
+
+    def add_phases(self, phase_seconds, phase_steps):
+        """
+        adds a trial's time in each phase (from SearchModel.run_whole_search)
+        :param phase_seconds: phase -> seconds
+        :param phase_steps: phase -> the number of steps (of the ones that have steps)
+        """
+        for phase in phase_seconds:
+            self.histograms[('casper_phase_seconds', 'phase="%s",' % phase)].observe(phase_seconds[phase])
+        for phase in phase_steps:
+            self.counters[('casper_phase_steps_total', 'phase="%s",' % phase)] += phase_steps[phase]
+
+    def get_text(self):
+        """
+        :return: the metrics in the Prometheus text format
+        """
+        now = time.time()
+        samples = {} # name -> its lines
+        for (name, labels) in sorted(self.counters):
+            text_labels = labels.rstrip(',')
+            if text_labels:
+                text_labels = '{' + text_labels + '}'
+            samples.setdefault(name, []).append('%s%s %s' % (name, text_labels, self.counters[(name, labels)]))
+        for (name, labels) in sorted(self.histograms):
+            samples.setdefault(name, []).extend(self.histograms[(name, labels)].get_lines(name, labels))
+        samples['casper_metrics_updated_timestamp_seconds'] = ['casper_metrics_updated_timestamp_seconds %.3f' % now]
+
+        lines = []
+        for name in sorted(samples):
+            (kind, help_text) = HELP[name]
+            lines.append('# HELP ' + name + ' ' + help_text)
+            lines.append('# TYPE ' + name + ' ' + kind)
+            lines.extend(samples[name])
+        return '\n'.join(lines) + '\n'
+
+    def write(self):
+        """
+        writes the metrics to the file (whole)
+        :return:
+        """
+        self.next_write = time.time() + self.interval
+        directory = os.path.dirname(self.file_name)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        DataFiles.write_atomically(self.file_name, self.get_text())
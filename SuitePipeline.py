@@ -0,0 +1,243 @@
+
+import PremadeSimulations, GraphicalRun1
+
+
+# * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+# * * * * * * * * * * * Suite Pipelines * * * * * * * * * * * *
+# * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+
+# A suite runs as a pipeline of generators: the conditions' specs (condition_specs) feed a stream of events
+# (trial_events), which goes through any filters, then past the sinks (tee), which tally it, write it out, etc.
+# Nothing is held on to but what the sinks keep, so a suite of any number of trials runs in the same memory, and a
+# new sink or filter doesn't need any change to the loop that runs the trials.
+#
+# An event is (kind, spec, run, value):
+#   ('begin',   spec, None, None)   : a condition is starting
+#   ('trial',   spec, run,  record) : a trial's record (SearchModel.get_trial_record); run is its number (1...)
+#   ('restore', spec, None, state)  : the condition was done before the suite was interrupted: its tally's state (see
+#                                     ConditionTally.get_state and SuiteCheckpoint)
+#   ('end',     spec, None, None)   : the condition is done
+# A spec is a dictionary: the condition's 'index' in the suite, 'target' and 'distractor_list' (as for
+# create_simulation), 'num_distractors' and 'num_lures'.
+#
+# A sink is anything that can be called with an event's four parts; a filter is a generator function from one stream
+# of events to another (it should pass 'begin', 'restore' and 'end' on).
+
+def condition_specs(target, distractors, num_distractors_list):
+    """
+    :param target: [target properties, number of targets], as for create_simulation
+    :param distractors, num_distractors_list: as for run_suite
+    :return: (a generator of) the spec of each condition
+    """
+    for condition_index in range(len(num_distractors_list)):
+        distractor_list = PremadeSimulations.make_distractor_list(distractors, num_distractors_list[condition_index])
+        num_lures = 0
+        for non_target in distractor_list:
+            num_lures += non_target[1]
+        yield {'index'          : condition_index,
+               'target'         : target,
+               'distractor_list': distractor_list,
+               'num_distractors': num_distractors_list[condition_index],
+               'num_lures'      : num_lures}
+
+def trial_events(specs, get_trials):
+    """
+    :param specs: the conditions' specs
+    :param get_trials: a function of a spec that returns the condition's trials' records (any iterable), or, if the
+                       condition was done before the suite was interrupted, its tally's state (a dictionary)
+    :return: (a generator of) the events of the conditions, one after another
+    """
+    for spec in specs:
+        yield ('begin', spec, None, None)
+        trials = get_trials(spec)
+        if isinstance(trials, dict):
+            yield ('restore', spec, None, trials)
+        else:
+            run = 0
+            for record in trials:
+                run += 1
+                yield ('trial', spec, run, record)
+        yield ('end', spec, None, None)
+
+def tee(events, sinks):
+    """
+    :return: (a generator of) the events, each one passed on once every sink has had it
+    """
+    for event in events:
+        for sink in sinks:
+            sink(*event)
+        yield event
+
+
+# * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+# * * * * * * * * * * * * Aggregators * * * * * * * * * * * * * *
+# * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+
+class TrialStats(object):
+    """
+    a measure of the trials of a condition (e.g., rt in iterations), kept as a histogram (value -> number of trials):
+    as big as the number of different values, not the number of trials, but with all there is to know about the data
+    (whatever order they came in)
+    """
+    def __init__(self):
+        self.counts        = {} # value -> how many trials had it
+        self.n             = 0
+        self.total         = 0
+        self.total_squares = 0
+
+    def add(self, value, count=1):
+        self.counts[value]  = self.counts.get(value, 0) + count
+        self.n             += count
+        self.total         += value * count
+        self.total_squares += value * value * count
+
+    def mean_and_sem(self):
+        """
+        :return: (mean, std. error of mean), as from SearchModelInterface.mean_and_sem; None if there are no data
+        """
+        if self.n == 0:
+            return None
+        mean = self.total / self.n
+        # (the sum of squared deviations, from the sums: exact, for whole numbers)
+        sd = pow((self.n * self.total_squares - self.total * self.total) / self.n, 0.5)
+        return (mean, sd / pow(self.n, 0.5))
+
+    def get_state(self):
+        # the histogram, as [[value, count]...] (JSON-able)
+        return [[value, self.counts[value]] for value in sorted(self.counts)]
+
+    def set_state(self, state):
+        self.__init__()
+        for (value, count) in state:
+            self.add(value, count)
+
+class ConditionTally(object):
+    """
+    a sink that tallies the outcomes of each condition's trials, and their measures (for the correct ones)
+    """
+    MEASURES = (('rt', 'iteration'), ('selections', 'num_attended'), ('eye_movements', 'num_eye_movements'),
+                ('auto_rejections', 'num_auto_rejections')) # (measure, the trial record's key for it)
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.runs     = 0 # num runs, including the ones cut off
+        self.errors   = 0 # num errors over all runs
+        self.stalled  = 0 # num runs the watchdog gave up on
+        self.cut_off  = 0 # num runs cut off by the time budget (discarded)
+        self.restored = False # whether the condition was read back from a checkpoint, rather than run
+        self.stats    = {}
+        for (measure, key) in self.MEASURES:
+            self.stats[measure] = TrialStats()
+
+    def __call__(self, kind, spec, run, value):
+        if kind == 'begin':
+            self.reset()
+        elif kind == 'restore':
+            self.set_state(value)
+            self.restored = True
+        elif kind == 'trial':
+            self.runs += 1
+            if value['timed_out']:
+                # the budget ran out in the middle of this run: it didn't fail, it just didn't finish. throw it away
+                self.cut_off += 1
+            elif value['stalled']:
+                # stalled runs are their own outcome: they go to the stall file, not the data
+                self.stalled += 1
+                print( 'Stalled ' + str(self.stalled) + ' (' + value['stall_reason'] + ')')
+            elif value['correct']: # count correct responses only
+                for (measure, key) in self.MEASURES:
+                    self.stats[measure].add(value[key])
+            else:
+                self.errors += 1
+                print("Errors " + str(self.errors))
+
+    def get_state(self):
+        state = {'counts': [self.runs, self.errors, self.stalled, self.cut_off], 'stats': {}}
+        for measure in self.stats:
+            state['stats'][measure] = self.stats[measure].get_state()
+        return state
+
+    def set_state(self, state):
+        self.reset()
+        (self.runs, self.errors, self.stalled, self.cut_off) = state['counts']
+        for measure in self.stats:
+            self.stats[measure].set_state(state['stats'][measure])
+
+
+# * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+# * * * * * * * * * * * * * * Sinks * * * * * * * * * * * * * * *
+# * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+
+class CsvSink(object):
+    """
+    writes a csv row for each finished, unstalled trial (resp.corr, total_setsize, trial_type, resp.rt, dcolor,
+    participant)
+    """
+    def __init__(self, writer, search_type, condition):
+        """
+        :param writer: a csv.writer (or anything with writerow: see BackgroundWriter)
+        :param search_type, condition: as for run_suite
+        """
+        self.writer      = writer
+        self.condition   = condition
+        self.participant = search_type.split('_')[0]
+
+    def __call__(self, kind, spec, run, record):
+        if kind != 'trial' or record['timed_out'] or record['stalled']:
+            return
+        if spec['num_distractors'] == 0: recorded_condition = 0
+        else: recorded_condition = self.condition
+        self.writer.writerow([str(int(record['correct'])), str(spec['num_distractors']+1), 'expt', str(record['iteration']), str(recorded_condition), self.participant])
+
+class StallSink(object):
+    """
+    writes a snapshot of each stalled trial to a stall file, opened the first time a trial stalls
+    """
+    def __init__(self, file_name, write_snapshot, checkpoint=None):
+        """
+        :param write_snapshot: SearchModelInterface.write_stall_snapshot (or anything that takes the same arguments)
+        :param checkpoint: the SuiteCheckpoint, if the suite has one (the file is restored from it before it's opened)
+        """
+        self.file_name      = file_name
+        self.write_snapshot = write_snapshot
+        self.checkpoint     = checkpoint
+        self.file           = None
+
+    def __call__(self, kind, spec, run, record):
+        if kind != 'trial' or record['timed_out'] or not record['stalled']:
+            return
+        if not self.file:
+            if self.checkpoint:
+                self.checkpoint.restore_file(self.file_name)
+            self.file = open(self.file_name, 'a')
+        self.write_snapshot(self.file, spec['num_distractors'], run, record['stall_snapshot'], record['stall_reason'])
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+class DisplaySink(object):
+    """
+    saves the display of each condition as its first finished trial left it (for GraphicalRun1.export_images). the
+    model has to still be in that state, so this only works on trials run here, as they're run
+    """
+    def __init__(self, model, name, snapshots):
+        """
+        :param name: the start of the displays' names (the number of distractors is added)
+        :param snapshots: the list to add (name, display, state) to
+        """
+        self.model     = model
+        self.name      = name
+        self.snapshots = snapshots
+        self.snapped   = False
+
+    def __call__(self, kind, spec, run, record):
+        if kind == 'begin':
+            self.snapped = False
+        elif kind == 'trial' and not record['timed_out'] and not self.snapped:
+            name = self.name + '_n' + str(spec['num_distractors'])
+            self.snapshots.append((name, GraphicalRun1.describe_model_display(self.model), GraphicalRun1.snapshot_state(self.model)))
+            self.snapped = True
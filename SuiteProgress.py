@@ -0,0 +1,153 @@
+
+import sys, json, time
+import DataFiles
+
+
+# * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+# * * * * * * * * * * * Suite Progress * * * * * * * * * * * * *
+# * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+
+# Reports how far a suite (or a whole premade suite) has got: trials done of the total, trials per second, how long
+# each condition took and when it should be done. The reports go to the terminal (one line, written over) or to a
+# JSON status file (written whole, so whatever reads it never sees half of it), at most every REPORT_INTERVAL
+# seconds: all a trial costs is a count and a look at the clock.
+#
+# A ProgressReporter is a sink for a suite's events (see SuitePipeline). Trials run in worker processes are counted as
+# their tasks come back instead (add_trials, from ParallelSuite.run), so then it's told not to count them again
+# (count_trials), and a condition's time is its tasks' (the workers' seconds, added up). Conditions read back from a
+# checkpoint (see SuiteCheckpoint) count as done, but not towards the rate.
+
+REPORT_INTERVAL = 1.0                 # seconds between reports
+STATUS_FILE     = 'data/progress.json' # where reports to a file go
+MODES           = (None, 'terminal', 'file')
+
+class ProgressReporter(object):
+    """
+    counts a suite's trials as they're done, and reports its progress (see above)
+    """
+    def __init__(self, title, total, mode='terminal', status_file=STATUS_FILE, interval=REPORT_INTERVAL):
+        """
+        :param title: what's being run (it heads the reports)
+        :param total: the number of trials in all; None if that's not known (budgeted runs): then there's no ETA
+        :param mode: 'terminal' or 'file' (a key of MODES)
+        :param status_file: with mode 'file', the JSON file to write the reports to
+        :param interval: the least time between reports (seconds)
+        """
+        self.title        = title
+        self.total        = total
+        self.mode         = mode
+        self.status_file  = status_file
+        self.interval     = interval
+        self.done         = 0    # trials done, including the ones read back from a checkpoint
+        self.skipped      = 0    # trials read back from a checkpoint (done, but not at this rate)
+        self.start_time   = time.time()
+        self.next_report  = self.start_time
+        self.suite        = None # the suite being run (see begin_suite)
+        self.condition    = None # the condition being run: [trials, start time]
+        self.conditions   = []   # each condition done: [suite, num. distractors, trials, seconds]
+        self.task_times   = {}   # condition index -> [trials, seconds] of the tasks counted with add_trials
+        self.count_trials = True # whether the trial events are to be counted (False when they were counted already)
+
+    def begin_suite(self, name):
+        """
+        starts a suite: the conditions after this are its
+        """
+        self.suite      = name
+        self.task_times = {}
+
+    def add_trials(self, condition_index, count, seconds):
+        """
+        counts trials done elsewhere (a task's, in a worker process: see ParallelSuite.run)
+        :param condition_index: the condition's index in the suite
+        :param seconds: the time they took
+        """
+        self.done += count
+        times = self.task_times.setdefault(condition_index, [0, 0.0])
+        times[0] += count
+        times[1] += seconds
+        if time.time() >= self.next_report:
+            self.report()
+
+    def __call__(self, kind, spec, run, value):
+        if kind == 'trial':
+            if self.count_trials:
+                self.done += 1
+                self.condition[0] += 1
+                if time.time() >= self.next_report:
+                    self.report()
+        elif kind == 'begin':
+            self.condition = [0, time.time()]
+        elif kind == 'restore':
+            self.done    += value['counts'][0]
+            self.skipped += value['counts'][0]
+        elif kind == 'end':
+            (trials, seconds) = (self.condition[0], time.time() - self.condition[1])
+            if not self.count_trials:
+                (trials, seconds) = self.task_times.get(spec['index'], (0, 0.0))
+            if trials:
+                self.conditions.append([self.suite, spec['num_distractors'], trials, seconds])
+            self.condition = None
+
+    def get_status(self):
+        """
+        :return: the progress so far: {'title', 'done', 'total', 'elapsed', 'trials_per_second', 'eta_seconds',
+                 'eta' (the time it should be done, as text), 'suite', 'conditions'}
+        """
+        now     = time.time()
+        elapsed = now - self.start_time
+        rate    = None
+        if elapsed > 0 and self.done > self.skipped:
+            rate = (self.done - self.skipped) / elapsed
+        eta_seconds = None
+        eta         = None
+        if rate and self.total is not None:
+            eta_seconds = max(self.total - self.done, 0) / rate
+            eta = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(now + eta_seconds))
+        return {'title'            : self.title,
+                'done'             : self.done,
+                'total'            : self.total,
+                'elapsed'          : elapsed,
+                'trials_per_second': rate,
+                'eta_seconds'      : eta_seconds,
+                'eta'              : eta,
+                'suite'            : self.suite,
+                'conditions'       : [{'suite': suite, 'num_distractors': num_distractors, 'trials': trials, 'seconds': seconds}
+                                      for (suite, num_distractors, trials, seconds) in self.conditions]}
+
+    def report(self, final=False):
+        """
+        writes the progress so far (to the terminal or the status file)
+        :param final: whether it's the last report (the terminal line is then ended)
+        """
+        self.next_report = time.time() + self.interval
+        status = self.get_status()
+        if self.mode == 'file':
+            DataFiles.write_atomically(self.status_file, json.dumps(status, indent=1))
+            return
+        line = status['title'] + ': ' + str(status['done'])
+        if status['total'] is not None:
+            line += '/' + str(status['total']) + ' trials'
+            if status['total']:
+                line += ' (%.1f%%)' % (100.0 * status['done'] / status['total'])
+        else:
+            line += ' trials'
+        if status['trials_per_second']:
+            line += ', %.1f trials/s' % status['trials_per_second']
+        if status['eta'] and not final:
+            line += ', ETA ' + format_seconds(status['eta_seconds']) + ' (' + status['eta'] + ')'
+        if final:
+            line += ', done in ' + format_seconds(status['elapsed'])
+        sys.stdout.write('\r' + line.ljust(79) + ('\n' if final else ''))
+        sys.stdout.flush()
+
+    def finish(self):
+        """
+        the last report
+        :return:
+        """
+        self.report(final=True)
+
+def format_seconds(seconds):
+    # seconds as h:mm:ss
+    seconds = int(round(seconds))
+    return '%i:%02i:%02i' % (seconds // 3600, seconds // 60 % 60, seconds % 60)
@@ -0,0 +1,169 @@
+
+import os, json, hashlib
+import DataFiles
+
+
+# * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+# * * * * * * * * * * Cost-aware Scheduling * * * * * * * * * * *
+# * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+
+# Conditions differ a lot in what a trial costs: a set size of 36 in a conjunction search against a set size of 0, or
+# Pomerantz items with 300-odd dimensions against 47. Handed to a pool in order, the expensive ones can be left for the
+# end, with one worker grinding through them while the rest sit idle. So the scheduler estimates what each condition
+# costs, splits the expensive ones into chunks of trials, and hands the chunks out longest first, which keeps every
+# worker busy until the suite is done.
+#
+# Estimates come from the timings of earlier runs of the same condition, which the scheduler records itself (in
+# data/scheduler_history.json); a condition it hasn't seen is estimated from its set size and dimension count, scaled
+# by how the conditions it has seen compared with their own such estimates. Several runs can share the history (e.g.,
+# on the nodes of a cluster, or jobs in the simulation service): each saves just the timings it recorded itself,
+# merged into the history as it is on disk then, under the data directory's lock (see DataFiles).
+
+HISTORY_FILE  = 'data/scheduler_history.json'
+ORDERED_CHUNK = 256 # the most trials in a task, when they're listed in order (see schedule)
+
+def condition_key(model, target, non_targets):
+    """
+    :param model: the SearchModel the condition runs in
+    :param target, non_targets: as for create_simulation
+    :return: a key for the condition's timings (the same condition, with the same dimensions, gets the same key)
+    """
+    text = json.dumps([target, non_targets, len(model.non_relation_dimensions), list(model.salience)])
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+def size_estimate(num_items, num_dimensions):
+    # how a trial's cost grows, before scaling: every iteration samples every item's dimensions, and (in a serial
+    # search) it takes more iterations, the more items there are
+    return (num_items + 1) ** 1.5 * max(num_dimensions, 1)
+
+class SuiteScheduler(object):
+    """
+    estimates what suite conditions cost, splits them into tasks and orders them longest first; records the timings
+    """
+    def __init__(self, history_file=HISTORY_FILE, chunks_per_process=4, ordered_chunk=ORDERED_CHUNK):
+        """
+        :param history_file: where timings are kept between runs; None means don't keep them
+        :param chunks_per_process: how finely to split the work: no task is to cost more than the whole suite's
+                                   share for one process divided by this
+        :param ordered_chunk: the most trials in a task, when the tasks are listed in order (see schedule)
+        """
+        self.history_file       = history_file
+        self.chunks_per_process = chunks_per_process
+        self.ordered_chunk      = ordered_chunk
+        self.history            = {} # condition key -> {'seconds_per_trial', 'num_items', 'num_dimensions', 'trials'}
+        self.recorded           = [] # the timings recorded since the history was read (see record), to save
+        if history_file:
+            self.history = self.read_history()
+
+    def read_history(self):
+        """
+        :return: the history in the history file (empty, if there's none, or it can't be read)
+        """
+        if not os.path.exists(self.history_file):
+            return {}
+        try:
+            with open(self.history_file) as history:
+                return json.load(history)
+        except ValueError:
+            print( 'SuiteScheduler: ' + self.history_file + ' is unreadable; starting a new history')
+            return {}
+
+    def get_scale(self):
+        """
+        :return: seconds per unit of size_estimate: the median over the conditions with recorded timings (or a guess,
+                 if there are none)
+        """
+        ratios = []
+        for entry in self.history.values():
+            ratios.append(entry['seconds_per_trial'] / size_estimate(entry['num_items'], entry['num_dimensions']))
+        if not ratios:
+            return 2e-6
+        ratios.sort()
+        return ratios[len(ratios) // 2]
+
+    def estimate(self, key, num_items, num_dimensions, scale=None):
+        """
+        :param key: the condition's key (see condition_key)
+        :return: the estimated seconds per trial of the condition
+        """
+        if key in self.history:
+            return self.history[key]['seconds_per_trial']
+        if scale is None:
+            scale = self.get_scale()
+        return scale * size_estimate(num_items, num_dimensions)
+
+    def schedule(self, conditions, processes, in_order=False):
+        """
+        :param conditions: for each condition (by id), a dictionary with its 'key', 'num_items', 'num_dimensions' and
+                           'num_trials'
+        :param processes: how many worker processes the tasks will be shared among
+        :param in_order: True to list the tasks in order of condition and trial instead, for a caller that takes the
+                         conditions' results in turn (see ParallelSuite.run): then each condition is done as soon as it
+                         can be, and only the chunks' sizes keep the workers busy to the end. no task is then more than
+                         ordered_chunk trials, so the results back before their turn are never more than about that
+                         many per process
+        :return: the tasks, [(condition id, first trial, number of trials)...], the costliest first (unless in_order)
+        """
+        scale = self.get_scale()
+        costs = [self.estimate(condition['key'], condition['num_items'], condition['num_dimensions'], scale)
+                 for condition in conditions]
+        total = sum([costs[i] * conditions[i]['num_trials'] for i in range(len(conditions))])
+        largest_task = total / (max(processes, 1) * self.chunks_per_process)
+
+        tasks = [] # (estimated cost, condition id, first trial, number of trials)
+        for condition_id in range(len(conditions)):
+            num_trials = conditions[condition_id]['num_trials']
+            if num_trials <= 0:
+                continue
+            if costs[condition_id] > 0 and largest_task > 0:
+                chunk = max(1, int(largest_task / costs[condition_id]))
+            else:
+                chunk = num_trials
+            if in_order:
+                chunk = min(chunk, self.ordered_chunk)
+            for first_trial in range(0, num_trials, chunk):
+                chunk_trials = min(chunk, num_trials - first_trial)
+                tasks.append((costs[condition_id] * chunk_trials, condition_id, first_trial, chunk_trials))
+        if not in_order:
+            tasks.sort(key=lambda task: -task[0]) # longest processing time first
+        return [task[1:] for task in tasks]
+
+    def record(self, key, num_items, num_dimensions, seconds, num_trials):
+        """
+        records how long some trials of a condition took (blended with what was recorded before)
+        """
+        if num_trials <= 0:
+            return
+        self.recorded.append((key, num_items, num_dimensions, seconds, num_trials))
+        self.add_timing(self.history, key, num_items, num_dimensions, seconds, num_trials)
+
+    def add_timing(self, history, key, num_items, num_dimensions, seconds, num_trials):
+        # blends a timing into a history
+        seconds_per_trial = float(seconds) / num_trials
+        if key in history:
+            entry  = history[key]
+            weight = float(num_trials) / (entry['trials'] + num_trials)
+            entry['seconds_per_trial'] += weight * (seconds_per_trial - entry['seconds_per_trial'])
+            entry['trials'] = min(entry['trials'] + num_trials, 1000) # so the history keeps up with changes to the model
+        else:
+            history[key] = {'seconds_per_trial': seconds_per_trial, 'num_items': num_items,
+                            'num_dimensions': num_dimensions, 'trials': num_trials}
+
+    def save(self):
+        """
+        merges the timings recorded since the history was read into the history file, as it is now (other runs may
+        have saved theirs since), under its lock; the file is replaced whole (see DataFiles.write_atomically)
+        :return:
+        """
+        if not self.history_file:
+            return
+        directory = os.path.dirname(self.history_file)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        with DataFiles.FileLock(self.history_file):
+            history = self.read_history()
+            for timing in self.recorded:
+                self.add_timing(history, *timing)
+            DataFiles.write_atomically(self.history_file, json.dumps(history, indent=1, sort_keys=True))
+        self.history  = history
+        self.recorded = []
@@ -0,0 +1,314 @@
+
+import os, json
+
+try:
+    import numpy
+    NUMPY_FAILED = False
+except:
+    NUMPY_FAILED = True
+
+
+# * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+# * * * * * * * * Per-iteration traces of single trials * * * * * * * *
+# * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
+
+class TrialTraceRecorder(object):
+    """
+    Records a compact snapshot of the model's state on every iteration of a trial and saves each trial to its own
+    compressed .npz file. The snapshots go into preallocated ring buffers, so a long (e.g., target absent) trial
+    costs no more memory than a short one: only the last `capacity` iterations are kept.
+
+    Each snapshot is
+      iteration  (int32)               : the model's iteration counter (jumps by EYE_MOVEMENT_TIME_COST on eye movements)
+      integrator (float32, 1 per item) : every search item's integrator. priority is the integrator for viable items and 0 for rejected ones
+      selected   (int16)               : index of the selected item, -1 if none
+      fixation   (float32, [x, y])     : the fixation point
+      rejected   (uint8, packed bits)  : bit i is set iff item i is rejected (numpy.unpackbits to read it)
+
+    To use it, set model.trace_recorder to a recorder: run_whole_search does the rest.
+    """
+    def __init__(self, directory='data/traces', capacity=4096):
+        """
+        :param directory: where the .npz files go (made if it doesn't exist)
+        :param capacity: the number of iterations the ring buffers hold
+        """
+        if NUMPY_FAILED:
+            raise ImportError('TrialTraceRecorder needs numpy')
+        self.directory = directory
+        self.capacity  = capacity
+        self.prefix    = 'trial' # the start of the file names; callers set this to say what condition is running
+        self.trial_num = 0       # appended to the prefix to make each trial's file name unique
+
+        # the ring buffers: allocated by start_trial, and only reallocated when the number of items changes
+        self.num_items   = -1
+        self.iterations  = None
+        self.integrators = None
+        self.selected    = None
+        self.fixations   = None
+        self.rejected    = None
+        self.count       = 0 # the number of snapshots recorded this trial (may be more than capacity)
+
+    def start_trial(self, model):
+        """
+        gets ready to record a trial. called by model.init_search
+        :param model: the SearchModel
+        :return:
+        """
+        num_items = len(model.search_items)
+        if num_items != self.num_items:
+            self.num_items   = num_items
+            self.iterations  = numpy.zeros(self.capacity, dtype=numpy.int32)
+            self.integrators = numpy.zeros((self.capacity, num_items), dtype=numpy.float32)
+            self.selected    = numpy.zeros(self.capacity, dtype=numpy.int16)
+            self.fixations   = numpy.zeros((self.capacity, 2), dtype=numpy.float32)
+            self.rejected    = numpy.zeros((self.capacity, (num_items + 7) // 8), dtype=numpy.uint8)
+        self.count = 0
+
+    def record(self, model):
+        """
+        stores a snapshot of the model's state in the next row of the ring buffers. called by model.run_search_step
+        :param model: the SearchModel
+        :return:
+        """
+        row   = self.count % self.capacity
+        items = model.search_items
+        self.iterations[row]  = model.iteration
+        self.integrators[row] = numpy.fromiter((item.integrator for item in items), dtype=numpy.float32, count=self.num_items)
+        self.rejected[row]    = numpy.packbits(numpy.fromiter((item.rejected for item in items), dtype=bool, count=self.num_items))
+        self.fixations[row]   = model.fixation
+        if model.selected_item:
+            self.selected[row] = model.selected_item.index
+        else:
+            self.selected[row] = -1
+        self.count += 1
+
+    def end_trial(self, model):
+        """
+        saves the trial's snapshots, oldest first, along with what's needed to make sense of them
+        called by model.run_whole_search after analyze_result
+        :param model: the SearchModel
+        :return: the name of the file saved
+        """
+        # put the rows of the ring buffer back in order
+        if self.count <= self.capacity:
+            order = numpy.arange(self.count)
+        else:
+            start = self.count % self.capacity
+            order = numpy.concatenate((numpy.arange(start, self.capacity), numpy.arange(start)))
+
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        file_name = os.path.join(self.directory, '%s_%05i.npz' % (self.prefix, self.trial_num))
+        self.trial_num += 1
+
+        numpy.savez_compressed(file_name,
+                               iteration    = self.iterations[order],
+                               integrator   = self.integrators[order],
+                               selected     = self.selected[order],
+                               fixation     = self.fixations[order],
+                               rejected     = self.rejected[order],
+                               num_items    = self.num_items,
+                               dropped      = self.count - len(order), # the oldest snapshots that the ring buffer overwrote
+                               final_iteration = model.iteration,
+                               correct      = model.correct,
+                               target_found = model.target_found,
+                               stalled      = model.stalled,
+                               timed_out    = model.timed_out,
+                               **describe_display(model))
+        return file_name
+
+
+class TrialRecording(object):
+    """
+    Records a whole trial for replay (GraphicalRun.replay). Unlike TrialTraceRecorder, nothing is dropped, so the
+    recording is kept compact instead:
+      - every frame (iteration) stores the scalars (iteration, selected, found target and fixation) and the
+        float32 integrator of every item
+      - rejections are stored as events (frame, item), since an item, once rejected, stays rejected
+      - every keyframe_interval frames a keyframe stores the rejected bitmask
+    To get the state at any frame, start at the keyframe before it and apply the rejection events since then
+    (see RecordedTrial.state_at).
+
+    Frame 0 is the state after init_search, before the first iteration. Set model.trace_recorder to a recording
+    and run the trial with run_whole_search: the file is saved at the end.
+    """
+    def __init__(self, file_name, keyframe_interval=50):
+        """
+        :param file_name: the .npz file to save the recording to
+        :param keyframe_interval: the number of frames between keyframes
+        """
+        if NUMPY_FAILED:
+            raise ImportError('TrialRecording needs numpy')
+        self.file_name         = file_name
+        self.keyframe_interval = keyframe_interval
+
+    def start_trial(self, model):
+        """
+        clears the recording and records frame 0. called by model.init_search
+        :param model: the SearchModel
+        :return:
+        """
+        self.display          = describe_display(model)
+        self.was_rejected     = [False] * len(model.search_items)
+        self.iterations       = []
+        self.selected         = []
+        self.found            = []
+        self.fixations        = []
+        self.rejection_frames = [] # the rejection events: item self.rejection_items[i] was rejected on frame self.rejection_frames[i]
+        self.rejection_items  = []
+        self.integrators      = []
+        self.keyframe_rejected = []
+        self.record(model)
+
+    def record(self, model):
+        """
+        records the current frame. called by model.run_search_step
+        :param model: the SearchModel
+        :return:
+        """
+        frame = len(self.iterations)
+        self.iterations.append(model.iteration)
+        if model.selected_item:
+            self.selected.append(model.selected_item.index)
+        else:
+            self.selected.append(-1)
+        if model.found_target:
+            self.found.append(model.found_target.index)
+        else:
+            self.found.append(-1)
+        self.fixations.append(model.fixation)
+        self.integrators.append(numpy.fromiter((item.integrator for item in model.search_items), dtype=numpy.float32, count=len(self.was_rejected)))
+
+        # rejection events: the items that have been rejected since the last frame
+        for item in model.rejected_items:
+            if not self.was_rejected[item.index]:
+                self.was_rejected[item.index] = True
+                self.rejection_frames.append(frame)
+                self.rejection_items.append(item.index)
+
+        if frame % self.keyframe_interval == 0:
+            self.keyframe_rejected.append(numpy.packbits(numpy.array(self.was_rejected, dtype=bool)))
+
+    def end_trial(self, model):
+        """
+        saves the recording. called by model.run_whole_search
+        :param model: the SearchModel
+        :return: the name of the file saved
+        """
+        directory = os.path.dirname(self.file_name)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        num_items = len(self.was_rejected)
+        numpy.savez_compressed(self.file_name,
+                               keyframe_interval = self.keyframe_interval,
+                               iteration         = numpy.array(self.iterations, dtype=numpy.int32),
+                               selected          = numpy.array(self.selected, dtype=numpy.int16),
+                               found             = numpy.array(self.found, dtype=numpy.int16),
+                               fixation          = numpy.array(self.fixations, dtype=numpy.float32).reshape(-1, 2),
+                               integrator        = numpy.array(self.integrators, dtype=numpy.float32).reshape(-1, num_items),
+                               rejection_frames  = numpy.array(self.rejection_frames, dtype=numpy.int32),
+                               rejection_items   = numpy.array(self.rejection_items, dtype=numpy.int16),
+                               keyframe_rejected = numpy.array(self.keyframe_rejected, dtype=numpy.uint8).reshape(-1, (num_items + 7) // 8),
+                               num_items         = num_items,
+                               final_iteration   = model.iteration,
+                               correct           = model.correct,
+                               target_found      = model.target_found,
+                               stalled           = model.stalled,
+                               timed_out         = model.timed_out,
+                               **self.display)
+        return self.file_name
+
+
+class RecordedTrial(object):
+    """
+    A trial read back from a file made by TrialRecording or TrialTraceRecorder, for replay.
+    Nothing is recomputed: every state comes straight from the file.
+    (A TrialTraceRecorder file has a full snapshot on every frame, so every frame is a keyframe, but it only
+    holds the last `capacity` iterations of the trial.)
+    """
+    def __init__(self, file_name):
+        if NUMPY_FAILED:
+            raise ImportError('RecordedTrial needs numpy')
+        data = numpy.load(file_name)
+        self.file_name       = file_name
+        self.iterations      = data['iteration']
+        self.selected        = data['selected']
+        self.fixations       = data['fixation']
+        self.integrators     = data['integrator']
+        self.num_items       = int(data['num_items'])
+        self.num_frames      = len(self.iterations)
+        self.final_iteration = int(data['final_iteration'])
+        self.correct         = bool(data['correct'])
+        self.target_found    = bool(data['target_found'])
+        self.stalled         = bool(data['stalled'])
+
+        # what's needed to draw the display
+        self.item_properties = json.loads(str(data['item_properties']))
+        self.item_names      = [str(name) for name in data['item_names']]
+        self.is_target       = [bool(flag) for flag in data['is_target']]
+        self.locations       = [[int(x), int(y)] for [x, y] in data['locations']]
+        self.cartesian_grid  = bool(data['cartesian_grid'])
+        self.display_center  = tuple(int(x) for x in data['display_center'])
+        self.display_radius  = int(data['display_radius'])
+        self.item_radius     = int(data['item_radius'])
+
+        if 'keyframe_interval' in data.files:
+            # a TrialRecording
+            self.keyframe_interval    = int(data['keyframe_interval'])
+            self.found                = data['found']
+            self.rejection_frames     = data['rejection_frames']
+            self.rejection_items      = data['rejection_items']
+            self.keyframe_rejected    = data['keyframe_rejected']
+        else:
+            # a TrialTraceRecorder trace: every frame is a keyframe, with no rejection events in between
+            self.keyframe_interval    = 1
+            self.found                = numpy.full(self.num_frames, -1, dtype=numpy.int16)
+            if self.target_found and self.num_frames:
+                self.found[-1] = self.selected[-1]
+            self.rejection_frames     = numpy.zeros(0, dtype=numpy.int32)
+            self.rejection_items      = numpy.zeros(0, dtype=numpy.int16)
+            self.keyframe_rejected    = data['rejected']
+
+    def frame_for_iteration(self, iteration):
+        """
+        :param iteration: a model iteration
+        :return: the last frame at or before that iteration (iterations skip ahead during eye movements)
+        """
+        frame = int(numpy.searchsorted(self.iterations, iteration, side='right')) - 1
+        return min(max(frame, 0), self.num_frames - 1)
+
+    def state_at(self, frame):
+        """
+        reconstructs the state of the trial at a frame: the keyframe at or before it, plus the rejections since
+        :param frame: the frame (0...num_frames-1)
+        :return: a dictionary with iteration, selected, found, fixation, rejected (a list of booleans, one per
+                 item) and integrators (a float32 array, one per item)
+        """
+        keyframe = frame // self.keyframe_interval
+        rejected = numpy.unpackbits(self.keyframe_rejected[keyframe], count=self.num_items).astype(bool)
+        # apply the rejection events between the keyframe and this frame
+        first = numpy.searchsorted(self.rejection_frames, keyframe * self.keyframe_interval, side='right')
+        last  = numpy.searchsorted(self.rejection_frames, frame, side='right')
+        rejected[self.rejection_items[first:last]] = True
+        return {'iteration'  : int(self.iterations[frame]),
+                'selected'   : int(self.selected[frame]),
+                'found'      : int(self.found[frame]),
+                'fixation'   : [float(x) for x in self.fixations[frame]],
+                'rejected'   : rejected.tolist(),
+                'integrators': self.integrators[frame]}
+
+
+def describe_display(model):
+    """
+    the static part of a trial: what each item is, where it is, and the layout of the display
+    :param model: the SearchModel (after init_search has assigned locations)
+    :return: a dictionary of arrays, ready to go in an .npz file
+    """
+    return {'item_properties': numpy.array(json.dumps([item.item_properties for item in model.search_items])),
+            'item_names'     : numpy.array([item.name for item in model.search_items]),
+            'is_target'      : numpy.array([item.is_target for item in model.search_items], dtype=bool),
+            'locations'      : numpy.array([item.location for item in model.search_items], dtype=numpy.int32).reshape(-1, 2),
+            'cartesian_grid' : model.CARTESIAN_GRID,
+            'display_center' : numpy.array(model.DISPLAY_CENTER, dtype=numpy.int32),
+            'display_radius' : model.DISPLAY_RADIUS,
+            'item_radius'    : model.ITEM_RADIUS}